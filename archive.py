@@ -0,0 +1,138 @@
+"""
+Hot/Cold Request Archival
+Moves closed (completed/denied) PTO requests older than the retention window, with
+their CallOutRecords, from pto_requests into pto_requests_archive in batches, so
+status-filtered queries, counts and calendar scans only see the active workload.
+History pages and reports read both tables through the pto_requests_all view
+(models.PTORequestHistory)
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+import click
+import sqlalchemy as sa
+from sqlalchemy import delete, func, insert, select
+
+from database import db
+from models import ArchivedCallOutRecord, ArchivedPTORequest, CallOutRecord, PTORequest, get_eastern_time
+from request_events import note_requests_archived
+
+logger = logging.getLogger(__name__)
+
+CLOSED_STATUSES = ('completed', 'denied')
+
+
+def archive_cutoff(retention_days, now=None):
+    """Requests that ended and were last updated before this moment are archivable"""
+    return (now or get_eastern_time()) - timedelta(days=retention_days)
+
+
+def _archivable_ids(cutoff, limit):
+    # Never move the newest request or the request of the newest call-out record:
+    # SQLite hands out max(id) + 1, so keeping the maximum row in place stops
+    # archived ids from being reused by new rows
+    newest_request = select(func.max(PTORequest.id)).scalar_subquery()
+    newest_call_out_request = select(func.coalesce(CallOutRecord.pto_request_id, 0)).where(
+        CallOutRecord.id == select(func.max(CallOutRecord.id)).scalar_subquery()
+    ).scalar_subquery()
+
+    return db.session.scalars(
+        select(PTORequest.id)
+        .where(PTORequest.status.in_(CLOSED_STATUSES),
+               PTORequest.end_date < cutoff.strftime('%Y-%m-%d'),
+               PTORequest.updated_at < cutoff,
+               PTORequest.id < newest_request,
+               PTORequest.id != func.coalesce(newest_call_out_request, 0))
+        .order_by(PTORequest.id)
+        .limit(limit)
+    ).all()
+
+
+def _copy_rows(source, target, where, archived_at):
+    names = [c.name for c in source.columns]
+    return db.session.execute(
+        insert(target).from_select(
+            names + ['archived_at'],
+            select(*source.columns, sa.literal(archived_at, sa.DateTime)).where(where),
+        )
+    ).rowcount
+
+
+def archive_batch(request_ids):
+    """Copy one batch of requests and their call-out records to the archive, then delete them"""
+    archived_at = get_eastern_time()
+    requests = PTORequest.__table__
+    call_outs = CallOutRecord.__table__
+
+    moved_requests = _copy_rows(requests, ArchivedPTORequest.__table__, requests.c.id.in_(request_ids), archived_at)
+    moved_call_outs = _copy_rows(call_outs, ArchivedCallOutRecord.__table__,
+                                 call_outs.c.pto_request_id.in_(request_ids), archived_at)
+
+    # Archived requests move to the archived counters (their events stay in the log)
+    note_requests_archived(request_ids)
+
+    # Children first: call_out_records.pto_request_id references pto_requests
+    db.session.execute(delete(call_outs).where(call_outs.c.pto_request_id.in_(request_ids)))
+    db.session.execute(delete(requests).where(requests.c.id.in_(request_ids)))
+    return moved_requests, moved_call_outs
+
+
+def archive_closed_requests(retention_days, batch_size=500, pause=0.05, max_batches=None, dry_run=False):
+    """
+    Move archivable requests in batches of batch_size, one short transaction per batch
+    Returns counts of requests and call-out records moved (or that would be, with dry_run)
+    """
+    cutoff = archive_cutoff(retention_days)
+    stats = {'requests': 0, 'call_outs': 0, 'batches': 0, 'cutoff': cutoff.strftime('%Y-%m-%d')}
+
+    if dry_run:
+        ids = _archivable_ids(cutoff, limit=None)
+        stats['requests'] = len(ids)
+        stats['call_outs'] = db.session.scalar(
+            select(func.count(CallOutRecord.id)).where(CallOutRecord.pto_request_id.in_(ids))) if ids else 0
+        return stats
+
+    started = time.perf_counter()
+    while max_batches is None or stats['batches'] < max_batches:
+        ids = _archivable_ids(cutoff, limit=batch_size)
+        if not ids:
+            break
+        try:
+            moved_requests, moved_call_outs = archive_batch(ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        stats['requests'] += moved_requests
+        stats['call_outs'] += moved_call_outs
+        stats['batches'] += 1
+        if pause:
+            time.sleep(pause)
+
+    # Bulk DELETEs bypass the ORM; drop any loaded copies of the moved rows
+    db.session.expire_all()
+    logger.info(f"Archived {stats['requests']} closed PTO requests", extra={
+        **stats, 'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+    return stats
+
+
+def register_archive_commands(app, settings):
+    """Register the `flask archive-requests` CLI command (run it from cron)"""
+
+    @app.cli.command('archive-requests')
+    @click.option('--retention-days', type=int, default=settings.archive_retention_days, show_default=True,
+                  help='Archive closed requests that ended more than this many days ago.')
+    @click.option('--batch-size', type=int, default=settings.archive_batch_size, show_default=True,
+                  help='Requests moved per transaction.')
+    @click.option('--max-batches', type=int, default=None, help='Stop after this many batches.')
+    @click.option('--dry-run', is_flag=True, help='Only count what would be archived.')
+    def archive_requests_command(retention_days, batch_size, max_batches, dry_run):
+        """Move old completed/denied requests into the archive tables."""
+        stats = archive_closed_requests(retention_days, batch_size=batch_size, max_batches=max_batches,
+                                        dry_run=dry_run)
+        verb = 'Would archive' if dry_run else 'Archived'
+        click.echo(f"{verb} {stats['requests']} requests and {stats['call_outs']} call-out records "
+                   f"closed before {stats['cutoff']}")
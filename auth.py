@@ -1,7 +1,12 @@
-from flask import session, request, redirect, url_for, flash
+from flask import session, redirect, url_for, flash, g
 from functools import wraps
+from collections import namedtuple
+import threading
+import time
+from sqlalchemy import event
+from database import db
 from werkzeug.security import check_password_hash, generate_password_hash
-from models import Manager
+from models import Manager, role_can_approve_position
 
 def roles_required(*roles):
     def wrapper(fn):
@@ -16,11 +21,77 @@ def roles_required(*roles):
         return decorated_view
     return wrapper
 
+# Role/permission lookups are cached per process for a short time, keyed by user id
+IDENTITY_CACHE_TTL = 60  # seconds
+_identity_cache = {}
+_identity_cache_lock = threading.Lock()
+
+
+class CachedIdentity(namedtuple('CachedIdentity', ['id', 'name', 'email', 'role'])):
+    """Lightweight, cacheable view of a manager's identity and permissions"""
+
+    @property
+    def team(self):
+        return self.role
+
+    def can_manage_team(self, team):
+        """Check if this manager can act on employees/requests of a team ('admin' or 'clinical')"""
+        return self.role == 'superadmin' or self.role == team
+
+    def can_approve_position(self, position):
+        """Check if this manager can approve requests for a specific position"""
+        return role_can_approve_position(self.role, position)
+
+
 def get_current_user():
-    """Get the current logged-in user"""
-    if 'user_id' in session:
-        return Manager.query.get(session['user_id'])
-    return None
+    """Get the current logged-in user (loaded at most once per request)"""
+    if 'user_id' not in session:
+        return None
+    if 'current_user' not in g:
+        g.current_user = db.session.get(Manager, session['user_id'])
+    return g.current_user
+
+
+def get_current_identity():
+    """
+    Get the current user's id, name, email and role without touching the database
+    when a fresh cached entry exists; None if not logged in or the manager is gone
+    """
+    if 'user_id' not in session:
+        return None
+    if 'current_identity' in g:
+        return g.current_identity
+
+    user_id = session['user_id']
+    now = time.monotonic()
+    cached = _identity_cache.get(user_id)
+    if cached is not None and cached[0] > now:
+        identity = cached[1]
+    else:
+        user = get_current_user()
+        identity = None
+        if user is not None:
+            identity = CachedIdentity(user.id, user.name, user.email, user.role)
+            with _identity_cache_lock:
+                _identity_cache[user_id] = (now + IDENTITY_CACHE_TTL, identity)
+
+    g.current_identity = identity
+    return identity
+
+
+def invalidate_identity_cache(user_id=None):
+    """Drop cached identities (one user, or everyone when user_id is None)"""
+    with _identity_cache_lock:
+        if user_id is None:
+            _identity_cache.clear()
+        else:
+            _identity_cache.pop(user_id, None)
+
+
+@event.listens_for(Manager, 'after_update')
+@event.listens_for(Manager, 'after_delete')
+def _invalidate_manager_identity(mapper, connection, target):
+    invalidate_identity_cache(target.id)
 
 def is_logged_in():
     """Check if user is logged in"""
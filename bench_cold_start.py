@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start time of app.py
+Imports the app in fresh interpreter processes (like a serverless cold start or a
+new gunicorn worker) and reports how long `import app` takes
+
+Usage: python bench_cold_start.py [runs]
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = (
+    "import logging, time\n"
+    "started = time.perf_counter()\n"
+    "import app\n"
+    "print(f'{(time.perf_counter() - started) * 1000:.1f}')\n"
+)
+
+
+def time_import(db_path):
+    """Import app.py in a new interpreter and return the import time in ms"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def seed_copy(db_path):
+    """Bring a database fully up to date the way a deploy would (seed command)"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    snippet = "import app\nwith app.app.app_context():\n    import db_init; db_init.seed_database()\n"
+    subprocess.run([sys.executable, '-c', snippet], cwd=APP_DIR, env=env, capture_output=True, check=True)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    workdir = tempfile.mkdtemp()
+    try:
+        # First start against an empty database file
+        empty_times = []
+        for i in range(runs):
+            empty_times.append(time_import(os.path.join(workdir, f'empty_{i}.db')))
+
+        # Warm starts against an initialized and seeded database
+        seeded = os.path.join(workdir, 'seeded.db')
+        seed_copy(seeded)
+        warm_times = [time_import(seeded) for _ in range(runs)]
+
+        print(f"Cold start benchmark ({runs} runs each)")
+        print("=" * 50)
+        print(f"  Empty database:   median {statistics.median(empty_times):7.1f} ms  (min {min(empty_times):.1f})")
+        print(f"  Seeded database:  median {statistics.median(warm_times):7.1f} ms  (min {min(warm_times):.1f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark: read/write throughput of each database engine profile
+Runs dashboard-style readers and call-out-style writers concurrently for a fixed
+time against a scratch database and reports operations per second per profile
+
+Usage: python bench_engine_profiles.py [seconds] [readers] [writers]
+       DATABASE_URL=postgresql://... python bench_engine_profiles.py   (adds server-db)
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+
+from flask import Flask
+
+from config import Settings
+from database import db
+from db_profiles import ENGINE_PROFILES, init_engine_profile
+from models import Position, TeamMember, PTORequest
+
+
+def create_bench_app(database_url, profile):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    init_engine_profile(app, db, replace(Settings(), database_url=database_url, db_profile=profile))
+
+    with app.app_context():
+        db.create_all()
+        position = Position(name='CVI RNs', team='clinical')
+        db.session.add(position)
+        db.session.flush()
+        for i in range(50):
+            db.session.add(TeamMember(name=f'Bench Member {i}', email=f'bench.{i}@mswcvi.com',
+                                      position_id=position.id))
+        db.session.commit()
+    return app
+
+
+def reader(app, stop, counts, errors):
+    with app.app_context():
+        while not stop.is_set():
+            try:
+                # Dashboard-style reads, bounded so results don't grow with the writers' inserts
+                PTORequest.query.filter_by(status='pending', manager_team='clinical') \
+                    .order_by(PTORequest.id.desc()).limit(50).all()
+                TeamMember.query.join(Position).limit(50).all()
+                counts['reads'] += 1
+            except Exception as e:
+                errors.append(str(e))
+            finally:
+                db.session.remove()
+
+
+def writer(app, stop, counts, errors, member_ids):
+    with app.app_context():
+        i = 0
+        while not stop.is_set():
+            try:
+                db.session.add(PTORequest(member_id=member_ids[i % len(member_ids)], start_date='2026-01-05',
+                                          end_date='2026-01-05', pto_type='Sick Leave', manager_team='clinical'))
+                db.session.commit()
+                counts['writes'] += 1
+            except Exception as e:
+                db.session.rollback()
+                errors.append(str(e))
+            finally:
+                db.session.remove()
+            i += 1
+
+
+def run_profile(database_url, profile, seconds, readers, writers):
+    app = create_bench_app(database_url, profile)
+    with app.app_context():
+        member_ids = [m.id for m in TeamMember.query.all()]
+
+    counts = {'reads': 0, 'writes': 0}
+    errors = []
+    stop = threading.Event()
+    threads = [threading.Thread(target=reader, args=(app, stop, counts, errors)) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(app, stop, counts, errors, member_ids)) for _ in range(writers)]
+
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+    return counts['reads'] / seconds, counts['writes'] / seconds, errors
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    writers = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    server_url = os.environ.get('DATABASE_URL', '')
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"Engine profile benchmark: {readers} readers + {writers} writers for {seconds:.0f}s each")
+        print("=" * 70)
+        print(f"  {'profile':<12} {'reads/s':>10} {'writes/s':>10} {'errors':>8}")
+        for profile in ENGINE_PROFILES:
+            if profile == 'server-db':
+                if not server_url or server_url.startswith('sqlite'):
+                    print(f"  {profile:<12} (skipped: set DATABASE_URL to a server database)")
+                    continue
+                database_url = server_url
+            else:
+                database_url = f"sqlite:///{os.path.join(workdir, profile + '.db')}"
+
+            reads, writes, errors = run_profile(database_url, profile, seconds, readers, writers)
+            print(f"  {profile:<12} {reads:>10.0f} {writes:>10.0f} {len(errors):>8}")
+            if errors:
+                print(f"      first error: {errors[0][:100]}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and time-to-first-byte of the streaming CSV export
+Exports scratch databases of increasing size and reports time to the first data
+chunk, total time and peak Python memory (tracemalloc, measured in a second pass)
+
+Usage: python bench_export.py [largest_row_count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from flask import Flask
+from sqlalchemy import insert
+
+from database import db
+from export import iter_export_csv, parse_export_filters
+from migrations import run_migrations
+from models import Position, PTORequest, TeamMember
+
+
+def create_bench_app(path, rows):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        run_migrations(pause=0)
+        position = Position(name='CVI RNs', team='clinical')
+        db.session.add(position)
+        db.session.flush()
+        members = [TeamMember(name=f'Bench Member {i}', email=f'bench.{i}@mswcvi.com', position_id=position.id)
+                   for i in range(50)]
+        db.session.add_all(members)
+        db.session.flush()
+        member_ids = [m.id for m in members]
+
+        for start in range(0, rows, 10000):
+            db.session.execute(insert(PTORequest.__table__), [
+                {'member_id': member_ids[i % len(member_ids)], 'start_date': '2025-03-03', 'end_date': '2025-03-05',
+                 'pto_type': 'Vacation', 'status': 'approved', 'manager_team': 'clinical', 'is_partial_day': False,
+                 'is_call_out': False, 'timekeeping_entered': True, 'coverage_arranged': True}
+                for i in range(start, min(rows, start + 10000))
+            ])
+        db.session.commit()
+    return app
+
+
+def export_once(filters):
+    started = time.perf_counter()
+    chunks = iter_export_csv(filters)
+    next(chunks)  # header
+    first_data = None
+    total_bytes = 0
+    for chunk in chunks:
+        if first_data is None:
+            first_data = time.perf_counter() - started
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - started
+    return first_data or elapsed, elapsed, total_bytes
+
+
+def measure(app):
+    with app.app_context():
+        filters = parse_export_filters()
+        first, elapsed, total_bytes = export_once(filters)
+
+        # Second pass under tracemalloc (which slows Python down) just for peak memory
+        tracemalloc.start()
+        export_once(filters)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.engine.dispose()
+    return first, elapsed, peak, total_bytes
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sizes = sorted({100, min(10000, largest), largest})
+    workdir = tempfile.mkdtemp()
+    try:
+        print("Streaming CSV export benchmark")
+        print("=" * 70)
+        print(f"  {'rows':>9} {'first chunk':>12} {'total':>9} {'peak memory':>12} {'output':>10}")
+        for rows in sizes:
+            app = create_bench_app(os.path.join(workdir, f'export_{rows}.db'), rows)
+            first, total, peak, size = measure(app)
+            print(f"  {rows:>9} {first * 1000:>10.1f}ms {total:>8.2f}s {peak / 1024 / 1024:>10.2f}MB "
+                  f"{size / 1024 / 1024:>8.1f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
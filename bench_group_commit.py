@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SMS call-out burst with and without the group-commit writer
+Simulates N call-outs arriving at once against a scratch SQLite database and
+reports throughput, per-message latency and time spent waiting on the write lock
+
+Usage: python bench_group_commit.py [messages]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy.pool import NullPool
+
+from database import db
+from models import Position, TeamMember, PTORequest
+from group_commit import GroupCommitWriter, run_write
+from twilio_service import stage_call_out_request
+
+
+def create_bench_app(db_path):
+    """Scratch app with one connection per thread, like separate gunicorn workers"""
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"poolclass": NullPool}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        position = Position(name='CVI RNs', team='clinical')
+        db.session.add(position)
+        db.session.flush()
+        for i in range(BURST_SIZE):
+            db.session.add(TeamMember(
+                name=f'Bench Member {i}',
+                email=f'bench.{i}@mswcvi.com',
+                position_id=position.id,
+                sick_balance_hours=60.0
+            ))
+        db.session.commit()
+    return app
+
+
+def call_out(app, member_id, use_writer, latencies, lock_waits, errors, barrier):
+    with app.app_context():
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            if use_writer:
+                run_write(stage_call_out_request, member_id, 'sick', f'SM{member_id}', 'sick', '+15551234567')
+            else:
+                # Baseline: every message stages and commits its own transaction
+                write_started = time.perf_counter()
+                stage_call_out_request(member_id, 'sick', f'SM{member_id}', 'sick', '+15551234567')
+                db.session.commit()
+                lock_waits.append(time.perf_counter() - write_started)
+        except Exception as e:
+            db.session.rollback()
+            errors.append(str(e))
+        finally:
+            latencies.append(time.perf_counter() - started)
+            db.session.remove()
+
+
+def run_burst(use_writer):
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        app = create_bench_app(db_path)
+        if use_writer:
+            writer = GroupCommitWriter(app)
+            app.extensions['group_commit_writer'] = writer
+
+        with app.app_context():
+            member_ids = [m.id for m in TeamMember.query.all()]
+
+        latencies, lock_waits, errors = [], [], []
+        barrier = threading.Barrier(len(member_ids))
+        threads = [
+            threading.Thread(target=call_out, args=(app, member_id, use_writer, latencies, lock_waits, errors, barrier))
+            for member_id in member_ids
+        ]
+
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with app.app_context():
+            written = PTORequest.query.count()
+
+        if use_writer:
+            # Each batch takes the write lock once; the commit time is the lock hold time
+            lock_waits = [writer.stats['commit_seconds']]
+            batches = writer.stats['batches']
+        else:
+            batches = written
+
+        return {
+            'elapsed': elapsed,
+            'written': written,
+            'errors': len(errors),
+            'batches': batches,
+            'throughput': written / elapsed if elapsed else 0.0,
+            'p50_ms': statistics.median(latencies) * 1000,
+            'p95_ms': sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000,
+            'lock_wait_ms': sum(lock_waits) * 1000,
+        }
+    finally:
+        os.remove(db_path)
+
+
+def print_results(label, results):
+    print(f"{label}")
+    print(f"  Written:            {results['written']} requests ({results['errors']} errors)")
+    print(f"  Transactions:       {results['batches']}")
+    print(f"  Elapsed:            {results['elapsed']:.3f}s")
+    print(f"  Throughput:         {results['throughput']:.0f} call-outs/s")
+    print(f"  Latency p50 / p95:  {results['p50_ms']:.1f} ms / {results['p95_ms']:.1f} ms")
+    print(f"  Write-lock wait:    {results['lock_wait_ms']:.1f} ms (summed across callers)")
+
+
+BURST_SIZE = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+if __name__ == '__main__':
+    print(f"Simulated burst of {BURST_SIZE} SMS call-outs")
+    print("=" * 50)
+    print_results("Before (one transaction per call-out):", run_burst(use_writer=False))
+    print_results("After (group-commit writer):", run_burst(use_writer=True))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Startup guard: import cost and time-to-first-request
+Runs `python -X importtime` on a fresh interpreter that imports app.py and serves
+one request, prints the most expensive imports, and exits non-zero when startup
+exceeds the budget or pulls in a dependency that should be deferred
+
+Usage: python bench_startup.py [--budget-ms 1500]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Heavy modules that must only load on first use, never at startup
+DEFERRED_MODULES = ['twilio', 'smtplib', 'email.mime.multipart', 'pytz']
+
+FIRST_REQUEST_SNIPPET = (
+    "import time\n"
+    "started = time.perf_counter()\n"
+    "import app\n"
+    "imported = time.perf_counter()\n"
+    "response = app.app.test_client().get('/login')\n"
+    "assert response.status_code == 200, response.status_code\n"
+    "finished = time.perf_counter()\n"
+    "print(f'RESULT {(imported - started) * 1000:.1f} {(finished - started) * 1000:.1f}')\n"
+)
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$')
+
+
+def run_startup(db_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', FIRST_REQUEST_SNIPPET],
+        cwd=APP_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit("Startup failed")
+
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append((module, int(cumulative_us), (len(indent) - 1) // 2))
+
+    result_line = [line for line in result.stdout.splitlines() if line.startswith('RESULT ')][-1]
+    import_ms, first_request_ms = (float(v) for v in result_line.split()[1:])
+    return imports, import_ms, first_request_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', '1500')),
+                        help='maximum time from interpreter start of `import app` to the first response')
+    parser.add_argument('--top', type=int, default=10, help='number of imports to list')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'startup.db')
+        run_startup(db_path)  # first run creates the schema
+        imports, import_ms, first_request_ms = run_startup(db_path)
+
+    loaded = {module for module, _, _ in imports}
+    # Direct imports made by app.py (depth 1 under `import app`)
+    app_imports = sorted((i for i in imports if i[2] == 1), key=lambda i: i[1], reverse=True)
+
+    print("Startup benchmark (python -X importtime)")
+    print("=" * 50)
+    print(f"  import app:          {import_ms:8.1f} ms")
+    print(f"  time to 1st request: {first_request_ms:8.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"  modules imported:    {len(loaded)}")
+    print(f"\n  Most expensive imports made by app.py:")
+    for module, cumulative_us, _ in app_imports[:args.top]:
+        print(f"    {cumulative_us / 1000:8.1f} ms  {module}")
+
+    failures = []
+    eager = [m for m in DEFERRED_MODULES if m in loaded]
+    if eager:
+        failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+    if first_request_ms > args.budget_ms:
+        failures.append(f"time to first request {first_request_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+
+    print("\nOK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
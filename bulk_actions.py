@@ -0,0 +1,117 @@
+"""
+Bulk Approve/Deny
+Applies approve/deny decisions to many requests at once: one query loads the targets
+(with their members and positions) for the permission check, then one compare-and-swap
+UPDATE per target status (see transitions.py) moves every permitted request whose status
+is still the one that was read, so a request processed by someone else in the meantime
+is reported as a conflict instead of being overwritten. Each id gets its own outcome:
+
+    ok          moved to the action's status
+    conflict    not in a status the action applies to (or changed concurrently)
+    forbidden   the manager cannot approve requests for the member's position
+    not_found   no such request
+"""
+
+from collections import namedtuple
+
+import sqlalchemy as sa
+from sqlalchemy.orm import joinedload
+
+from database import db
+from models import PTORequest, TeamMember, get_eastern_time, role_can_approve_position
+from transitions import can_transition, transition_requests
+
+MAX_BULK_IDS = 500
+
+# action -> target status (the requests it applies to follow from transitions.TRANSITIONS)
+BULK_ACTIONS = {
+    'approve': 'in_progress',
+    'deny': 'denied',
+}
+
+BulkOutcome = namedtuple('BulkOutcome', ['request_id', 'action', 'result', 'status'])
+
+
+class BulkActionError(ValueError):
+    """A bulk action payload that cannot be applied (unknown action, bad or too many ids)"""
+
+
+def parse_bulk_actions(payload):
+    """
+    {action: [ids]} from {"approve": [...], "deny": [...]} or {"action": ..., "ids": [...]}
+    An id may appear under one action only
+    """
+    payload = payload or {}
+    if 'action' in payload:
+        actions = {payload['action']: payload.get('ids')}
+    else:
+        actions = {action: payload[action] for action in BULK_ACTIONS if action in payload}
+    if not actions:
+        raise BulkActionError(f"Give request ids under {' or '.join(BULK_ACTIONS)}")
+
+    parsed, seen = {}, set()
+    for action, ids in actions.items():
+        if action not in BULK_ACTIONS:
+            raise BulkActionError(f"Unknown action {action!r} (use {', '.join(BULK_ACTIONS)})")
+        if not isinstance(ids, list):
+            raise BulkActionError(f"{action} must be a list of request ids")
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            raise BulkActionError(f"{action} must be a list of request ids")
+        both = seen.intersection(ids)
+        if both:
+            raise BulkActionError(f"Requests listed under more than one action: "
+                                  f"{', '.join(f'#{i}' for i in sorted(both))}")
+        seen.update(ids)
+        parsed[action] = ids
+
+    if len(seen) > MAX_BULK_IDS:
+        raise BulkActionError(f"At most {MAX_BULK_IDS} requests can be processed at once")
+    return parsed
+
+
+def stage_bulk_actions(role, actions, denial_reason=None, actor_id=None):
+    """
+    Apply {action: [ids]} for a manager role (actor_id: the manager, for the event log)
+    Does not commit (see group_commit.run_write)
+    Returns (outcomes in request order, ids of the requests that changed)
+    """
+    ids = [request_id for action_ids in actions.values() for request_id in action_ids]
+    targets = {
+        pto_request.id: pto_request
+        for pto_request in db.session.scalars(
+            sa.select(PTORequest)
+            .options(joinedload(PTORequest.member).joinedload(TeamMember.position))
+            .where(PTORequest.id.in_(ids))
+        )
+    }
+
+    now = get_eastern_time()
+    outcomes = {}
+    for action, action_ids in actions.items():
+        new_status = BULK_ACTIONS[action]
+        guarded = {}
+        for request_id in action_ids:
+            pto_request = targets.get(request_id)
+            if pto_request is None:
+                outcomes[request_id] = BulkOutcome(request_id, action, 'not_found', None)
+            elif not role_can_approve_position(role, pto_request.member.position):
+                outcomes[request_id] = BulkOutcome(request_id, action, 'forbidden', pto_request.status)
+            elif not can_transition(pto_request.status, new_status):
+                outcomes[request_id] = BulkOutcome(request_id, action, 'conflict', pto_request.status)
+            else:
+                guarded[request_id] = pto_request.status
+        if not guarded:
+            continue
+
+        values = {'approved_date': now} if action == 'approve' else {
+            'denial_reason': denial_reason or 'No reason provided'}
+        updated = transition_requests(guarded, new_status, actor_id=actor_id, **values)
+        for pto_request in updated:
+            outcomes[pto_request.id] = BulkOutcome(pto_request.id, action, 'ok', new_status)
+        for request_id in guarded.keys() - {pto_request.id for pto_request in updated}:
+            outcomes[request_id] = BulkOutcome(request_id, action, 'conflict', None)
+
+    changed = [request_id for request_id in ids if outcomes[request_id].result == 'ok']
+    return [outcomes[request_id] for request_id in ids], changed
@@ -0,0 +1,178 @@
+"""
+SQL Calendar Table
+Generates calendar_days (one row per date of a configurable year span) from the
+compiled holiday calendar (see holiday_calendar.py), so business-day math can run in
+the database. Each row carries a running business_day_ordinal; the business days in
+[start, end] are
+
+    end.business_day_ordinal - start.business_day_ordinal + (1 if start is a business day)
+
+which is two primary-key joins and a subtraction per request (business_days_between).
+The table is filled by a migration, a year per batch, and the stored years from the
+first changed one onward are rewritten when the holiday calendar changes; run
+`flask sync-calendar` after changing the span (CALENDAR_START_YEAR,
+CALENDAR_YEARS_AHEAD), and once a year from cron so the span keeps moving forward
+"""
+
+import logging
+from datetime import date
+
+import click
+import sqlalchemy as sa
+from flask import has_app_context
+from sqlalchemy import case, delete, func, insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased
+
+from database import db
+from holiday_calendar import get_holiday_calendar
+from models import CalendarDay, get_eastern_time
+
+logger = logging.getLogger(__name__)
+
+
+def calendar_span(settings, today=None):
+    """(first_year, last_year) covered by calendar_days"""
+    this_year = (today or get_eastern_time().date()).year
+    return settings.calendar_start_year, max(this_year, settings.calendar_start_year) + settings.calendar_years_ahead
+
+
+def calendar_rows(first_year, last_year, ordinal=0):
+    """
+    Row dicts for every date from Jan 1 of first_year through Dec 31 of last_year, read
+    from the compiled holiday calendar's bitmaps (so configured weekends are honoured);
+    business-day ordinals continue from ordinal (that of the day before first_year)
+    """
+    calendar = get_holiday_calendar()
+    for year in range(first_year, last_year + 1):
+        compiled = calendar.year(year)
+        names = calendar.holiday_names(year)
+        for offset in range(compiled.days):
+            day = date.fromordinal(compiled.first_ordinal + offset)
+            if compiled.business_bits >> offset & 1:
+                ordinal += 1
+            yield {
+                'date': day.isoformat(),
+                'is_weekend': bool(compiled.weekend_bits >> offset & 1),
+                'is_holiday': bool(compiled.holiday_bits >> offset & 1),
+                'holiday_name': names.get(day),
+                'business_day_ordinal': ordinal,
+            }
+
+
+def sync_calendar(first_year, last_year, dry_run=False):
+    """
+    Regenerate calendar_days for the span if anything differs (ordinals depend on the
+    span start, so the table is replaced as a whole in one transaction)
+    Returns {'days', 'changed', 'first_year', 'last_year'}
+    """
+    rows = list(calendar_rows(first_year, last_year))
+    columns = ('date', 'is_weekend', 'is_holiday', 'holiday_name', 'business_day_ordinal')
+    existing = {
+        row[0]: tuple(row)
+        for row in db.session.execute(select(*(CalendarDay.__table__.c[c] for c in columns)))
+    }
+    wanted = {row['date']: tuple(row[c] for c in columns) for row in rows}
+    changed = sum(1 for day in existing.keys() | wanted.keys() if existing.get(day) != wanted.get(day))
+    stats = {'days': len(rows), 'changed': changed, 'first_year': first_year, 'last_year': last_year}
+
+    if dry_run or not changed:
+        db.session.rollback()
+        return stats
+
+    db.session.execute(delete(CalendarDay.__table__))
+    db.session.execute(insert(CalendarDay.__table__), rows)
+    db.session.commit()
+    logger.info(f"Synced calendar_days for {first_year}-{last_year}", extra=stats)
+    return stats
+
+
+def write_calendar_years(first_year, last_year, session=None):
+    """
+    Rewrite the calendar_days rows of [first_year, last_year] if they differ, continuing the
+    ordinal of the stored day before first_year; returns the days changed. Does not commit
+    (the migration fills the span a year per batch, and resyncs use their own session)
+    """
+    session = session or db.session
+    table = CalendarDay.__table__
+    first_day, last_day = f'{first_year:04d}-01-01', f'{last_year:04d}-12-31'
+    ordinal = session.scalar(
+        select(table.c.business_day_ordinal).where(table.c.date < first_day).order_by(table.c.date.desc()).limit(1)
+    ) or 0
+    rows = list(calendar_rows(first_year, last_year, ordinal))
+    columns = ('date', 'is_weekend', 'is_holiday', 'holiday_name', 'business_day_ordinal')
+    existing = {
+        row[0]: tuple(row)
+        for row in session.execute(
+            select(*(table.c[c] for c in columns)).where(table.c.date.between(first_day, last_day))
+        )
+    }
+    changed = sum(1 for row in rows if existing.get(row['date']) != tuple(row[c] for c in columns))
+    if changed:
+        session.execute(delete(table).where(table.c.date.between(first_day, last_day)))
+        session.execute(insert(table), rows)
+    return changed
+
+
+def _resync_changed_years(year_ranges):
+    """
+    Holiday calendar edits: rewrite the stored years from the first changed one onward
+    (ordinals run across years, so every later year shifts too)
+    """
+    if not has_app_context():
+        logger.warning("Holiday calendar changed outside an app context; run `flask sync-calendar`")
+        return
+    try:
+        with Session(db.engine) as session:
+            table = CalendarDay.__table__
+            if not sa.inspect(session.connection()).has_table(table.name):
+                return
+            stored_first, stored_last = session.execute(select(func.min(table.c.date), func.max(table.c.date))).one()
+            if stored_first is None:
+                return
+            first_changed = min(first or int(stored_first[:4]) for first, last in year_ranges)
+            first_year, last_year = max(first_changed, int(stored_first[:4])), int(stored_last[:4])
+            if first_year > last_year:
+                return
+            changed = write_calendar_years(first_year, last_year, session)
+            session.commit()
+    except SQLAlchemyError:
+        # keep serving; the table is only refreshed, never required to change with the file
+        logger.exception("Could not resync calendar_days after a holiday calendar change; "
+                         "run `flask sync-calendar`")
+        return
+    if changed:
+        logger.info(f"Resynced calendar_days for {first_year}-{last_year} after a holiday calendar change",
+                    extra={'changed': changed})
+
+
+get_holiday_calendar().subscribe(_resync_changed_years)
+
+
+def business_days_between(query, start_column, end_column):
+    """
+    Join the calendar twice (on the start and end date columns) and return
+    (query, business day count expression); dates outside the span give NULL
+    """
+    start_day, end_day = aliased(CalendarDay), aliased(CalendarDay)
+    query = (query.outerjoin(start_day, start_day.date == start_column)
+             .outerjoin(end_day, end_day.date == end_column))
+    days = (end_day.business_day_ordinal - start_day.business_day_ordinal
+            + case((or_(start_day.is_weekend, start_day.is_holiday), 0), else_=1))
+    return query, days
+
+
+def register_calendar_commands(app, settings):
+    """Register the `flask sync-calendar` CLI command"""
+
+    @app.cli.command('sync-calendar')
+    @click.option('--start-year', type=int, help='First year (default: CALENDAR_START_YEAR).')
+    @click.option('--end-year', type=int, help='Last year (default: this year + CALENDAR_YEARS_AHEAD).')
+    @click.option('--dry-run', is_flag=True, help='Only count the days that would change.')
+    def sync_calendar_command(start_year, end_year, dry_run):
+        """Regenerate the calendar_days table used for business-day math in SQL."""
+        first_year, last_year = calendar_span(settings)
+        stats = sync_calendar(start_year or first_year, end_year or last_year, dry_run=dry_run)
+        verb = 'Would change' if dry_run else 'Changed'
+        click.echo(f"{verb} {stats['changed']} of {stats['days']} calendar days "
+                   f"({stats['first_year']}-{stats['last_year']})")
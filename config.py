@@ -0,0 +1,233 @@
+"""
+Centralized application settings
+Loaded once from the process environment and the .env file, shared by the app,
+email service and SMS service, and hot-reloaded only when .env changes or on SIGHUP
+"""
+
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, fields
+from typing import Dict, Optional, Tuple
+
+from dotenv import dotenv_values
+
+from logging_setup import parse_module_levels
+
+logger = logging.getLogger(__name__)
+
+ENV_FILE = os.environ.get('ENV_FILE', '.env')
+
+
+def _as_bool(value: Optional[str], default: bool = False) -> bool:
+    if value is None or value == '':
+        return default
+    return value.strip().lower() in ('true', '1', 'yes', 'on')
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Typed snapshot of the application configuration"""
+
+    # Flask / database
+    database_url: str = 'sqlite:///pto_tracker.db'
+    session_secret: str = 'default_secret_key_for_development'
+    template_cache_dir: str = ''
+
+    # Database engine profile (see db_profiles.py)
+    db_profile: str = 'auto'
+    db_pool_size: int = 0
+    db_max_overflow: Optional[int] = None
+    sqlite_busy_timeout_ms: int = 0
+
+    # Read replica (see replica.py)
+    replica_database_url: str = ''
+    replica_refresh_seconds: float = 5.0
+    replica_sticky_seconds: float = 10.0
+
+    # Email
+    email_enabled: bool = False
+    smtp_host: str = 'smtp.gmail.com'
+    smtp_port: int = 587
+    smtp_user: str = ''
+    smtp_password: str = ''
+    from_email: str = 'noreply@mswcvi.com'
+    admin_email: str = 'admin@mswcvi.com'
+    clinical_email: str = 'clinical@mswcvi.com'
+
+    # Twilio SMS
+    twilio_account_sid: str = ''
+    twilio_auth_token: str = ''
+    twilio_sms_number: str = ''
+    manager_admin_sms: str = ''
+    manager_clinical_sms: str = ''
+
+    # Logging
+    log_level: str = 'INFO'
+    log_levels: Tuple[Tuple[str, str], ...] = ()
+    log_format: str = 'json'
+    log_debug_sample_rate: float = 0.1
+
+    # Archival of closed requests (see archive.py)
+    archive_retention_days: int = 365
+    archive_batch_size: int = 500
+
+    # Staffing coverage heatmap cache (see coverage_matrix.py)
+    coverage_cache_seconds: float = 60.0
+
+    # In-memory "who's out" interval index (see interval_index.py)
+    interval_index_refresh_seconds: float = 30.0
+
+    # calendar_days table for business-day math in SQL (see calendar_days.py)
+    calendar_start_year: int = 2020
+    calendar_years_ahead: int = 5
+
+    # Per-employee work schedules (see work_schedules.py)
+    work_schedule_refresh_seconds: float = 60.0
+
+    # Holiday calendar definition (see holiday_calendar.py); '' = US federal holidays
+    holiday_calendar_file: str = ''
+
+    # Group-commit writer
+    group_commit_enabled: bool = True
+    group_commit_interval_ms: float = 5.0
+    group_commit_max_batch: int = 100
+
+    @classmethod
+    def from_mapping(cls, env: Dict[str, Optional[str]]) -> 'Settings':
+        """Build settings from an environment-style mapping of string values"""
+        def get(key, default=''):
+            value = env.get(key)
+            return default if value is None else value
+
+        return cls(
+            database_url=get('DATABASE_URL', cls.database_url),
+            session_secret=get('SESSION_SECRET', cls.session_secret),
+            template_cache_dir=get('TEMPLATE_CACHE_DIR'),
+            db_profile=get('DB_PROFILE', cls.db_profile).lower(),
+            db_pool_size=int(get('DB_POOL_SIZE', '0')),
+            db_max_overflow=int(get('DB_MAX_OVERFLOW')) if get('DB_MAX_OVERFLOW') else None,
+            sqlite_busy_timeout_ms=int(get('SQLITE_BUSY_TIMEOUT_MS', '0')),
+            replica_database_url=get('REPLICA_DATABASE_URL'),
+            replica_refresh_seconds=float(get('REPLICA_REFRESH_SECONDS', str(cls.replica_refresh_seconds))),
+            replica_sticky_seconds=float(get('REPLICA_STICKY_SECONDS', str(cls.replica_sticky_seconds))),
+            email_enabled=_as_bool(env.get('EMAIL_ENABLED'), cls.email_enabled),
+            smtp_host=get('SMTP_HOST', cls.smtp_host),
+            smtp_port=int(get('SMTP_PORT', str(cls.smtp_port))),
+            smtp_user=get('SMTP_USER'),
+            smtp_password=get('SMTP_PASSWORD'),
+            from_email=get('FROM_EMAIL', cls.from_email),
+            admin_email=get('ADMIN_EMAIL', cls.admin_email),
+            clinical_email=get('CLINICAL_EMAIL', cls.clinical_email),
+            twilio_account_sid=get('TWILIO_ACCOUNT_SID'),
+            twilio_auth_token=get('TWILIO_AUTH_TOKEN'),
+            twilio_sms_number=get('TWILIO_SMS_NUMBER') or get('TWILIO_PHONE_NUMBER'),
+            manager_admin_sms=get('MANAGER_ADMIN_SMS').strip(),
+            manager_clinical_sms=get('MANAGER_CLINICAL_SMS').strip(),
+            log_level=get('LOG_LEVEL', cls.log_level),
+            log_levels=parse_module_levels(get('LOG_LEVELS')),
+            log_format=get('LOG_FORMAT', cls.log_format).lower(),
+            log_debug_sample_rate=float(get('LOG_DEBUG_SAMPLE_RATE', str(cls.log_debug_sample_rate))),
+            archive_retention_days=int(get('ARCHIVE_RETENTION_DAYS', str(cls.archive_retention_days))),
+            archive_batch_size=int(get('ARCHIVE_BATCH_SIZE', str(cls.archive_batch_size))),
+            coverage_cache_seconds=float(get('COVERAGE_CACHE_SECONDS', str(cls.coverage_cache_seconds))),
+            interval_index_refresh_seconds=float(get('INTERVAL_INDEX_REFRESH_SECONDS',
+                                                     str(cls.interval_index_refresh_seconds))),
+            calendar_start_year=int(get('CALENDAR_START_YEAR', str(cls.calendar_start_year))),
+            calendar_years_ahead=int(get('CALENDAR_YEARS_AHEAD', str(cls.calendar_years_ahead))),
+            work_schedule_refresh_seconds=float(get('WORK_SCHEDULE_REFRESH_SECONDS',
+                                                    str(cls.work_schedule_refresh_seconds))),
+            holiday_calendar_file=get('HOLIDAY_CALENDAR_FILE').strip(),
+            group_commit_enabled=_as_bool(env.get('GROUP_COMMIT_ENABLED'), cls.group_commit_enabled),
+            group_commit_interval_ms=float(get('GROUP_COMMIT_INTERVAL_MS', str(cls.group_commit_interval_ms))),
+            group_commit_max_batch=int(get('GROUP_COMMIT_MAX_BATCH', str(cls.group_commit_max_batch))),
+        )
+
+    def manager_sms_for_team(self, team: Optional[str]) -> str:
+        """SMS number of the manager notified about call-outs for a team ('' if none)"""
+        if team == 'admin':
+            return self.manager_admin_sms
+        if team == 'clinical':
+            return self.manager_clinical_sms
+        return ''
+
+
+class SettingsLoader:
+    """
+    Holds the current Settings and reloads them when the .env file changes
+    Variables set in the process environment at startup take precedence over .env,
+    matching load_dotenv(); keys that only live in .env pick up edits on reload
+    """
+
+    def __init__(self, env_file: str = ENV_FILE, check_interval: float = 5.0):
+        self.env_file = env_file
+        self.check_interval = check_interval
+        self._base_env = dict(os.environ)
+        self._lock = threading.Lock()
+        self._reload_requested = False
+        self._last_check = 0.0
+        self._mtime = None
+        self._settings = None
+        self.version = 0
+
+    def get(self) -> Settings:
+        """Current settings; stats .env at most once per check_interval"""
+        now = time.monotonic()
+        if self._settings is None or self._reload_requested or now - self._last_check >= self.check_interval:
+            with self._lock:
+                self._last_check = now
+                if self._settings is None or self._reload_requested or self._env_file_mtime() != self._mtime:
+                    self._load()
+        return self._settings
+
+    def request_reload(self):
+        """Force a reload on the next get() (used by the SIGHUP handler)"""
+        self._reload_requested = True
+
+    def _env_file_mtime(self):
+        try:
+            return os.stat(self.env_file).st_mtime
+        except OSError:
+            return None
+
+    def _load(self):
+        self._mtime = self._env_file_mtime()
+        file_values = dotenv_values(self.env_file) if self._mtime is not None else {}
+
+        merged = {key: value for key, value in file_values.items() if value is not None}
+        merged.update(self._base_env)
+        settings = Settings.from_mapping(merged)
+
+        if self._settings is not None and settings != self._settings:
+            changed = [f.name for f in fields(Settings) if getattr(settings, f.name) != getattr(self._settings, f.name)]
+            logger.info(f"Settings reloaded from {self.env_file}; changed: {', '.join(changed)}")
+
+        # Keep os.environ in step for code that still reads variables directly
+        for key, value in merged.items():
+            os.environ.setdefault(key, value)
+
+        self._settings = settings
+        self._reload_requested = False
+        self.version += 1
+
+
+_loader = SettingsLoader()
+
+
+def get_settings() -> Settings:
+    """Return the shared, cached settings object"""
+    return _loader.get()
+
+
+def install_sighup_handler():
+    """Reload settings on SIGHUP (no-op on platforms without SIGHUP or off the main thread)"""
+    if not hasattr(signal, 'SIGHUP'):
+        return False
+    try:
+        signal.signal(signal.SIGHUP, lambda signum, frame: _loader.request_reload())
+    except ValueError:
+        # signal handlers can only be installed from the main thread
+        return False
+    return True
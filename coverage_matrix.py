@@ -0,0 +1,221 @@
+"""
+Staffing Coverage Matrix
+Positions x days counts of who is out (approved, in-progress and pending requests)
+for the /api/coverage heatmap. Each request adds +1 at its first day and -1 after
+its last day of a difference array, and a cumulative sum along the days turns that
+into per-day counts, so building a quarter costs one pass over the overlapping
+requests plus one cumsum. Uses NumPy when it is installed and the same algorithm in
+plain Python otherwise.
+
+Built matrices are cached per (window, team) in each worker until a committed write
+to a PTO request overlaps the window; the TTL (COVERAGE_CACHE_SECONDS) bounds how
+stale other workers' caches can get
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from itertools import accumulate
+
+import sqlalchemy as sa
+from sqlalchemy import select
+
+from business_days import BusinessDaysCalculator
+from database import db
+from holiday_calendar import get_holiday_calendar
+from models import Position, PTORequest, TeamMember
+from transitions import status_changed
+
+logger = logging.getLogger(__name__)
+
+COVERAGE_STATUSES = ('pending', 'in_progress', 'approved')
+MAX_WINDOW_DAYS = 366
+CACHE_MAX_ENTRIES = 64
+INACTIVE_NAME_PREFIX = '[INACTIVE]'
+
+CoverageMatrix = namedtuple('CoverageMatrix', ['start', 'end', 'positions', 'dates', 'business_days', 'headcount',
+                                               'out', 'pending'])
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _numpy():
+    # Imported on first use so startup doesn't pay for it (see bench_startup.py)
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def _load_intervals(start, end, team):
+    """(position_id, start offset, end offset, is_pending) for requests overlapping [start, end]"""
+    query = (
+        select(TeamMember.position_id, PTORequest.start_date, PTORequest.end_date, PTORequest.status)
+        .join(TeamMember, TeamMember.id == PTORequest.member_id)
+        .join(Position, Position.id == TeamMember.position_id)
+        .where(PTORequest.status.in_(COVERAGE_STATUSES),
+               PTORequest.start_date <= end.isoformat(),
+               PTORequest.end_date >= start.isoformat())
+    )
+    if team:
+        query = query.where(Position.team == team)
+    return db.session.execute(query).all()
+
+
+def _accumulate_numpy(np, rows, position_index, start, days, mask):
+    row_idx = np.fromiter((position_index[r.position_id] for r in rows), dtype=np.intp, count=len(rows))
+    origin = np.datetime64(start, 'D')
+    starts = (np.array([r.start_date for r in rows], dtype='datetime64[D]') - origin).astype(np.intp)
+    ends = (np.array([r.end_date for r in rows], dtype='datetime64[D]') - origin).astype(np.intp)
+    starts = np.clip(starts, 0, days)
+    ends = np.clip(ends + 1, 0, days)
+    pending = np.array([r.status == 'pending' for r in rows], dtype=np.int32)
+
+    matrices = []
+    for weights in (np.ones(len(rows), dtype=np.int32), pending):
+        diff = np.zeros((len(position_index), days + 1), dtype=np.int32)
+        np.add.at(diff, (row_idx, starts), weights)
+        np.add.at(diff, (row_idx, ends), -weights)
+        matrices.append((np.cumsum(diff[:, :days], axis=1) * np.array(mask, dtype=np.int32)).tolist())
+    return matrices
+
+
+def _accumulate_python(rows, position_index, start, days, mask):
+    out = [[0] * (days + 1) for _ in position_index]
+    pending = [[0] * (days + 1) for _ in position_index]
+    for r in rows:
+        row = position_index[r.position_id]
+        first = max(0, (date.fromisoformat(r.start_date) - start).days)
+        last = min(days, (date.fromisoformat(r.end_date) - start).days + 1)
+        targets = (out, pending) if r.status == 'pending' else (out,)
+        for matrix in targets:
+            matrix[row][first] += 1
+            matrix[row][last] -= 1
+    return [[[count * open_day for count, open_day in zip(accumulate(diff[:days]), mask)] for diff in matrix]
+            for matrix in (out, pending)]
+
+
+def build_coverage_matrix(start, end, team=None):
+    """
+    Count, per position and calendar day in [start, end], the team members out that day
+    (pending requests are also counted separately). Non-business days are reported as 0;
+    a member with two overlapping requests counts twice
+    """
+    days = (end - start).days + 1
+    positions = Position.query.order_by(Position.team, Position.name)
+    if team:
+        positions = positions.filter_by(team=team)
+    positions = positions.all()
+    position_index = {p.id: i for i, p in enumerate(positions)}
+
+    # Deleted employees with PTO history are kept, renamed '[INACTIVE] ...' (PTOSystem.delete_employee)
+    headcounts = dict(db.session.execute(
+        select(TeamMember.position_id, sa.func.count())
+        .where(TeamMember.name.not_like(f'{INACTIVE_NAME_PREFIX}%'))
+        .group_by(TeamMember.position_id)
+    ).all())
+    dates = [start + timedelta(days=i) for i in range(days)]
+    mask = [1 if BusinessDaysCalculator.is_business_day(d) else 0 for d in dates]
+
+    rows = [r for r in _load_intervals(start, end, team) if r.position_id in position_index]
+    np = _numpy()
+    if np is not None and rows:
+        out, pending = _accumulate_numpy(np, rows, position_index, start, days, mask)
+    else:
+        out, pending = _accumulate_python(rows, position_index, start, days, mask)
+
+    return CoverageMatrix(
+        start=start,
+        end=end,
+        positions=[{'id': p.id, 'name': p.name, 'team': p.team} for p in positions],
+        dates=[d.isoformat() for d in dates],
+        business_days=[bool(m) for m in mask],
+        headcount=[headcounts.get(p.id, 0) for p in positions],
+        out=out,
+        pending=pending,
+    )
+
+
+def get_coverage_matrix(start, end, team=None, ttl=60.0):
+    """Cached build_coverage_matrix; entries drop when a committed write overlaps the window"""
+    if (end - start).days + 1 > MAX_WINDOW_DAYS or end < start:
+        raise ValueError(f"Coverage window must be between 1 and {MAX_WINDOW_DAYS} days")
+
+    key = (start, end, team)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+
+    matrix = build_coverage_matrix(start, end, team=team)
+    with _cache_lock:
+        if len(_cache) >= CACHE_MAX_ENTRIES:
+            _cache.clear()
+        _cache[key] = (now, matrix)
+    return matrix
+
+
+def invalidate_coverage(start_date, end_date):
+    """Drop cached matrices whose window overlaps [start_date, end_date] ('YYYY-MM-DD' strings)"""
+    try:
+        first, last = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        first, last = date.min, date.max
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] <= last and k[1] >= first]:
+            del _cache[key]
+
+
+def _invalidate_holiday_years(year_ranges):
+    """Holiday calendar edits change the business-day row of the affected years"""
+    for first, last in year_ranges:
+        invalidate_coverage(date(first, 1, 1).isoformat() if first else date.min.isoformat(),
+                            date(last, 12, 31).isoformat() if last else date.max.isoformat())
+
+
+get_holiday_calendar().subscribe(_invalidate_holiday_years)
+
+
+# Writes are noted at flush time and only invalidate the cache once they commit
+
+def _written_ranges(pto_request):
+    """(start_date, end_date) of a request, plus its previous range if this flush moved it"""
+    yield pto_request.start_date, pto_request.end_date
+    attrs = sa.inspect(pto_request).attrs
+    old_start, old_end = attrs.start_date.history.deleted, attrs.end_date.history.deleted
+    if old_start or old_end:
+        yield (old_start[0] if old_start else pto_request.start_date,
+               old_end[0] if old_end else pto_request.end_date)
+
+
+def note_request_writes(db_session, objects):
+    """Invalidate the windows of these requests when db_session commits (also for status_changed)"""
+    touched = [dates for obj in objects if isinstance(obj, PTORequest) for dates in _written_ranges(obj)]
+    if touched:
+        db_session.info.setdefault('coverage_touched', []).extend(touched)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush')
+def _note_request_writes(db_session, flush_context):
+    note_request_writes(db_session, (*db_session.new, *db_session.dirty, *db_session.deleted))
+
+
+@status_changed.connect
+def _note_status_changes(db_session, changes):
+    note_request_writes(db_session, [change.pto_request for change in changes])
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def _invalidate_committed(db_session):
+    for start_date, end_date in db_session.info.pop('coverage_touched', ()):
+        invalidate_coverage(start_date, end_date)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def _discard_rolled_back(db_session):
+    db_session.info.pop('coverage_touched', None)
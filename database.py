@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
+from replica import RoutingSession
 
 class Base(DeclarativeBase):
     pass
 
-db = SQLAlchemy(model_class=Base)
\ No newline at end of file
+# RoutingSession sends read-only view SELECTs to the 'replica' bind when one is configured
+db = SQLAlchemy(model_class=Base, session_options={'class_': RoutingSession})
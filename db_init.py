@@ -0,0 +1,256 @@
+"""
+Database Initialization
+Fast startup check of schema/seed state (one version-row lookup), schema
+migrations (see migrations.py) and the explicit, batched seeding of default
+positions, managers and sample data
+"""
+
+import logging
+from collections import namedtuple
+
+import click
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from database import db
+from migrations import LATEST_VERSION, BackfillIncomplete, pending_migrations, run_migrations
+from models import AppMeta, Position, Manager, TeamMember, User, PTORequest
+from startup_lock import startup_lock
+from transitions import announce_created
+
+logger = logging.getLogger(__name__)
+
+# Latest migration step; add a step in migrations.py to change the schema
+SCHEMA_VERSION = LATEST_VERSION
+# Bump when the default seed data below changes
+SEED_VERSION = 1
+
+DEFAULT_POSITIONS = [
+    {'name': 'APP', 'team': 'clinical'},
+    {'name': 'CVI RNs', 'team': 'clinical'},
+    {'name': 'CVI MOAs', 'team': 'clinical'},
+    {'name': 'CVI Echo Techs', 'team': 'clinical'},
+    {'name': 'Front Desk/Admin', 'team': 'admin'},
+    {'name': 'CT Desk', 'team': 'admin'},
+]
+
+DEFAULT_MANAGERS = [
+    {'name': 'Admin Manager', 'email': 'admin.manager@mswcvi.com', 'role': 'admin', 'password': 'admin123'},
+    {'name': 'Clinical Manager', 'email': 'clinical.manager@mswcvi.com', 'role': 'clinical', 'password': 'clinical123'},
+    {'name': 'Super Admin', 'email': 'superadmin@mswcvi.com', 'role': 'superadmin', 'password': 'super123'},
+    {'name': 'MOA Supervisor', 'email': 'moa.supervisor@mswcvi.com', 'role': 'moa_supervisor', 'password': 'moa123'},
+    {'name': 'Echo Tech Supervisor', 'email': 'echo.supervisor@mswcvi.com', 'role': 'echo_supervisor', 'password': 'echo123'},
+]
+
+SAMPLE_EMPLOYEES = [
+    {'name': 'John Smith', 'email': 'john.smith@mswcvi.com', 'team': 'admin', 'position': 'Front Desk/Admin', 'pto_balance': 120.0},
+    {'name': 'Sarah Johnson', 'email': 'sarah.johnson@mswcvi.com', 'team': 'admin', 'position': 'CT Desk', 'pto_balance': 80.0},
+    {'name': 'Dr. Michael Chen', 'email': 'michael.chen@mswcvi.com', 'team': 'clinical', 'position': 'APP', 'pto_balance': 160.0},
+    {'name': 'Lisa Rodriguez', 'email': 'lisa.rodriguez@mswcvi.com', 'team': 'clinical', 'position': 'CVI RNs', 'pto_balance': 100.0},
+    {'name': 'Emily Davis', 'email': 'emily.davis@mswcvi.com', 'team': 'clinical', 'position': 'CVI MOAs', 'pto_balance': 90.0},
+    {'name': 'Robert Wilson', 'email': 'robert.wilson@mswcvi.com', 'team': 'clinical', 'position': 'CVI Echo Techs', 'pto_balance': 75.0},
+    {'name': 'Amanda Thompson', 'email': 'amanda.thompson@mswcvi.com', 'team': 'clinical', 'position': 'CVI RNs', 'pto_balance': 110.0},
+    {'name': 'David Brown', 'email': 'david.brown@mswcvi.com', 'team': 'clinical', 'position': 'CVI MOAs', 'pto_balance': 85.0},
+]
+
+# Sample PTO requests for testing the admin approval interface (only added to an empty table)
+SAMPLE_PTO_REQUESTS = [
+    {'employee_email': 'john.smith@mswcvi.com', 'start_date': '2025-09-18', 'end_date': '2025-09-23',
+     'pto_type': 'Vacation', 'reason': 'Long weekend vacation (Thu-Tue)', 'manager_team': 'admin'},
+    {'employee_email': 'sarah.johnson@mswcvi.com', 'start_date': '2025-11-27', 'end_date': '2025-11-28',
+     'pto_type': 'Personal', 'reason': 'Thanksgiving weekend', 'manager_team': 'admin'},
+    {'employee_email': 'lisa.rodriguez@mswcvi.com', 'start_date': '2025-12-24', 'end_date': '2025-12-26',
+     'pto_type': 'Vacation', 'reason': 'Christmas holiday period', 'manager_team': 'clinical'},
+    {'employee_email': 'john.smith@mswcvi.com', 'start_date': '2025-07-03', 'end_date': '2025-07-07',
+     'pto_type': 'Personal', 'reason': 'July 4th extended weekend', 'manager_team': 'admin'},
+    {'employee_email': 'emily.davis@mswcvi.com', 'start_date': '2025-09-16', 'end_date': '2025-09-16',
+     'pto_type': 'Personal', 'reason': 'Child school event', 'manager_team': 'clinical'},
+    {'employee_email': 'david.brown@mswcvi.com', 'start_date': '2025-05-26', 'end_date': '2025-05-27',
+     'pto_type': 'Vacation', 'reason': 'Memorial Day weekend', 'manager_team': 'clinical'},
+    {'employee_email': 'amanda.thompson@mswcvi.com', 'start_date': '2025-09-30', 'end_date': '2025-09-30',
+     'pto_type': 'Sick', 'reason': 'Medical appointment', 'manager_team': 'clinical'},
+]
+
+
+def read_versions():
+    """Return (schema_version, seed_version) from the single app_meta row, or (0, 0)"""
+    try:
+        row = db.session.execute(
+            select(AppMeta.schema_version, AppMeta.seed_version).where(AppMeta.id == 1)
+        ).first()
+    except (OperationalError, ProgrammingError):
+        # app_meta table does not exist yet (fresh or pre-versioning database)
+        db.session.rollback()
+        return (0, 0)
+    return (row.schema_version, row.seed_version) if row else (0, 0)
+
+
+def _get_meta():
+    meta = db.session.get(AppMeta, 1)
+    if meta is None:
+        meta = AppMeta(id=1, schema_version=0, seed_version=0)
+        db.session.add(meta)
+    return meta
+
+
+StartupState = namedtuple('StartupState', ['schema_version', 'seed_version', 'initialized'])
+
+
+def prepare_database(app):
+    """
+    Startup path: one version-row lookup when the database is current
+    Only runs create_all when the schema version is missing or outdated, and only in
+    the worker that wins the startup lock; never seeds
+    """
+    with app.app_context():
+        schema_version, seed_version = read_versions()
+        initialized = False
+
+        if schema_version < SCHEMA_VERSION:
+            with startup_lock(db.engine) as acquired:
+                # Re-check under the lock: another worker may have just finished
+                if acquired and read_versions()[0] < SCHEMA_VERSION:
+                    # Create tables if they don't exist (but don't drop existing data),
+                    # then bring existing tables up to date
+                    db.create_all()
+                    run_migrations()
+                    _get_meta().schema_version = SCHEMA_VERSION
+                    db.session.commit()
+                    initialized = True
+                    logger.info(f"Database schema created/updated to version {SCHEMA_VERSION}")
+
+        if seed_version < SEED_VERSION:
+            logger.warning("Database has not been seeded; run `flask --app app seed-db` to add default data")
+
+        return StartupState(schema_version, seed_version, initialized)
+
+
+def seed_database(include_samples=True):
+    """
+    Insert default positions, managers, sample employees and sample requests
+    Existing rows are looked up in one query per table and everything is committed once
+    """
+    from werkzeug.security import generate_password_hash
+
+    db.create_all()
+
+    # Positions
+    existing_positions = {p.name: p for p in Position.query.all()}
+    for pos_data in DEFAULT_POSITIONS:
+        if pos_data['name'] not in existing_positions:
+            new_pos = Position(name=pos_data['name'], team=pos_data['team'])
+            db.session.add(new_pos)
+            existing_positions[new_pos.name] = new_pos
+
+    # Managers and employees share the users.email uniqueness constraint
+    seed_emails = [m['email'] for m in DEFAULT_MANAGERS]
+    if include_samples:
+        seed_emails += [e['email'] for e in SAMPLE_EMPLOYEES]
+    existing_emails = set(db.session.scalars(select(User.email).where(User.email.in_(seed_emails))))
+
+    # Password hashing is deliberately slow, so only hash for managers that are missing
+    for manager_data in DEFAULT_MANAGERS:
+        if manager_data['email'] not in existing_emails:
+            db.session.add(Manager(
+                name=manager_data['name'],
+                email=manager_data['email'],
+                role=manager_data['role'],
+                password_hash=generate_password_hash(manager_data['password'])
+            ))
+
+    added_requests = 0
+    if include_samples:
+        db.session.flush()  # Assign position IDs
+
+        for emp_data in SAMPLE_EMPLOYEES:
+            position = existing_positions.get(emp_data['position'])
+            if emp_data['email'] not in existing_emails and position and position.team == emp_data['team']:
+                db.session.add(TeamMember(
+                    name=emp_data['name'],
+                    email=emp_data['email'],
+                    position_id=position.id,
+                    pto_balance_hours=emp_data['pto_balance']
+                ))
+
+        # Only add sample requests to an empty table so restarts never duplicate them
+        if PTORequest.query.count() == 0:
+            db.session.flush()  # Assign member IDs
+            sample_emails = {r['employee_email'] for r in SAMPLE_PTO_REQUESTS}
+            member_ids = dict(db.session.execute(
+                select(TeamMember.email, TeamMember.id).where(TeamMember.email.in_(sample_emails))
+            ).all())
+
+            samples = []
+            for pto_data in SAMPLE_PTO_REQUESTS:
+                member_id = member_ids.get(pto_data['employee_email'])
+                if member_id:
+                    samples.append(PTORequest(
+                        member_id=member_id,
+                        start_date=pto_data['start_date'],
+                        end_date=pto_data['end_date'],
+                        pto_type=pto_data['pto_type'],
+                        reason=pto_data['reason'],
+                        manager_team=pto_data['manager_team'],
+                        status='pending'
+                    ))
+            db.session.add_all(samples)
+            db.session.flush()  # Assign request IDs for the event log
+            announce_created(samples)
+            added_requests = len(samples)
+
+    meta = _get_meta()
+    meta.schema_version = max(meta.schema_version or 0, SCHEMA_VERSION)
+    meta.seed_version = SEED_VERSION
+    db.session.commit()
+
+    logger.info(f"Database seeded (seed version {SEED_VERSION}, {added_requests} sample PTO requests added)")
+    return added_requests
+
+
+def register_db_commands(app):
+    """Register `flask init-db`, `flask migrate-db` and `flask seed-db` CLI commands"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables, apply migrations and record the schema version."""
+        with startup_lock(db.engine, blocking=True) as acquired:
+            if not acquired:
+                raise click.ClickException("Timed out waiting for another process to initialize the schema")
+            db.create_all()
+            run_migrations()
+            _get_meta().schema_version = SCHEMA_VERSION
+            db.session.commit()
+        click.echo(f"Database schema at version {SCHEMA_VERSION}")
+
+    @app.cli.command('migrate-db')
+    @click.option('--batch-size', default=500, show_default=True, help='Rows per backfill transaction.')
+    @click.option('--pause-ms', default=50.0, show_default=True, help='Pause between backfill batches.')
+    @click.option('--max-batches', type=int, default=None, help='Stop each backfill after this many batches.')
+    @click.option('--list', 'list_only', is_flag=True, help='Only list pending migrations.')
+    def migrate_db_command(batch_size, pause_ms, max_batches, list_only):
+        """Apply pending schema migrations (resumable, batched backfills)."""
+        if list_only:
+            for step in pending_migrations():
+                click.echo(f"{step.version:>4}  {step.name}")
+            return
+
+        with startup_lock(db.engine, blocking=True, timeout=600) as acquired:
+            if not acquired:
+                raise click.ClickException("Timed out waiting for another migration to finish")
+            try:
+                applied = run_migrations(batch_size=batch_size, pause=pause_ms / 1000, max_batches=max_batches)
+            except BackfillIncomplete as e:
+                raise click.ClickException(str(e))
+            _get_meta().schema_version = SCHEMA_VERSION
+            db.session.commit()
+        click.echo(f"Applied {len(applied)} migration(s); schema at version {SCHEMA_VERSION}")
+
+    @app.cli.command('seed-db')
+    @click.option('--no-samples', is_flag=True, help='Only seed positions and default managers.')
+    def seed_db_command(no_samples):
+        """Seed default positions, managers and sample data."""
+        with startup_lock(db.engine, name='seed', blocking=True) as acquired:
+            if not acquired:
+                raise click.ClickException("Timed out waiting for another seeding process")
+            added_requests = seed_database(include_samples=not no_samples)
+        click.echo(f"Database seeded ({added_requests} sample PTO requests added)")
@@ -0,0 +1,106 @@
+"""
+Database Engine Profiles
+Named SQLAlchemy engine configurations selected with DB_PROFILE:
+
+- dev:         previous defaults (pool_recycle/pool_pre_ping), SQLite left as-is
+- sqlite-prod: SQLite in WAL mode with busy_timeout, mmap, page cache and
+               synchronous=NORMAL applied on every new connection
+- server-db:   PostgreSQL/MySQL connection pool sizing
+- auto:        sqlite-prod for sqlite:// URLs, server-db for everything else
+"""
+
+import logging
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+ENGINE_PROFILES = {
+    'dev': {
+        'engine_options': {
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+        },
+        'sqlite_pragmas': {},
+    },
+    'sqlite-prod': {
+        'engine_options': {},
+        'sqlite_pragmas': {
+            'journal_mode': 'WAL',       # readers no longer block the writer (and vice versa)
+            'busy_timeout': 5000,        # ms to wait for the write lock instead of failing
+            'synchronous': 'NORMAL',     # safe with WAL; fsync at checkpoints, not every commit
+            'mmap_size': 268435456,      # 256 MB memory-mapped reads
+            'cache_size': -65536,        # 64 MB page cache (negative = KiB)
+            'temp_store': 'MEMORY',
+        },
+    },
+    'server-db': {
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+        },
+        'sqlite_pragmas': {},
+    },
+}
+
+
+def resolve_profile_name(profile_name, database_url):
+    """Map 'auto' (or an empty value) to a concrete profile for the database URL"""
+    if not profile_name or profile_name == 'auto':
+        return 'sqlite-prod' if database_url.startswith('sqlite') else 'server-db'
+    if profile_name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile_name}' (choose from: auto, {', '.join(ENGINE_PROFILES)})")
+    return profile_name
+
+
+def get_engine_profile(settings):
+    """
+    Return (name, engine_options, sqlite_pragmas) for the configured profile,
+    with pool sizes and pragmas overridable from settings
+    """
+    name = resolve_profile_name(settings.db_profile, settings.database_url)
+    profile = ENGINE_PROFILES[name]
+    engine_options = dict(profile['engine_options'])
+    pragmas = dict(profile['sqlite_pragmas'])
+
+    if 'pool_size' in engine_options:
+        engine_options['pool_size'] = settings.db_pool_size or engine_options['pool_size']
+        engine_options['max_overflow'] = settings.db_max_overflow if settings.db_max_overflow is not None else engine_options['max_overflow']
+    if 'busy_timeout' in pragmas and settings.sqlite_busy_timeout_ms:
+        pragmas['busy_timeout'] = settings.sqlite_busy_timeout_ms
+
+    return name, engine_options, pragmas
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Apply PRAGMA statements to every new DBAPI connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def init_engine_profile(app, db, settings):
+    """Configure SQLALCHEMY_ENGINE_OPTIONS, initialize Flask-SQLAlchemy and install pragmas"""
+    name, engine_options, pragmas = get_engine_profile(settings)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+    app.config['DB_PROFILE'] = name
+    db.init_app(app)
+
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, pragmas)
+        # Connections opened before the listener existed would miss the pragmas
+        db.engine.dispose()
+
+    logger.info(f"Database engine profile '{name}'", extra={'engine_options': engine_options, 'sqlite_pragmas': pragmas})
+    return name
@@ -2,41 +2,79 @@
 Enhanced email service with HTML email support for PTO notifications
 """
 
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import os
 import logging
+import threading
+from contextlib import contextmanager
+from config import get_settings
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class EmailService:
     """Service for sending PTO-related email notifications"""
 
-    def __init__(self):
-        """Initialize email service with configuration from environment variables"""
-        self.enabled = os.getenv('EMAIL_ENABLED', 'False').lower() == 'true'
-        self.smtp_host = os.getenv('SMTP_HOST', 'smtp.gmail.com')
-        self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        self.smtp_user = os.getenv('SMTP_USER', '')
-        self.smtp_password = os.getenv('SMTP_PASSWORD', '')
-        self.from_email = os.getenv('FROM_EMAIL', 'noreply@mswcvi.com')
-        self.admin_email = os.getenv('ADMIN_EMAIL', 'admin@mswcvi.com')
-        self.clinical_email = os.getenv('CLINICAL_EMAIL', 'clinical@mswcvi.com')
+    def __init__(self, settings=None):
+        """Initialize email service from the shared application settings"""
+        settings = settings or get_settings()
+        self.enabled = settings.email_enabled
+        self.smtp_host = settings.smtp_host
+        self.smtp_port = settings.smtp_port
+        self.smtp_user = settings.smtp_user
+        self.smtp_password = settings.smtp_password
+        self.from_email = settings.from_email
+        self.admin_email = settings.admin_email
+        self.clinical_email = settings.clinical_email
+        # Open SMTP connection shared by send_email calls inside smtp_session() (per thread)
+        self._session = threading.local()
+
+    def _connect(self):
+        import smtplib
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        try:
+            server.starttls()
+            if self.smtp_user and self.smtp_password:
+                server.login(self.smtp_user, self.smtp_password)
+        except Exception:
+            # Don't leak the socket when the handshake or authentication fails
+            server.close()
+            raise
+        return server
+
+    @contextmanager
+    def smtp_session(self):
+        """Send every email inside the block over one SMTP connection (e.g. bulk approvals)"""
+        if not self.enabled or getattr(self._session, 'server', None) is not None:
+            yield
+            return
+        try:
+            self._session.server = self._connect()
+        except Exception as e:
+            # Each send_email call will try its own connection (and log its own failure)
+            logger.error(f"Failed to open SMTP session: {str(e)}")
+            yield
+            return
+        try:
+            yield
+        finally:
+            server, self._session.server = self._session.server, None
+            try:
+                server.quit()
+            except Exception:
+                pass
 
     def send_email(self, to_email, subject, body_html=None, body_text=None):
         """Send email via SMTP with HTML support"""
         if not self.enabled:
             # Console fallback for testing/debugging
-            logger.info("EMAIL NOTIFICATION (Console Mode - Email Disabled)")
-            logger.info(f"TO: {to_email}")
-            logger.info(f"SUBJECT: {subject}")
-            logger.info(f"BODY: {body_text or 'See HTML version'}")
-            logger.info("-" * 50)
+            logger.info("EMAIL NOTIFICATION (Console Mode - Email Disabled)",
+                        extra={'email_to': to_email, 'email_subject': subject})
+            logger.debug("Email body", extra={'email_to': to_email, 'email_body': body_text or 'See HTML version'})
             return True
 
+        # Deferred imports: only needed when email is actually enabled
+        import smtplib
+        from email.mime.text import MIMEText
+        from email.mime.multipart import MIMEMultipart
+
         try:
             # Create message
             msg = MIMEMultipart('alternative')
@@ -53,12 +91,21 @@ class EmailService:
                 part2 = MIMEText(body_html, 'html')
                 msg.attach(part2)
 
-            # Send email via SMTP
-            with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
-                server.starttls()
-                if self.smtp_user and self.smtp_password:
-                    server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
+            # Send email via SMTP (over the open smtp_session connection, if any)
+            session_server = getattr(self._session, 'server', None)
+            if session_server is not None:
+                try:
+                    session_server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # The shared connection dropped (e.g. a server idle timeout mid-batch);
+                    # reconnect once and resend, so the rest of the batch isn't lost
+                    logger.warning("SMTP session disconnected; reconnecting")
+                    session_server.close()
+                    self._session.server = self._connect()
+                    self._session.server.send_message(msg)
+            else:
+                with self._connect() as server:
+                    server.send_message(msg)
 
             logger.info(f"Email sent successfully to {to_email}")
             return True
@@ -262,6 +309,90 @@ class EmailService:
 
         return True
 
+    def send_batch_submission_email(self, pto_requests, skipped=(), duplicates=()):
+        """Send one summary to the employee and one to the manager for a recurring/multi-range submission"""
+        first = pto_requests[0]
+        employee_name = first.member.name
+        total_hours = sum(r.duration_hours for r in pto_requests)
+        request_ids = ', '.join(f"#{r.id}" for r in pto_requests)
+
+        rows_html = ''.join(
+            f"<tr><td>#{r.id}</td><td>{r.start_date}</td><td>{r.end_date}</td>"
+            f"<td>{r.start_time + '-' + r.end_time if r.is_partial_day else 'Full day'}</td>"
+            f"<td>{r.duration_hours:g}</td></tr>"
+            for r in pto_requests
+        )
+        rows_text = '\n'.join(
+            f"        - #{r.id}: {r.start_date}" + (f" to {r.end_date}" if r.end_date != r.start_date else '') +
+            (f" ({r.start_time}-{r.end_time})" if r.is_partial_day else '') + f", {r.duration_hours:g} hours"
+            for r in pto_requests
+        )
+        notes = []
+        if skipped:
+            notes.append(f"Not requested (weekend/holiday): {', '.join(skipped)}")
+        if duplicates:
+            notes.append(f"Already submitted: {', '.join(duplicates)}")
+        notes_html = ''.join(f"<p style=\"color: #6c757d;\">{note}</p>" for note in notes)
+        notes_text = '\n'.join(f"        {note}" for note in notes)
+
+        def body_html(title, intro):
+            return f"""
+        <html>
+            <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
+                <div style="background-color: #17a2b8; color: white; padding: 20px; text-align: center;">
+                    <h2>{title}</h2>
+                </div>
+
+                <div style="padding: 20px; background-color: #f8f9fa;">
+                    <p>{intro}</p>
+
+                    <div style="background-color: white; padding: 15px; margin: 20px 0; border-left: 4px solid #17a2b8;">
+                        <h3 style="margin-top: 0;">{len(pto_requests)} Requests ({first.pto_type}, {total_hours:g} hours):</h3>
+                        <table style="width: 100%; border-collapse: collapse;">
+                            <tr><th align="left">ID</th><th align="left">Start</th><th align="left">End</th><th align="left">Time</th><th align="left">Hours</th></tr>
+                            {rows_html}
+                        </table>
+                        <p><strong>Reason:</strong> {first.reason}</p>
+                    </div>
+                    {notes_html}
+
+                    <p>Thank you,<br>PTO Management System</p>
+                </div>
+
+                <div style="background-color: #e9ecef; padding: 10px; text-align: center; font-size: 12px;">
+                    <p>This is an automated message. Please do not reply to this email.</p>
+                </div>
+            </body>
+        </html>
+        """
+
+        def body_text(intro):
+            return f"""
+        {intro}
+
+        {len(pto_requests)} Requests ({first.pto_type}, {total_hours:g} hours):
+{rows_text}
+        - Reason: {first.reason}
+{notes_text}
+
+        Thank you,
+        PTO Management System
+        """
+
+        # 1. Employee confirmation
+        employee_intro = (f"Dear {employee_name}, your {len(pto_requests)} PTO requests have been submitted "
+                          f"and are pending manager approval.")
+        self.send_email(first.member.email, f"PTO Requests Submitted - {request_ids}",
+                        body_html('PTO Requests Confirmation', employee_intro), body_text(employee_intro))
+
+        # 2. Manager notification
+        manager_email = self.admin_email if first.manager_team == 'admin' else self.clinical_email
+        manager_intro = (f"{employee_name} ({first.manager_team}) submitted {len(pto_requests)} PTO requests "
+                         f"that require your attention.")
+        return self.send_email(manager_email, f"New PTO Requests ({len(pto_requests)}) - {employee_name}",
+                               body_html('New PTO Requests Pending Approval', manager_intro),
+                               body_text(manager_intro))
+
     def send_approval_email(self, pto_request):
         """Send email notification when PTO request is approved"""
 
@@ -0,0 +1,185 @@
+"""
+Streaming PTO Export
+CSV export of live and archived PTO requests (through the pto_requests_all view)
+for /export/pto.csv and `flask export-pto`. Rows are fetched with a server-side
+cursor (stream_results + yield_per) and written out one partition at a time, so
+memory stays flat regardless of row count and the header goes out before the
+query has finished
+"""
+
+import csv
+import io
+from collections import namedtuple
+from datetime import datetime
+
+import click
+from sqlalchemy import select
+
+from database import db
+from models import Position, PTODurationMixin, PTORequestHistory, TeamMember
+from work_schedules import scheduled_hours
+
+EXPORT_BATCH_SIZE = 1000
+# Business-day counts memoized per (start_date, end_date) during one export; cleared when full
+DURATION_CACHE_SIZE = 4096
+
+EXPORT_HEADER = ['Request ID', 'Employee', 'Email', 'Team', 'Position', 'PTO Type', 'Status',
+                 'Start Date', 'End Date', 'Partial Day', 'Start Time', 'End Time', 'Days', 'Hours',
+                 'Call Out', 'Timekeeping Entered', 'Coverage Arranged', 'Submitted At', 'Archived']
+
+ExportFilters = namedtuple('ExportFilters', ['start_date', 'end_date', 'team', 'position', 'statuses', 'pto_type'])
+
+
+def _parse_date(value, name):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def parse_export_filters(start_date=None, end_date=None, team=None, position=None, status=None, pto_type=None):
+    """Validate raw filter values (status may be comma-separated); raises ValueError"""
+    statuses = tuple(s.strip() for s in (status or '').split(',') if s.strip())
+    return ExportFilters(
+        start_date=_parse_date(start_date, 'start_date'),
+        end_date=_parse_date(end_date, 'end_date'),
+        team=team or None,
+        position=position or None,
+        statuses=statuses,
+        pto_type=pto_type or None,
+    )
+
+
+def build_export_query(filters):
+    """Column-only SELECT (no ORM objects) over live and archived requests"""
+    requests = PTORequestHistory
+    query = (
+        select(requests.id, requests.member_id, TeamMember.name.label('employee'), TeamMember.email, Position.team,
+               Position.name.label('position'), requests.pto_type, requests.status, requests.start_date,
+               requests.end_date, requests.is_partial_day, requests.start_time, requests.end_time,
+               requests.is_call_out, requests.timekeeping_entered, requests.coverage_arranged,
+               requests.submitted_at, requests.is_archived)
+        .join(TeamMember, TeamMember.id == requests.member_id)
+        .join(Position, Position.id == TeamMember.position_id)
+        .order_by(requests.start_date, requests.id)
+    )
+
+    # Date range: requests overlapping [start_date, end_date]
+    if filters.start_date:
+        query = query.where(requests.end_date >= filters.start_date)
+    if filters.end_date:
+        query = query.where(requests.start_date <= filters.end_date)
+    if filters.team:
+        query = query.where(Position.team == filters.team)
+    if filters.position:
+        query = query.where(Position.name == filters.position)
+    if filters.statuses:
+        query = query.where(requests.status.in_(filters.statuses))
+    if filters.pto_type:
+        query = query.where(requests.pto_type == filters.pto_type)
+    return query
+
+
+class _RowDurations(PTODurationMixin):
+    """Lets a result row use the model's duration helpers"""
+    __slots__ = ('_row',)
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getattr__(self, name):
+        return getattr(self._row, name)
+
+
+def _durations(row, cache):
+    # Many requests share the same date range; the business-day count is the costly part
+    key = (row.start_date, row.end_date)
+    days = cache.get(key)
+    if days is None:
+        if len(cache) >= DURATION_CACHE_SIZE:
+            cache.clear()
+        days = cache[key] = _RowDurations(row).duration_days
+    if row.is_partial_day:
+        return days, _RowDurations(row).duration_hours
+    hours = scheduled_hours(row.member_id, row.start_date, row.end_date)
+    return days, days * 7.5 if hours is None else hours
+
+
+def _csv_record(row, duration_cache):
+    days, hours = _durations(row, duration_cache)
+    return [
+        row.id, row.employee, row.email, row.team, row.position, row.pto_type, row.status,
+        row.start_date, row.end_date, 'Yes' if row.is_partial_day else 'No', row.start_time or '',
+        row.end_time or '', days, hours,
+        'Yes' if row.is_call_out else 'No', 'Yes' if row.timekeeping_entered else 'No',
+        'Yes' if row.coverage_arranged else 'No',
+        row.submitted_at.strftime('%Y-%m-%d %H:%M') if row.submitted_at else '',
+        'Yes' if row.is_archived else 'No',
+    ]
+
+
+def iter_export_csv(filters, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield the CSV export in chunks: the header first, then one chunk per fetched partition
+    Must be consumed inside an app context (use stream_with_context in views)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    duration_cache = {}
+
+    def drain():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(EXPORT_HEADER)
+    yield drain()
+
+    query = build_export_query(filters)
+    # Same routing as the session (replica inside read-only views), on a dedicated
+    # connection so the cursor stays open while the response streams
+    engine = db.session.get_bind(clause=query)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for partition in result.partitions():
+            writer.writerows(_csv_record(row, duration_cache) for row in partition)
+            yield drain()
+
+
+def export_filename(filters):
+    parts = ['pto']
+    if filters.team:
+        parts.append(filters.team)
+    if filters.start_date or filters.end_date:
+        parts.append(f"{filters.start_date or 'start'}_to_{filters.end_date or 'end'}")
+    return '-'.join(parts) + '.csv'
+
+
+def register_export_commands(app):
+    """Register the `flask export-pto` CLI command"""
+
+    @app.cli.command('export-pto')
+    @click.option('--output', '-o', default='-', show_default=True, help='CSV file to write (- for stdout).')
+    @click.option('--start-date', help='Only requests ending on or after this date (YYYY-MM-DD).')
+    @click.option('--end-date', help='Only requests starting on or before this date (YYYY-MM-DD).')
+    @click.option('--team', type=click.Choice(['admin', 'clinical']))
+    @click.option('--position', help='Position name, e.g. "CVI RNs".')
+    @click.option('--status', help='Status or comma-separated statuses.')
+    @click.option('--type', 'pto_type', help='PTO type, e.g. "Vacation".')
+    def export_pto_command(output, start_date, end_date, team, position, status, pto_type):
+        """Stream PTO requests (live and archived) as CSV."""
+        try:
+            filters = parse_export_filters(start_date, end_date, team, position, status, pto_type)
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+        if output == '-':
+            for chunk in iter_export_csv(filters):
+                click.echo(chunk, nl=False)
+            return
+        # newline='' because the csv module writes its own \r\n line endings
+        with open(output, 'w', encoding='utf-8', newline='') as f:
+            for chunk in iter_export_csv(filters):
+                f.write(chunk)
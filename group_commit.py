@@ -0,0 +1,155 @@
+"""
+Group-Commit Writer for PTO Submissions and Call-Outs
+Batches concurrent write jobs into one transaction so a burst of call-outs
+takes the SQLite write lock once per batch instead of once per message
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from flask import current_app
+from database import db
+from replica import note_primary_write
+
+logger = logging.getLogger(__name__)
+
+
+class WriteTimeout(TimeoutError):
+    """A queued write job was cancelled before it started, so nothing was written"""
+
+
+class GroupCommitWriter:
+    """Single writer thread that commits queued write jobs together"""
+
+    def __init__(self, app, flush_interval=0.005, max_batch_size=100, result_timeout=30.0):
+        """
+        flush_interval: seconds to wait for more jobs after the first one arrives
+        max_batch_size: maximum number of jobs committed in one transaction
+        result_timeout: seconds a caller waits for its job to start (a job already
+                        running is always waited for, since it may still commit)
+        """
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.result_timeout = result_timeout
+        self.stats = {'batches': 0, 'jobs': 0, 'fallbacks': 0, 'commit_seconds': 0.0}
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, job, *args, **kwargs):
+        """
+        Queue a write job and return a Future resolved with the job's return value
+        Jobs stage their changes on db.session and must not commit themselves
+        """
+        future = Future()
+        self._ensure_started()
+        self._queue.put((job, args, kwargs, future))
+        return future
+
+    def _ensure_started(self):
+        """Start the writer thread on first use (and again in forked workers)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Collect whatever else arrives within the flush window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            batch = [item for item in batch if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            with self.app.app_context():
+                try:
+                    self._commit_batch(batch)
+                finally:
+                    db.session.remove()
+
+    def _commit_batch(self, batch):
+        """Run every job and commit once; fall back to one transaction per job on failure"""
+        started = time.perf_counter()
+        try:
+            results = [job(*args, **kwargs) for job, args, kwargs, _ in batch]
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.stats['fallbacks'] += 1
+            logger.warning(f"Group commit of {len(batch)} jobs failed ({str(e)}), retrying individually")
+            self._commit_individually(batch)
+            return
+
+        self.stats['batches'] += 1
+        self.stats['jobs'] += len(batch)
+        self.stats['commit_seconds'] += time.perf_counter() - started
+
+        for (_, _, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _commit_individually(self, batch):
+        for job, args, kwargs, future in batch:
+            try:
+                result = job(*args, **kwargs)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                future.set_exception(e)
+            else:
+                self.stats['batches'] += 1
+                self.stats['jobs'] += 1
+                future.set_result(result)
+
+
+def run_write(job, *args, **kwargs):
+    """
+    Run a write job through the app's group-commit writer and return its result
+    Falls back to running the job inline with its own commit when the writer is disabled
+    Raises WriteTimeout if the job was still queued after result_timeout (it is cancelled)
+    """
+    writer = current_app.extensions.get('group_commit_writer')
+    # Later reads in this request (and the redirect after it) must see the write
+    note_primary_write()
+
+    if writer is None:
+        try:
+            result = job(*args, **kwargs)
+            db.session.commit()
+            return result
+        except Exception:
+            db.session.rollback()
+            raise
+
+    future = writer.submit(job, *args, **kwargs)
+    try:
+        result = future.result(timeout=writer.result_timeout)
+    except FutureTimeout:
+        # A job the writer hasn't picked up yet is cancelled (the writer skips it); one that
+        # is already running may still commit, so its outcome is waited for, not reported as failed
+        if future.cancel():
+            raise WriteTimeout("The server is busy and the request was not saved; please try again")
+        logger.warning(f"Write job {getattr(job, '__name__', job)} exceeded {writer.result_timeout}s; "
+                       f"waiting for it to finish")
+        result = future.result()
+
+    # The writer committed on its own session; drop anything stale in ours
+    db.session.expire_all()
+    return result
@@ -0,0 +1,351 @@
+"""
+Holiday Calendar
+Holidays are defined as data (rules plus explicit dates) instead of code, and compiled
+once per year into integer bitmaps (bit i = day i of the year) that every
+BusinessDaysCalculator method reads: a business-day test is a shift and a mask, and a
+count over any range is a popcount per year touched.
+
+Definition format (JSON, see holiday_calendar.example.json; HOLIDAY_CALENDAR_FILE):
+
+    {
+      "weekend": ["SA", "SU"],
+      "observed": {"SA": -1, "SU": 1},
+      "rules": [
+        {"name": "Independence Day", "month": 7, "day": 4},
+        {"name": "Thanksgiving", "month": 11, "weekday": "TH", "nth": 4},
+        {"name": "Day after Thanksgiving", "month": 11, "weekday": "TH", "nth": 4,
+         "offset_days": 1, "start_year": 2026}
+      ],
+      "dates": [{"date": "2026-12-24", "name": "Christmas Eve (closure)"}]
+    }
+
+A rule is either a fixed month/day or the nth weekday of a month (nth -1 = last),
+optionally shifted by offset_days and limited to start_year..end_year. A rule date that
+falls on a weekend day listed in "observed" moves by that many days (Saturday holidays
+are observed on Friday, Sunday ones on Monday) unless the rule sets "observed": false;
+the shift may cross into the neighbouring year. Explicit dates are taken as-is.
+
+The file is re-read when its modification time changes; only the years touched by the
+edited rules or dates are recompiled, and subscribers (caches of business-day results
+and the calendar_days table) are told which years changed
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# US federal holidays with the federal observed-date rule; used when no file is configured
+DEFAULT_DEFINITION = {
+    'weekend': ['SA', 'SU'],
+    'observed': {'SA': -1, 'SU': 1},
+    'rules': [
+        {'name': "New Year's Day", 'month': 1, 'day': 1},
+        {'name': 'Martin Luther King Jr. Day', 'month': 1, 'weekday': 'MO', 'nth': 3},
+        {'name': "Presidents' Day", 'month': 2, 'weekday': 'MO', 'nth': 3},
+        {'name': 'Memorial Day', 'month': 5, 'weekday': 'MO', 'nth': -1},
+        {'name': 'Independence Day', 'month': 7, 'day': 4},
+        {'name': 'Labor Day', 'month': 9, 'weekday': 'MO', 'nth': 1},
+        {'name': 'Columbus Day', 'month': 10, 'weekday': 'MO', 'nth': 2},
+        {'name': 'Veterans Day', 'month': 11, 'day': 11},
+        {'name': 'Thanksgiving', 'month': 11, 'weekday': 'TH', 'nth': 4},
+        {'name': 'Christmas Day', 'month': 12, 'day': 25},
+    ],
+    'dates': [],
+}
+
+# One compiled year: bitmaps are ints with bit i set for date(year, 1, 1) + i days
+CompiledYear = namedtuple('CompiledYear', ['year', 'first_ordinal', 'days', 'weekend_bits', 'holiday_bits',
+                                           'business_bits', 'weekday_bits', 'names'])
+
+
+class HolidayCalendarError(ValueError):
+    """The holiday calendar definition is malformed"""
+
+
+def _weekday(value, where):
+    try:
+        return WEEKDAYS.index(str(value).upper())
+    except ValueError:
+        raise HolidayCalendarError(f"{where}: unknown weekday {value!r} (use one of {', '.join(WEEKDAYS)})")
+
+
+def validate_definition(definition):
+    """Normalize a definition dict (filling defaults) or raise HolidayCalendarError"""
+    if not isinstance(definition, dict):
+        raise HolidayCalendarError("Holiday calendar must be a JSON object")
+    weekend = sorted({_weekday(day, 'weekend') for day in definition.get('weekend', ['SA', 'SU'])})
+    observed = {}
+    for day, shift in (definition.get('observed') or {}).items():
+        observed[_weekday(day, 'observed')] = int(shift)
+
+    rules = []
+    for i, rule in enumerate(definition.get('rules', [])):
+        where = f"rules[{i}] ({rule.get('name', 'unnamed')})"
+        if not rule.get('name') or not 1 <= int(rule.get('month', 0)) <= 12:
+            raise HolidayCalendarError(f"{where}: needs a name and a month 1-12")
+        if ('day' in rule) == ('weekday' in rule):
+            raise HolidayCalendarError(f"{where}: give either day or weekday + nth")
+        if 'weekday' in rule:
+            _weekday(rule['weekday'], where)
+            if int(rule.get('nth', 0)) not in (-1, 1, 2, 3, 4, 5):
+                raise HolidayCalendarError(f"{where}: nth must be 1-5 or -1 (last)")
+        rules.append(dict(rule))
+
+    dates = []
+    for i, entry in enumerate(definition.get('dates', [])):
+        try:
+            date.fromisoformat(entry['date'])
+        except (KeyError, TypeError, ValueError):
+            raise HolidayCalendarError(f"dates[{i}]: needs a YYYY-MM-DD date")
+        dates.append({'date': entry['date'], 'name': entry.get('name') or 'Holiday'})
+
+    return {'weekend': weekend, 'observed': observed, 'rules': rules, 'dates': dates}
+
+
+def rule_date(rule, year):
+    """Unshifted date of a rule in a year, or None if the rule does not apply that year"""
+    if rule.get('start_year') and year < int(rule['start_year']):
+        return None
+    if rule.get('end_year') and year > int(rule['end_year']):
+        return None
+    month = int(rule['month'])
+    if 'day' in rule:
+        try:
+            day = date(year, month, int(rule['day']))
+        except ValueError:
+            return None  # e.g. February 29 outside leap years
+    else:
+        weekday, nth = WEEKDAYS.index(rule['weekday'].upper()), int(rule['nth'])
+        if nth > 0:
+            first = date(year, month, 1)
+            day = first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (nth - 1))
+            if day.month != month:
+                return None  # no fifth such weekday this month
+        else:
+            last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+            day = last - timedelta(days=(last.weekday() - weekday) % 7)
+    return day + timedelta(days=int(rule.get('offset_days', 0)))
+
+
+def compile_year(definition, year):
+    """Compile one year of a validated definition into a CompiledYear"""
+    names = {}
+    # Rules of the neighbouring years can be observed in this one (Jan 1 on a Saturday -> Dec 31)
+    for rule_year in (year - 1, year, year + 1):
+        for rule in definition['rules']:
+            day = rule_date(rule, rule_year)
+            if day is None:
+                continue
+            name = rule['name']
+            shift = definition['observed'].get(day.weekday()) if rule.get('observed', True) else None
+            if shift:
+                day, name = day + timedelta(days=shift), f"{name} (observed)"
+            if day.year == year:
+                names[day] = f"{names[day]} / {name}" if day in names else name
+    for entry in definition['dates']:
+        day = date.fromisoformat(entry['date'])
+        if day.year == year:
+            names.setdefault(day, entry['name'])
+
+    first = date(year, 1, 1)
+    days = (date(year + 1, 1, 1) - first).days
+    weekday_bits = [0] * 7
+    for i in range(days):
+        weekday_bits[(first.weekday() + i) % 7] |= 1 << i
+    weekend_bits = 0
+    for weekday in definition['weekend']:
+        weekend_bits |= weekday_bits[weekday]
+    holiday_bits = 0
+    for day in names:
+        holiday_bits |= 1 << (day - first).days
+    all_days = (1 << days) - 1
+    return CompiledYear(
+        year=year,
+        first_ordinal=first.toordinal(),
+        days=days,
+        weekend_bits=weekend_bits,
+        holiday_bits=holiday_bits,
+        business_bits=all_days & ~weekend_bits & ~holiday_bits,
+        weekday_bits=tuple(weekday_bits),
+        names=names,
+    )
+
+
+def changed_year_ranges(old, new):
+    """
+    [(first_year, last_year), ...] whose compiled bitmaps differ between two validated
+    definitions; None bounds are open-ended, so [(None, None)] means every year
+    """
+    if old['weekend'] != new['weekend'] or old['observed'] != new['observed']:
+        return [(None, None)]
+    old_rules = {json.dumps(r, sort_keys=True) for r in old['rules']}
+    new_rules = {json.dumps(r, sort_keys=True) for r in new['rules']}
+    ranges = []
+    for rule in map(json.loads, old_rules ^ new_rules):
+        # observed shifts and offsets can move a rule's date into the neighbouring year
+        first = int(rule['start_year']) - 1 if rule.get('start_year') else None
+        last = int(rule['end_year']) + 1 if rule.get('end_year') else None
+        ranges.append((first, last))
+    old_dates = {(d['date'], d['name']) for d in old['dates']}
+    new_dates = {(d['date'], d['name']) for d in new['dates']}
+    for year in sorted({int(day[:4]) for day, _ in old_dates ^ new_dates}):
+        ranges.append((year, year))
+    return ranges
+
+
+def _in_ranges(year, ranges):
+    return any((first is None or year >= first) and (last is None or year <= last) for first, last in ranges)
+
+
+class HolidayCalendar:
+    """
+    Compiled holiday calendar: years are compiled on first use and kept until an
+    edit of the definition touches them. If a file is set, its mtime is checked at
+    most once per check_interval
+    """
+
+    def __init__(self, definition=None, check_interval=5.0):
+        self.path = None
+        self.check_interval = check_interval
+        self._definition = validate_definition(definition or DEFAULT_DEFINITION)
+        self._years = {}
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._mtime = None
+        self._last_check = 0.0
+
+    def load_file(self, path):
+        """Read the definition from a JSON file and follow later edits of it"""
+        self.path = path
+        self._check_file(force=True)
+
+    def subscribe(self, callback):
+        """Call callback(ranges) with changed_year_ranges() whenever the definition changes"""
+        self._subscribers.append(callback)
+
+    def year(self, year):
+        """CompiledYear for a year (compiled on first use)"""
+        if self.path and time.monotonic() - self._last_check >= self.check_interval:
+            self._check_file()
+        compiled = self._years.get(year)
+        if compiled is None:
+            compiled = compile_year(self._definition, year)
+            with self._lock:
+                self._years[year] = compiled
+        return compiled
+
+    def compile(self, first_year, last_year):
+        """Compile a span of years up front (e.g. at startup)"""
+        for year in range(first_year, last_year + 1):
+            self.year(year)
+
+    def replace_definition(self, definition):
+        """Swap in a new definition, dropping only the compiled years it changes"""
+        new = validate_definition(definition)
+        ranges = changed_year_ranges(self._definition, new)
+        if not ranges:
+            return []
+        with self._lock:
+            self._definition = new
+            for year in [y for y in self._years if _in_ranges(y, ranges)]:
+                del self._years[year]
+        logger.info(f"Holiday calendar changed; recompiling years {ranges}", extra={'year_ranges': ranges})
+        for callback in self._subscribers:
+            callback(ranges)
+        return ranges
+
+    def _check_file(self, force=False):
+        self._last_check = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            if force:
+                raise HolidayCalendarError(f"Holiday calendar {self.path} not found")
+            return
+        if mtime == self._mtime and not force:
+            return
+        self._mtime = mtime
+        try:
+            with open(self.path, encoding='utf-8') as handle:
+                definition = json.load(handle)
+            self.replace_definition(definition)
+        except (OSError, ValueError) as exc:
+            # keep serving the last good calendar; a half-saved edit must not take the app down
+            if force:
+                raise
+            logger.error(f"Could not load holiday calendar {self.path}: {exc}")
+
+    # Bitmap queries; all ranges are inclusive
+
+    def _spans(self, start, end):
+        """(CompiledYear, range mask) for each year in [start, end]"""
+        for year in range(start.year, end.year + 1):
+            compiled = self.year(year)
+            lo = start.toordinal() - compiled.first_ordinal if year == start.year else 0
+            hi = end.toordinal() - compiled.first_ordinal if year == end.year else compiled.days - 1
+            yield compiled, ((1 << (hi - lo + 1)) - 1) << lo
+
+    def is_business_day(self, day):
+        compiled = self.year(day.year)
+        return bool(compiled.business_bits >> (day.toordinal() - compiled.first_ordinal) & 1)
+
+    def count(self, start, end, kind='business_bits'):
+        """Number of days in [start, end] set in one of the bitmaps"""
+        if start > end:
+            return 0
+        return sum((getattr(compiled, kind) & mask).bit_count() for compiled, mask in self._spans(start, end))
+
+    def count_by_weekday(self, start, end):
+        """
+        Non-holiday days in [start, end] per weekday (Monday first), in 7 popcounts per
+        year; weekends are included so schedules with weekend shifts can be priced
+        """
+        counts = [0] * 7
+        if start > end:
+            return counts
+        for compiled, mask in self._spans(start, end):
+            open_days = mask & ~compiled.holiday_bits
+            for weekday in range(7):
+                counts[weekday] += (open_days & compiled.weekday_bits[weekday]).bit_count()
+        return counts
+
+    def days(self, start, end, bits):
+        """Dates in [start, end] selected by bits(compiled) (e.g. business days), in order"""
+        result = []
+        if start > end:
+            return result
+        for compiled, mask in self._spans(start, end):
+            selected = bits(compiled) & mask
+            while selected:
+                low = selected & -selected
+                result.append(date.fromordinal(compiled.first_ordinal + low.bit_length() - 1))
+                selected ^= low
+        return result
+
+    def holiday_names(self, year):
+        return dict(self.year(year).names)
+
+
+_calendar = HolidayCalendar()
+
+
+def get_holiday_calendar():
+    """The process-wide compiled calendar"""
+    return _calendar
+
+
+def init_holiday_calendar(settings, first_year=None, last_year=None):
+    """Load HOLIDAY_CALENDAR_FILE (if set) and compile the given span of years at startup"""
+    if settings.holiday_calendar_file:
+        _calendar.load_file(settings.holiday_calendar_file)
+    if first_year is not None:
+        _calendar.compile(first_year, last_year)
+    return _calendar
@@ -0,0 +1,231 @@
+"""
+In-Memory Interval Index
+"Who is out on day D" over active (pending, in_progress, approved) requests without
+loading pto_requests: a centered interval tree answers point (stabbing) queries in
+O(log n + k). Overlap checks for new requests run in SQL (see overlaps.py)
+
+Committed writes to PTO requests (create, approve, deny, complete, delete) are
+applied incrementally by Session event hooks: changes go to a small add-buffer and
+a tombstone set that are merged into a rebuilt tree once they grow past a fraction
+of the index. Each worker keeps its own index, built on first use and reloaded from
+the primary every INTERVAL_INDEX_REFRESH_SECONDS to pick up other workers' writes
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import select
+
+from database import db
+from models import PTORequest
+from transitions import status_changed
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('pending', 'in_progress', 'approved')
+MIN_COMPACT_THRESHOLD = 64
+
+# start/end are date ordinals (inclusive)
+Interval = namedtuple('Interval', ['start', 'end', 'request_id', 'member_id'])
+
+
+def to_ordinal(value):
+    """'YYYY-MM-DD' string or date -> date ordinal"""
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(value).toordinal()
+
+
+class _Node:
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+
+def _build_tree(intervals):
+    if not intervals:
+        return None
+    endpoints = sorted(p for iv in intervals for p in (iv.start, iv.end))
+    node = _Node()
+    node.center = endpoints[len(endpoints) // 2]
+    left, right, here = [], [], []
+    for iv in intervals:
+        if iv.end < node.center:
+            left.append(iv)
+        elif iv.start > node.center:
+            right.append(iv)
+        else:
+            here.append(iv)
+    node.by_start = sorted(here, key=lambda iv: iv.start)
+    node.by_end = sorted(here, key=lambda iv: iv.end, reverse=True)
+    node.left = _build_tree(left)
+    node.right = _build_tree(right)
+    return node
+
+
+def _stab(node, point, out):
+    while node is not None:
+        if point < node.center:
+            for iv in node.by_start:
+                if iv.start > point:
+                    break
+                out.append(iv)
+            node = node.left
+        elif point > node.center:
+            for iv in node.by_end:
+                if iv.end < point:
+                    break
+                out.append(iv)
+            node = node.right
+        else:
+            out.extend(node.by_start)
+            return
+
+
+class IntervalIndex:
+    """Thread-safe interval index over active PTO requests"""
+
+    def __init__(self, refresh_seconds=30.0):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._tree = None
+        self._entries = {}     # request_id -> Interval in the tree
+        self._added = {}       # request_id -> Interval not yet in the tree
+        self._removed = set()  # tree request_ids no longer active
+        self.loaded_at = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries) - len(self._removed) + len(self._added)
+
+    def load(self, intervals):
+        """Replace the whole index"""
+        with self._lock:
+            self._rebuild(intervals)
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self):
+        return self.loaded_at is None or (
+            self.refresh_seconds > 0 and time.monotonic() - self.loaded_at >= self.refresh_seconds)
+
+    def _rebuild(self, intervals):
+        intervals = list(intervals)
+        self._tree = _build_tree(intervals)
+        self._entries = {iv.request_id: iv for iv in intervals}
+        self._added = {}
+        self._removed = set()
+
+    def _live(self, iv):
+        return iv.request_id not in self._removed
+
+    def _maybe_compact(self):
+        if len(self._added) + len(self._removed) > max(MIN_COMPACT_THRESHOLD, len(self._entries) // 8):
+            live = [iv for iv in self._entries.values() if self._live(iv)]
+            self._rebuild(live + list(self._added.values()))
+
+    def upsert(self, interval):
+        with self._lock:
+            if interval.request_id in self._entries:
+                self._removed.add(interval.request_id)
+            self._added[interval.request_id] = interval
+            self._maybe_compact()
+
+    def remove(self, request_id):
+        with self._lock:
+            self._added.pop(request_id, None)
+            if request_id in self._entries:
+                self._removed.add(request_id)
+            self._maybe_compact()
+
+    def out_on(self, day):
+        """Active intervals containing day (ordinal)"""
+        with self._lock:
+            found = []
+            _stab(self._tree, day, found)
+            result = [iv for iv in found if self._live(iv)]
+            result.extend(iv for iv in self._added.values() if iv.start <= day <= iv.end)
+        return result
+
+
+def interval_for(request_id, member_id, start_date, end_date):
+    """Interval for a request's date strings, or None if they don't parse"""
+    try:
+        start, end = to_ordinal(start_date), to_ordinal(end_date)
+    except (TypeError, ValueError):
+        return None
+    return Interval(start, max(start, end), request_id, member_id)
+
+
+def load_active_intervals():
+    """Active requests read from the primary (never the replica, which may lag)"""
+    with db.engine.connect() as conn:
+        rows = conn.execute(
+            select(PTORequest.id, PTORequest.member_id, PTORequest.start_date, PTORequest.end_date)
+            .where(PTORequest.status.in_(ACTIVE_STATUSES))
+        )
+        return [iv for iv in (interval_for(*row) for row in rows) if iv is not None]
+
+
+def get_interval_index():
+    """The app's index, (re)loaded from the database on first use and after the refresh interval"""
+    index = current_app.extensions['interval_index']
+    if index.is_stale():
+        started = time.perf_counter()
+        index.load(load_active_intervals())
+        logger.debug(f"Loaded interval index with {len(index)} active requests",
+                     extra={'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+    return index
+
+
+def init_interval_index(app, settings):
+    """Attach an (empty, lazily loaded) interval index to the app"""
+    app.extensions['interval_index'] = IntervalIndex(refresh_seconds=settings.interval_index_refresh_seconds)
+    return app.extensions['interval_index']
+
+
+# Request changes are noted at flush time and applied to the index once they commit
+
+def note_request_changes(db_session, objects):
+    """Apply these created/updated requests to the index when db_session commits (also for status_changed)"""
+    changes = db_session.info.setdefault('interval_changes', {})
+    for obj in objects:
+        if isinstance(obj, PTORequest):
+            active = obj.status in ACTIVE_STATUSES
+            changes[obj.id] = interval_for(obj.id, obj.member_id, obj.start_date, obj.end_date) if active else None
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush')
+def _note_request_changes(db_session, flush_context):
+    note_request_changes(db_session, (*db_session.new, *db_session.dirty))
+    changes = db_session.info['interval_changes']
+    for obj in db_session.deleted:
+        if isinstance(obj, PTORequest):
+            changes[obj.id] = None
+
+
+@status_changed.connect
+def _note_status_changes(db_session, changes):
+    note_request_changes(db_session, [change.pto_request for change in changes])
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def _apply_committed_changes(db_session):
+    changes = db_session.info.pop('interval_changes', None)
+    if not changes or not has_app_context():
+        return
+    index = current_app.extensions.get('interval_index')
+    if index is None or index.loaded_at is None:
+        return  # loaded from the database (with these changes) on first use
+    for request_id, interval in changes.items():
+        if interval is None:
+            index.remove(request_id)
+        else:
+            index.upsert(interval)
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def _discard_rolled_back_changes(db_session):
+    db_session.info.pop('interval_changes', None)
@@ -0,0 +1,126 @@
+"""
+Non-Blocking Logging Pipeline
+Request threads only put records on an in-memory queue (QueueHandler); a background
+QueueListener formats them as JSON and does the actual I/O. Per-module levels come
+from settings, and high-volume DEBUG records are sampled before they are queued
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and is emitted as a field
+_STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and any `extra` fields"""
+
+    def format(self, record):
+        payload = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep every DEBUG record from a logger only once per `every` records; other levels pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counters = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.every == 0:
+            return False
+        counter = self._counters.get(record.name)
+        if counter is None:
+            counter = self._counters.setdefault(record.name, itertools.count())
+        return next(counter) % self.every == 0
+
+
+def parse_module_levels(spec):
+    """Parse 'twilio_service=DEBUG,werkzeug=WARNING' into (('twilio_service', 'DEBUG'), ...)"""
+    levels = []
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels.append((name.strip(), level.strip().upper()))
+    return tuple(levels)
+
+
+def configure_logging(settings):
+    """Install the queue-based pipeline on the root logger (safe to call more than once)"""
+    global _listener
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(DebugSamplingFilter(settings.log_debug_sample_rate))
+    root.addHandler(queue_handler)
+    root.setLevel(settings.log_level.upper())
+
+    for name, level in settings.log_levels:
+        logging.getLogger(name).setLevel(level)
+
+    output = logging.StreamHandler(sys.stderr)
+    if settings.log_format == 'json':
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def _restart_listener_in_child():
+    # Forked workers inherit the queue but not the listener thread
+    global _listener
+    if _listener is not None:
+        _listener = logging.handlers.QueueListener(_listener.queue, *_listener.handlers, respect_handler_level=True)
+        _listener.start()
+
+
+atexit.register(stop_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_listener_in_child)
@@ -0,0 +1,337 @@
+"""
+Versioned Schema Migrations
+Ordered, idempotent migration steps recorded in the schema_migrations table.
+Column checks use SQLAlchemy's inspector (not SQLite's PRAGMA table_info), and
+data backfills run in batches of N rows with a commit between batches, saving a
+cursor after each one so an interrupted migration resumes where it stopped and
+call-out writes can get the write lock between batches
+
+Adding a migration: append a @migration(<next version>, '<name>') step below;
+db_init.SCHEMA_VERSION follows the latest version automatically
+"""
+
+import logging
+import time
+from collections import namedtuple
+
+import sqlalchemy as sa
+from sqlalchemy import select, update
+
+from calendar_days import calendar_span, write_calendar_years
+from config import get_settings
+from database import db
+from models import (ArchivedCallOutRecord, ArchivedPTORequest, CalendarDay, CallOutRecord, PTORequestEvent,
+                    PTORequestHistory, PTOUsageRollup, RequestStatusCount, SchemaMigration, WorkSchedule,
+                    get_eastern_time)
+from request_events import backfill_events
+from rollups import add_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE_SECONDS = 0.05
+
+Migration = namedtuple('Migration', ['version', 'name', 'apply'])
+MIGRATIONS = []
+
+
+def migration(version, name):
+    """Register a migration step; versions must be added in increasing order"""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1].version:
+            raise ValueError(f"Migration {version} must come after {MIGRATIONS[-1].version}")
+        MIGRATIONS.append(Migration(version, name, func))
+        return func
+    return decorator
+
+
+class MigrationContext:
+    """Helpers passed to each step: portable column/table checks and chunked backfills"""
+
+    def __init__(self, record, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE_SECONDS, max_batches=None):
+        self.record = record
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_batches = max_batches
+        self.rows_backfilled = 0
+
+    @property
+    def dialect(self):
+        return db.engine.dialect
+
+    def _inspector(self):
+        # Inspect through the session's connection so earlier DDL in this step is visible
+        return sa.inspect(db.session.connection())
+
+    def has_table(self, table_name):
+        return self._inspector().has_table(table_name)
+
+    def has_column(self, table_name, column_name):
+        return column_name in {c['name'] for c in self._inspector().get_columns(table_name)}
+
+    def add_column(self, table_name, column):
+        """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+        if self.has_column(table_name, column.name):
+            logger.info(f"Column {table_name}.{column.name} already exists")
+            return False
+        column_ddl = sa.schema.CreateColumn(column).compile(dialect=self.dialect)
+        db.session.execute(sa.text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+        db.session.commit()
+        logger.info(f"Added column {table_name}.{column.name}")
+        return True
+
+    def drop_column(self, table_name, column_name):
+        """ALTER TABLE ... DROP COLUMN if the column exists and the database supports it"""
+        if not self.has_column(table_name, column_name):
+            return False
+        if self.dialect.name == 'sqlite' and self.dialect.dbapi.sqlite_version_info < (3, 35, 0):
+            logger.warning(f"SQLite < 3.35 cannot drop {table_name}.{column_name}; leaving the unused column in place")
+            return False
+        db.session.execute(sa.text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+        db.session.commit()
+        logger.info(f"Dropped column {table_name}.{column_name}")
+        return True
+
+    def create_table(self, model):
+        """CREATE TABLE for a model unless it already exists"""
+        model.__table__.create(db.session.connection(), checkfirst=True)
+        db.session.commit()
+
+    def create_index(self, table_name, index_name, columns, unique=False):
+        """CREATE INDEX unless an index with that name exists on the table"""
+        if index_name in {i['name'] for i in self._inspector().get_indexes(table_name)}:
+            return False
+        unique_sql = 'UNIQUE ' if unique else ''
+        db.session.execute(sa.text(f"CREATE {unique_sql}INDEX {index_name} ON {table_name} ({', '.join(columns)})"))
+        db.session.commit()
+        logger.info(f"Created index {index_name}")
+        return True
+
+    def create_view(self, view_name, select_sql, replace=False):
+        """CREATE VIEW unless it exists (replace=True drops and recreates it)"""
+        if view_name in self._inspector().get_view_names():
+            if not replace:
+                return False
+            db.session.execute(sa.text(f"DROP VIEW {view_name}"))
+        db.session.execute(sa.text(f"CREATE VIEW {view_name} AS {select_sql}"))
+        db.session.commit()
+        logger.info(f"Created view {view_name}")
+        return True
+
+    def in_batches(self, next_keys, apply, what, batch_size=None):
+        """
+        apply(keys) for successive batches of next_keys(after, limit) (keys in increasing order)
+        Each batch is its own short transaction that also saves the last key as the cursor,
+        so the write lock is released between batches and a restart continues after the
+        last batch. Returns False if max_batches stopped it early
+        """
+        batch_size = batch_size or self.batch_size
+        cursor = self.record.backfill_cursor or 0
+        batches = 0
+
+        while self.max_batches is None or batches < self.max_batches:
+            keys = next_keys(cursor, batch_size)
+            if not keys:
+                return True
+
+            apply(keys)
+            cursor = keys[-1]
+            self.record.backfill_cursor = cursor
+            db.session.commit()
+
+            batches += 1
+            self.rows_backfilled += len(keys)
+            logger.info(f"Backfilled {len(keys)} {what} (through {cursor})")
+            if self.pause:
+                time.sleep(self.pause)
+
+        # Stopped early (max_batches); the step stays unapplied and resumes from the cursor
+        return False
+
+    def backfill(self, table_name, values, where, key='id'):
+        """
+        UPDATE table SET values WHERE where(table), batch_size rows at a time in key order
+        (see in_batches). Uses a bare table construct, so model onupdate values
+        (updated_at) are not touched
+        """
+        table = sa.table(table_name, sa.column(key), *[sa.column(name) for name in values])
+        key_col = table.c[key]
+        where = where(table)
+
+        def next_ids(cursor, limit):
+            return db.session.scalars(
+                select(key_col).where(key_col > cursor, where).order_by(key_col).limit(limit)
+            ).all()
+
+        return self.in_batches(next_ids, lambda ids: db.session.execute(
+            update(table).where(key_col.in_(ids)).values(**values)), f"{table.name} rows")
+
+
+class BackfillIncomplete(Exception):
+    """Raised to stop the runner when a step's backfill was cut short"""
+
+
+# ---------------------------------------------------------------------------
+# Migration steps (formerly the standalone migrate_*.py scripts)
+# ---------------------------------------------------------------------------
+
+@migration(1, 'add_call_out')
+def add_call_out(ctx):
+    ctx.add_column('pto_requests', sa.Column('is_call_out', sa.Boolean, server_default=sa.false()))
+    return ctx.backfill('pto_requests', {'is_call_out': False}, lambda t: t.c.is_call_out.is_(None))
+
+
+@migration(2, 'add_sick_balance')
+def add_sick_balance(ctx):
+    ctx.add_column('users', sa.Column('sick_balance_hours', sa.Numeric(5, 2), server_default=sa.text('60.0')))
+    return ctx.backfill('users', {'sick_balance_hours': 60.0}, lambda t: t.c.sick_balance_hours.is_(None))
+
+
+@migration(3, 'add_twilio_support')
+def add_twilio_support(ctx):
+    ctx.add_column('users', sa.Column('pin', sa.String(4)))
+    ctx.create_table(CallOutRecord)
+
+
+@migration(4, 'remove_voice_call_fields')
+def remove_voice_call_fields(ctx):
+    ctx.drop_column('call_out_records', 'recording_url')
+    ctx.drop_column('call_out_records', 'recording_duration')
+
+
+def _history_ids(after, limit):
+    """Next ids of live and archived requests, for steps that backfill from request history"""
+    return db.session.scalars(
+        select(PTORequestHistory.id).where(PTORequestHistory.id > after).order_by(PTORequestHistory.id).limit(limit)
+    ).all()
+
+
+# pto_requests columns as of each version of the pto_requests_all view. A step that adds a
+# pto_requests column appends a new list and recreates the view with it; the latest list must
+# match models.pto_requests_all. Earlier steps keep their own list, so they never select a
+# column a later step adds
+HISTORY_VIEW_COLUMNS_V5 = (
+    'id', 'member_id', 'start_date', 'end_date', 'pto_type', 'status', 'manager_team', 'denial_reason',
+    'is_partial_day', 'start_time', 'end_time', 'reason', 'is_call_out', 'timekeeping_entered',
+    'coverage_arranged', 'approved_date', 'completed_date', 'created_at', 'updated_at', 'submitted_at',
+)
+HISTORY_VIEW_COLUMNS_V6 = HISTORY_VIEW_COLUMNS_V5 + ('timekeeping_batch',)
+
+
+def _create_history_view(ctx, columns, replace=False):
+    columns = ', '.join(columns)
+    hot, archived = (literal.compile(dialect=ctx.dialect) for literal in (sa.false(), sa.true()))
+    ctx.create_view('pto_requests_all',
+                    f"SELECT {columns}, {hot} AS is_archived FROM pto_requests "
+                    f"UNION ALL SELECT {columns}, {archived} AS is_archived FROM pto_requests_archive",
+                    replace=replace)
+
+
+@migration(5, 'add_request_archive')
+def add_request_archive(ctx):
+    ctx.create_table(ArchivedPTORequest)
+    ctx.create_table(ArchivedCallOutRecord)
+    _create_history_view(ctx, HISTORY_VIEW_COLUMNS_V5)
+
+
+@migration(6, 'add_timekeeping_batch')
+def add_timekeeping_batch(ctx):
+    ctx.add_column('pto_requests', sa.Column('timekeeping_batch', sa.String(32)))
+    ctx.add_column('pto_requests_archive', sa.Column('timekeeping_batch', sa.String(32)))
+    ctx.create_index('pto_requests', 'ix_pto_requests_timekeeping_batch', ['timekeeping_batch'])
+    _create_history_view(ctx, HISTORY_VIEW_COLUMNS_V6, replace=True)
+
+
+@migration(7, 'add_usage_rollups')
+def add_usage_rollups(ctx):
+    ctx.create_table(PTOUsageRollup)
+    return ctx.in_batches(_history_ids, add_rollups, 'requests')
+
+
+@migration(8, 'add_member_dates_index')
+def add_member_dates_index(ctx):
+    ctx.create_index('pto_requests', 'ix_pto_requests_member_dates', ['member_id', 'start_date', 'end_date'])
+
+
+@migration(9, 'add_calendar_days')
+def add_calendar_days(ctx):
+    ctx.create_table(CalendarDay)
+    first_year, last_year = calendar_span(get_settings())
+
+    def next_years(after, limit):
+        return list(range(max(first_year, after + 1), last_year + 1))[:limit]
+
+    # A year (about 365 rows) per batch; ordinals continue from the year before
+    return ctx.in_batches(next_years, lambda years: write_calendar_years(years[0], years[-1]), 'calendar years',
+                          batch_size=1)
+
+
+@migration(10, 'add_work_schedules')
+def add_work_schedules(ctx):
+    ctx.create_table(WorkSchedule)
+
+
+@migration(11, 'add_request_events')
+def add_request_events(ctx):
+    ctx.create_table(PTORequestEvent)
+    ctx.create_table(RequestStatusCount)
+    return ctx.in_batches(_history_ids, backfill_events, 'requests')
+
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def applied_versions():
+    """Versions of fully applied steps"""
+    SchemaMigration.__table__.create(db.session.connection(), checkfirst=True)
+    db.session.commit()
+    return set(db.session.scalars(
+        select(SchemaMigration.version).where(SchemaMigration.applied_at.isnot(None))
+    ))
+
+
+def pending_migrations():
+    done = applied_versions()
+    return [m for m in MIGRATIONS if m.version not in done]
+
+
+def run_migrations(batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE_SECONDS, max_batches=None):
+    """
+    Apply pending steps in version order and return the versions applied
+    Callers hold the 'schema-init' startup lock so only one process migrates at a time
+    """
+    applied = []
+    for step in pending_migrations():
+        record = db.session.get(SchemaMigration, step.version)
+        if record is None:
+            record = SchemaMigration(version=step.version, name=step.name)
+            db.session.add(record)
+            db.session.commit()
+        elif record.backfill_cursor:
+            logger.info(f"Resuming migration {step.version} ({step.name}) after id {record.backfill_cursor}")
+
+        ctx = MigrationContext(record, batch_size=batch_size, pause=pause, max_batches=max_batches)
+        started = time.perf_counter()
+        try:
+            finished = step.apply(ctx)
+        except Exception:
+            db.session.rollback()
+            logger.exception(f"Migration {step.version} ({step.name}) failed")
+            raise
+
+        if finished is False:
+            raise BackfillIncomplete(f"Migration {step.version} ({step.name}) stopped after "
+                                     f"{ctx.rows_backfilled} rows; run it again to resume")
+
+        record.applied_at = get_eastern_time()
+        record.backfill_cursor = None
+        db.session.commit()
+        applied.append(step.version)
+        logger.info(f"Applied migration {step.version} ({step.name})",
+                    extra={'rows_backfilled': ctx.rows_backfilled,
+                           'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+    return applied
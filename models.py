@@ -1,15 +1,18 @@
 from database import db
 from datetime import datetime
-import pytz
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Numeric, Date
+from functools import lru_cache
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Numeric, Date, MetaData, Table, Index
 from sqlalchemy.orm import relationship
 
-# Define Eastern timezone
-EASTERN = pytz.timezone('US/Eastern')
+@lru_cache(maxsize=None)
+def get_eastern_timezone():
+    """Eastern timezone, loaded on first use (pytz reads its zone files lazily)"""
+    import pytz
+    return pytz.timezone('US/Eastern')
 
 def get_eastern_time():
     """Get current time in Eastern timezone as naive datetime"""
-    eastern_now = datetime.now(EASTERN)
+    eastern_now = datetime.now(get_eastern_timezone())
     # Return naive datetime (no timezone info) but in Eastern time
     return eastern_now.replace(tzinfo=None)
 
@@ -111,6 +114,24 @@ class TeamMember(User):
     def __repr__(self):
         return f'<TeamMember {self.name} - {self.team}>'
 
+def role_can_approve_position(role, position):
+    """Check if a manager role can approve requests for a specific position"""
+    if role == 'superadmin':
+        return True
+
+    if not isinstance(position, Position):
+        return False
+
+    if role == 'admin' and position.team == 'admin':
+        return True
+    if role == 'clinical' and position.team == 'clinical':
+        return True
+    if role == 'moa_supervisor' and 'MOA' in position.name:
+        return True
+    if role == 'echo_supervisor' and 'Echo' in position.name:
+        return True
+    return False
+
 class Manager(User):
     """Manager class for approving requests"""
     __tablename__ = 'managers'
@@ -133,84 +154,14 @@ class Manager(User):
     
     def can_approve_position(self, position):
         """Check if this manager can approve requests for a specific position"""
-        if self.role == 'superadmin':
-            return True
-        
-        if not isinstance(position, Position):
-            return False
-
-        if self.role == 'admin' and position.team == 'admin':
-            return True
-        if self.role == 'clinical' and position.team == 'clinical':
-            return True
-        if self.role == 'moa_supervisor' and 'MOA' in position.name:
-            return True
-        if self.role == 'echo_supervisor' and 'Echo' in position.name:
-            return True
-        return False
+        return role_can_approve_position(self.role, position)
     
     def __repr__(self):
         return f'<Manager {self.name} - {self.role}>'
 
-class PTORequest(db.Model):
-    """PTO Request model"""
-    __tablename__ = 'pto_requests'
-    
-    id = Column(Integer, primary_key=True)
-    member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
-    start_date = Column(String(10), nullable=False)  # YYYY-MM-DD format
-    end_date = Column(String(10), nullable=False)
-    pto_type = Column(String(50), nullable=False)  # vacation, sick, etc.
-    status = Column(String(20), default='pending')  # pending, in_progress, approved, denied, completed
-    manager_team = Column(String(20), nullable=False)  # which manager should handle this
-    denial_reason = Column(Text)
-    
-    # Partial PTO support
-    is_partial_day = Column(Boolean, default=False)  # True for partial day requests
-    start_time = Column(String(8))  # HH:MM format for partial days
-    end_time = Column(String(8))  # HH:MM format for partial days
-    reason = Column(Text)  # Optional reason (especially for partial days)
+class PTODurationMixin:
+    """Duration helpers shared by live, archived and history PTO request rows"""
 
-    # Call Out tracking
-    is_call_out = Column(Boolean, default=False)  # True for call-out (today only) requests
-    
-    # Workflow tracking
-    timekeeping_entered = Column(Boolean, default=False)  # Checkbox for timekeeping
-    coverage_arranged = Column(Boolean, default=False)  # Checkbox for coverage
-    approved_date = Column(DateTime)  # When request was first approved
-    completed_date = Column(DateTime)  # When PTO period ended
-    
-    created_at = Column(DateTime, default=get_eastern_time)
-    updated_at = Column(DateTime, default=get_eastern_time, onupdate=get_eastern_time)
-    submitted_at = Column(DateTime, default=get_eastern_time)  # For tracking submission time
-    
-    def __init__(self, member=None, start_date=None, end_date=None, pto_type=None,
-                 manager_team=None, status='pending', coverage_arranged=False,
-                 timekeeping_entered=False, is_partial_day=False,
-                 start_time=None, end_time=None, reason=None, is_call_out=False, **kwargs):
-        super().__init__(**kwargs)
-        if member:
-            self.member = member
-        if start_date:
-            self.start_date = start_date
-        if end_date:
-            self.end_date = end_date
-        if pto_type:
-            self.pto_type = pto_type
-        if manager_team:
-            self.manager_team = manager_team
-        self.status = status
-        self.coverage_arranged = coverage_arranged
-        self.timekeeping_entered = timekeeping_entered
-        self.is_partial_day = is_partial_day
-        self.start_time = start_time
-        self.end_time = end_time
-        self.reason = reason
-        self.is_call_out = is_call_out
-    
-    # Relationships
-    member = relationship("TeamMember", back_populates="pto_requests")
-    
     @property
     def duration_days(self):
         """Calculate duration in business days (excludes weekends and holidays)"""
@@ -228,7 +179,7 @@ class PTORequest(db.Model):
     
     @property
     def duration_hours(self):
-        """Calculate duration in hours (7.5 hours = 1 business day)"""
+        """Calculate duration in hours (the member's work schedule, else 7.5 hours = 1 business day)"""
         try:
             if self.is_partial_day and self.start_time and self.end_time:
                 # Calculate partial day hours
@@ -241,7 +192,12 @@ class PTORequest(db.Model):
                 total_minutes = end_minutes - start_minutes
                 return round(total_minutes / 60, 2)
             else:
-                # Full day calculation: 7.5 hours per business day
+                # Full days: priced by the member's work schedule if they have one
+                from work_schedules import scheduled_hours
+                hours = scheduled_hours(self.member_id, self.start_date, self.end_date)
+                if hours is not None:
+                    return hours
+                # Otherwise 7.5 hours per business day
                 return self.duration_days * 7.5
         except:
             return 7.5
@@ -275,6 +231,70 @@ class PTORequest(db.Model):
                     'weekends_list': []
                 }
 
+class PTORequest(PTODurationMixin, db.Model):
+    """PTO Request model"""
+    __tablename__ = 'pto_requests'
+    __table_args__ = (
+        # Per-member overlap checks (see overlaps.py)
+        Index('ix_pto_requests_member_dates', 'member_id', 'start_date', 'end_date'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
+    start_date = Column(String(10), nullable=False)  # YYYY-MM-DD format
+    end_date = Column(String(10), nullable=False)
+    pto_type = Column(String(50), nullable=False)  # vacation, sick, etc.
+    status = Column(String(20), default='pending')  # pending, in_progress, approved, denied, completed
+    manager_team = Column(String(20), nullable=False)  # which manager should handle this
+    denial_reason = Column(Text)
+    
+    # Partial PTO support
+    is_partial_day = Column(Boolean, default=False)  # True for partial day requests
+    start_time = Column(String(8))  # HH:MM format for partial days
+    end_time = Column(String(8))  # HH:MM format for partial days
+    reason = Column(Text)  # Optional reason (especially for partial days)
+
+    # Call Out tracking
+    is_call_out = Column(Boolean, default=False)  # True for call-out (today only) requests
+    
+    # Workflow tracking
+    timekeeping_entered = Column(Boolean, default=False)  # Checkbox for timekeeping
+    timekeeping_batch = Column(String(32), index=True)  # Timekeeping export batch that entered it
+    coverage_arranged = Column(Boolean, default=False)  # Checkbox for coverage
+    approved_date = Column(DateTime)  # When request was first approved
+    completed_date = Column(DateTime)  # When PTO period ended
+    
+    created_at = Column(DateTime, default=get_eastern_time)
+    updated_at = Column(DateTime, default=get_eastern_time, onupdate=get_eastern_time)
+    submitted_at = Column(DateTime, default=get_eastern_time)  # For tracking submission time
+    
+    def __init__(self, member=None, start_date=None, end_date=None, pto_type=None,
+                 manager_team=None, status='pending', coverage_arranged=False,
+                 timekeeping_entered=False, is_partial_day=False,
+                 start_time=None, end_time=None, reason=None, is_call_out=False, **kwargs):
+        super().__init__(**kwargs)
+        if member:
+            self.member = member
+        if start_date:
+            self.start_date = start_date
+        if end_date:
+            self.end_date = end_date
+        if pto_type:
+            self.pto_type = pto_type
+        if manager_team:
+            self.manager_team = manager_team
+        self.status = status
+        self.coverage_arranged = coverage_arranged
+        self.timekeeping_entered = timekeeping_entered
+        self.is_partial_day = is_partial_day
+        self.start_time = start_time
+        self.end_time = end_time
+        self.reason = reason
+        self.is_call_out = is_call_out
+    
+    # Relationships
+    member = relationship("TeamMember", back_populates="pto_requests")
+    
     def __repr__(self):
         return f'<PTORequest {self.id} - {self.member.name if self.member else "Unknown"} - {self.status}>'
 
@@ -351,4 +371,214 @@ class CallOutRecord(db.Model):
     pto_request = relationship("PTORequest", backref="call_out_record", uselist=False)
 
     def __repr__(self):
-        return f'<CallOutRecord {self.id} - {self.source} - {self.member.name if self.member else "Unknown"}>'
\ No newline at end of file
+        return f'<CallOutRecord {self.id} - {self.source} - {self.member.name if self.member else "Unknown"}>'
+
+class ArchivedPTORequest(PTODurationMixin, db.Model):
+    """
+    Closed (completed/denied) PTO request moved out of pto_requests by the archival job
+    Same columns and ids as PTORequest; keep the two in step when adding columns
+    """
+    __tablename__ = 'pto_requests_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # original pto_requests.id
+    member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False, index=True)
+    start_date = Column(String(10), nullable=False)
+    end_date = Column(String(10), nullable=False)
+    pto_type = Column(String(50), nullable=False)
+    status = Column(String(20))
+    manager_team = Column(String(20), nullable=False)
+    denial_reason = Column(Text)
+    is_partial_day = Column(Boolean, default=False)
+    start_time = Column(String(8))
+    end_time = Column(String(8))
+    reason = Column(Text)
+    is_call_out = Column(Boolean, default=False)
+    timekeeping_entered = Column(Boolean, default=False)
+    timekeeping_batch = Column(String(32))
+    coverage_arranged = Column(Boolean, default=False)
+    approved_date = Column(DateTime)
+    completed_date = Column(DateTime)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    submitted_at = Column(DateTime)
+    archived_at = Column(DateTime, default=get_eastern_time)
+
+    member = relationship("TeamMember")
+
+    def __repr__(self):
+        return f'<ArchivedPTORequest {self.id} - {self.status}>'
+
+class ArchivedCallOutRecord(db.Model):
+    """CallOutRecord of an archived PTO request (same columns and ids as call_out_records)"""
+    __tablename__ = 'call_out_records_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # original call_out_records.id
+    member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
+    pto_request_id = Column(Integer, ForeignKey('pto_requests_archive.id'), nullable=True, index=True)
+    call_sid = Column(String(100), nullable=True)
+    source = Column(String(10), nullable=False)
+    phone_number_used = Column(String(20), nullable=False)
+    verified = Column(Boolean, default=False)
+    authentication_method = Column(String(20), nullable=True)
+    message_text = Column(Text, nullable=True)
+    created_at = Column(DateTime)
+    processed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=get_eastern_time)
+
+    def __repr__(self):
+        return f'<ArchivedCallOutRecord {self.id} - {self.source}>'
+
+# Read-only UNION ALL of pto_requests and pto_requests_archive. The view is created by
+# a migration (see migrations.py), so its table lives outside db.metadata and
+# create_all never tries to create it as a real table
+pto_requests_all = Table(
+    'pto_requests_all', MetaData(),
+    *[Column(c.name, c.type, primary_key=c.primary_key) for c in PTORequest.__table__.columns],
+    Column('is_archived', Boolean),
+)
+
+class PTORequestHistory(PTODurationMixin, db.Model):
+    """Live and archived PTO requests through the pto_requests_all view (for history pages and reports)"""
+    __table__ = pto_requests_all
+
+    member = relationship("TeamMember", primaryjoin="foreign(PTORequestHistory.member_id) == TeamMember.id",
+                          viewonly=True)
+
+    def __repr__(self):
+        return f'<PTORequestHistory {self.id} - {self.status}{" (archived)" if self.is_archived else ""}>'
+
+class PTOUsageRollup(db.Model):
+    """
+    Counted PTO (in_progress, approved, completed) per team, position, month and type,
+    kept up to date incrementally on each status transition (see rollups.py)
+    """
+    __tablename__ = 'pto_usage_rollups'
+
+    team = Column(String(20), primary_key=True)
+    position = Column(String(100), primary_key=True)
+    month = Column(String(7), primary_key=True, index=True)  # 'YYYY-MM'
+    pto_type = Column(String(50), primary_key=True)
+    request_count = Column(Integer, nullable=False, default=0)  # counted in the month the request starts
+    call_outs = Column(Integer, nullable=False, default=0)
+    days = Column(Numeric(10, 2), nullable=False, default=0)  # business days falling in this month
+    hours = Column(Numeric(10, 2), nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<PTOUsageRollup {self.team}/{self.position} {self.month} {self.pto_type}>'
+
+class CalendarDay(db.Model):
+    """
+    One row per date of the configured year span (see calendar_days.py), so reports can
+    count business days in SQL: end.business_day_ordinal - start.business_day_ordinal
+    (+1 when the start date is itself a business day)
+    """
+    __tablename__ = 'calendar_days'
+
+    date = Column(String(10), primary_key=True)  # YYYY-MM-DD, same format as PTO request dates
+    is_weekend = Column(Boolean, nullable=False, default=False)
+    is_holiday = Column(Boolean, nullable=False, default=False)
+    holiday_name = Column(String(100))
+    business_day_ordinal = Column(Integer, nullable=False)  # business days from the span start through this date
+
+    def __repr__(self):
+        return f'<CalendarDay {self.date}{" " + self.holiday_name if self.holiday_name else ""}>'
+
+class WorkSchedule(db.Model):
+    """
+    Hours a team member works on each weekday from effective_from through effective_to
+    (open-ended when NULL). Members without a schedule work 7.5 hours per business day;
+    see work_schedules.py for how full-day requests are priced against it
+    """
+    __tablename__ = 'work_schedules'
+
+    id = Column(Integer, primary_key=True)
+    member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False, index=True)
+    effective_from = Column(String(10), nullable=False)  # YYYY-MM-DD
+    effective_to = Column(String(10))  # YYYY-MM-DD inclusive; NULL = until replaced
+    monday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    tuesday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    wednesday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    thursday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    friday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    saturday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    sunday_hours = Column(Numeric(4, 2), nullable=False, default=0)
+    created_at = Column(DateTime, default=get_eastern_time)
+
+    member = relationship("TeamMember")
+
+    def __repr__(self):
+        return f'<WorkSchedule member={self.member_id} from {self.effective_from}>'
+
+class PTORequestEvent(db.Model):
+    """
+    Append-only log of request status changes (old_status NULL when the request was
+    submitted), written with each transition (see request_events.py). request_id has no
+    foreign key so the history outlives archival of the request
+    """
+    __tablename__ = 'pto_request_events'
+    __table_args__ = (
+        Index('ix_pto_request_events_request', 'request_id', 'occurred_at'),
+        Index('ix_pto_request_events_team_status', 'team', 'new_status', 'occurred_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    request_id = Column(Integer, nullable=False)
+    team = Column(String(20), nullable=False)  # the request's manager_team
+    old_status = Column(String(20))
+    new_status = Column(String(20), nullable=False)
+    actor_id = Column(Integer)  # manager who made the change; NULL for employee submissions and the system
+    occurred_at = Column(DateTime, nullable=False, default=get_eastern_time)
+
+    def __repr__(self):
+        return f'<PTORequestEvent #{self.request_id} {self.old_status} -> {self.new_status}>'
+
+class RequestStatusCount(db.Model):
+    """
+    Requests per manager team and status ('archived:<status>' once archived), adjusted with
+    each event (see request_events.py)
+    """
+    __tablename__ = 'request_status_counts'
+
+    team = Column(String(20), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RequestStatusCount {self.team} {self.status}={self.count}>'
+
+class AppMeta(db.Model):
+    """Single-row table recording schema and seed versions for the startup check"""
+    __tablename__ = 'app_meta'
+
+    id = Column(Integer, primary_key=True)  # always 1
+    schema_version = Column(Integer, nullable=False, default=0)
+    seed_version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=get_eastern_time, onupdate=get_eastern_time)
+
+    def __repr__(self):
+        return f'<AppMeta schema={self.schema_version} seed={self.seed_version}>'
+
+
+class StartupLock(db.Model):
+    """Lock-table row held while one worker initializes the database"""
+    __tablename__ = 'startup_locks'
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)  # host:pid of the holding process
+    acquired_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<StartupLock {self.name} held by {self.holder}>'
+
+
+class SchemaMigration(db.Model):
+    """One row per migration step; applied_at stays NULL while a backfill is still in progress"""
+    __tablename__ = 'schema_migrations'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
+    backfill_cursor = Column(Integer)  # last primary key processed by the step's backfill
+    applied_at = Column(DateTime)
+
+    def __repr__(self):
+        return f'<SchemaMigration {self.version} {self.name}>'
@@ -0,0 +1,133 @@
+"""
+Overlapping Request Detection
+Checks a new request against the same member's pending, in-progress and approved
+requests before it is written, so a day is never counted or deducted twice.
+The lookup is a single range scan of ix_pto_requests_member_dates
+(member_id, start_date, end_date).
+
+Two partial-day requests on the same day only conflict if their times overlap.
+An exact duplicate (same dates, type, times and call-out flag, e.g. a double
+submit or a repeated call-out text) is merged into the existing request; any
+other overlap raises RequestConflict with a structured description. Calling out
+sick is never blocked by other requests: a call-out only merges into a duplicate,
+on every path (web form, API and SMS)
+"""
+
+from collections import namedtuple
+
+from sqlalchemy import select
+
+from database import db
+from models import PTORequest
+
+OVERLAP_STATUSES = ('pending', 'in_progress', 'approved')
+
+Conflict = namedtuple('Conflict', ['request_id', 'kind', 'status', 'pto_type', 'start_date', 'end_date',
+                                   'is_partial_day', 'start_time', 'end_time', 'is_call_out',
+                                   'overlap_start', 'overlap_end'])
+
+
+class RequestConflict(Exception):
+    """A new request overlaps one or more of the member's active requests"""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        first = conflicts[0]
+        super().__init__(f"Overlaps request #{first.request_id} ({first.pto_type}, {first.status}) "
+                         f"on {first.overlap_start}" +
+                         (f" to {first.overlap_end}" if first.overlap_end != first.overlap_start else ""))
+
+    def to_dict(self):
+        return {'error': str(self), 'conflicts': [c._asdict() for c in self.conflicts]}
+
+
+def _minutes(value):
+    hours, minutes = map(int, value.split(':')[:2])
+    return hours * 60 + minutes
+
+
+def _partial(is_partial_day, start_time, end_time):
+    return bool(is_partial_day and start_time and end_time)
+
+
+def _active_requests(member_id, start_date, end_date, exclude_id=None):
+    query = (
+        select(PTORequest.id, PTORequest.status, PTORequest.pto_type, PTORequest.start_date, PTORequest.end_date,
+               PTORequest.is_partial_day, PTORequest.start_time, PTORequest.end_time, PTORequest.is_call_out)
+        .where(PTORequest.member_id == member_id,
+               PTORequest.start_date <= end_date,
+               PTORequest.end_date >= start_date,
+               PTORequest.status.in_(OVERLAP_STATUSES))
+        .order_by(PTORequest.start_date, PTORequest.id)
+    )
+    if exclude_id is not None:
+        query = query.where(PTORequest.id != exclude_id)
+    return db.session.execute(query).all()
+
+
+def _conflict(row, start_date, end_date, pto_type, is_partial_day, start_time, end_time, is_call_out):
+    """Conflict between an active request row and new dates, or None"""
+    if row.start_date > end_date or row.end_date < start_date:
+        return None
+    new_partial = _partial(is_partial_day, start_time, end_time)
+    row_partial = _partial(row.is_partial_day, row.start_time, row.end_time)
+    if new_partial and row_partial and (
+            _minutes(end_time) <= _minutes(row.start_time) or _minutes(row.end_time) <= _minutes(start_time)):
+        return None  # same day, different hours
+
+    duplicate = (
+        (row.start_date, row.end_date, row.pto_type, row_partial, bool(row.is_call_out))
+        == (start_date, end_date, pto_type, new_partial, bool(is_call_out))
+        and (not new_partial or (row.start_time, row.end_time) == (start_time, end_time))
+    )
+    return Conflict(
+        request_id=row.id,
+        kind='duplicate' if duplicate else 'overlap',
+        status=row.status,
+        pto_type=row.pto_type,
+        start_date=row.start_date,
+        end_date=row.end_date,
+        is_partial_day=row_partial,
+        start_time=row.start_time,
+        end_time=row.end_time,
+        is_call_out=bool(row.is_call_out),
+        overlap_start=max(row.start_date, start_date),
+        overlap_end=min(row.end_date, end_date),
+    )
+
+
+def find_conflicts(member_id, start_date, end_date, pto_type=None, is_partial_day=False, start_time=None,
+                   end_time=None, is_call_out=False, exclude_id=None):
+    """Active requests of the member that overlap the given dates (and times, for partial days)"""
+    conflicts = (_conflict(row, start_date, end_date, pto_type, is_partial_day, start_time, end_time, is_call_out)
+                 for row in _active_requests(member_id, start_date, end_date, exclude_id))
+    return [c for c in conflicts if c is not None]
+
+
+def find_conflicts_for_ranges(member_id, ranges, pto_type=None, is_partial_day=False, start_time=None,
+                              end_time=None, is_call_out=False):
+    """
+    find_conflicts for many (start_date, end_date) ranges of one member with a single
+    range scan over their overall span; returns [conflicts of each range]
+    """
+    if not ranges:
+        return []
+    rows = _active_requests(member_id, min(start for start, _ in ranges), max(end for _, end in ranges))
+    return [
+        [c for c in (_conflict(row, start, end, pto_type, is_partial_day, start_time, end_time, is_call_out)
+                     for row in rows) if c is not None]
+        for start, end in ranges
+    ]
+
+
+def check_new_request(member_id, start_date, end_date, **request_fields):
+    """
+    Return the id of an identical active request to merge into, or None if there is
+    no overlap (or only non-duplicate overlaps of a call-out); raise RequestConflict
+    for any other overlap
+    """
+    conflicts = find_conflicts(member_id, start_date, end_date, **request_fields)
+    duplicates = [c for c in conflicts if c.kind == 'duplicate']
+    if request_fields.get('is_call_out') or len(duplicates) == len(conflicts):
+        return duplicates[0].request_id if duplicates else None
+    raise RequestConflict([c for c in conflicts if c.kind != 'duplicate'])
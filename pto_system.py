@@ -1,13 +1,17 @@
-from models import PTORequest, TeamMember, Manager, Position
+from models import PTORequest, PTORequestHistory, TeamMember, Position
 from database import db
-from email_service import EmailService
+from overlaps import RequestConflict, check_new_request
+from transitions import announce_created, transition_request
+from services import get_service
 from datetime import datetime
 
 class PTOTrackerSystem:
     """Main system class for managing PTO requests"""
     
-    def __init__(self):
-        self.email_service = EmailService()
+    @property
+    def email_service(self):
+        """Shared EmailService from the app's service registry"""
+        return get_service('email')
 
     def get_staff_directory(self):
         """Dynamic staff directory from database"""
@@ -85,7 +89,7 @@ class PTOTrackerSystem:
     def delete_employee(self, employee_id):
         """Delete an employee"""
         employee = TeamMember.query.get_or_404(employee_id)
-        has_requests = PTORequest.query.filter_by(member_id=employee.id).count() > 0
+        has_requests = PTORequestHistory.query.filter_by(member_id=employee.id).count() > 0
 
         if has_requests:
             # Soft delete
@@ -116,6 +120,20 @@ class PTOTrackerSystem:
         # Check if this is a call-out (should be auto-approved)
         is_call_out = pto_data.get('is_call_out', False)
 
+        # Merge exact duplicates; any other overlap raises RequestConflict (except for call-outs)
+        try:
+            existing_id = check_new_request(member.id, pto_data['start_date'], pto_data['end_date'],
+                                            pto_type=pto_data['pto_type'],
+                                            is_partial_day=pto_data.get('is_partial_day', False),
+                                            start_time=pto_data.get('start_time'),
+                                            end_time=pto_data.get('end_time'), is_call_out=is_call_out)
+        except RequestConflict:
+            db.session.rollback()
+            raise
+        if existing_id is not None:
+            db.session.commit()
+            return db.session.get(PTORequest, existing_id)
+
         # Create PTO request with auto-approval for call-outs
         request = PTORequest(
             member_id=member.id,
@@ -133,6 +151,7 @@ class PTOTrackerSystem:
 
         db.session.add(request)
         db.session.flush()  # Get the ID before deducting balance
+        announce_created([request])
 
         # If call-out, automatically deduct from sick balance
         if is_call_out and member:
@@ -156,9 +175,8 @@ class PTOTrackerSystem:
     def approve_request(self, request_id, manager):
         """Approve a PTO request"""
         request = PTORequest.query.get(request_id)
-        if request and request.status == 'pending':
-            request.status = 'approved'
-
+        actor_id = manager.id if manager else None
+        if request and request.status == 'pending' and transition_request(request, 'approved', actor_id=actor_id):
             # Deduct from appropriate balance based on request type
             if request.member:
                 hours_to_deduct = request.duration_hours
@@ -181,9 +199,52 @@ class PTOTrackerSystem:
     def deny_request(self, request_id, denial_reason, manager):
         """Deny a PTO request"""
         request = PTORequest.query.get(request_id)
-        if request and request.status == 'pending':
-            request.status = 'denied'
-            request.denial_reason = denial_reason
+        actor_id = manager.id if manager else None
+        if request and request.status == 'pending' and transition_request(request, 'denied', actor_id=actor_id,
+                                                                          denial_reason=denial_reason):
             db.session.commit()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+def stage_pto_request(member_id, start_date, end_date, pto_type, manager_team, reason=None, is_call_out=False,
+                      is_partial_day=False, start_time=None, end_time=None):
+    """
+    Stage a submitted PTO request (call-outs are auto-approved with sick balance deducted)
+    Does not commit (see group_commit.run_write); returns the new PTO request ID, or the
+    ID of an identical active request it was merged into
+    Raises overlaps.RequestConflict if it overlaps another active request of the member
+    (call-outs only merge into a duplicate; other requests don't block calling out sick)
+    """
+    is_partial_day = bool(is_partial_day and start_time and end_time)
+    existing_id = check_new_request(member_id, start_date, end_date, pto_type=pto_type,
+                                    is_partial_day=is_partial_day, start_time=start_time, end_time=end_time,
+                                    is_call_out=is_call_out)
+    if existing_id is not None:
+        return existing_id
+
+    pto_request = PTORequest(
+        member_id=member_id,
+        start_date=start_date,
+        end_date=end_date,
+        pto_type=pto_type,
+        reason=reason,
+        manager_team=manager_team,
+        is_call_out=is_call_out,
+        is_partial_day=is_partial_day,
+        start_time=start_time if is_partial_day else None,
+        end_time=end_time if is_partial_day else None,
+        status='approved' if is_call_out else 'pending'
+    )
+    db.session.add(pto_request)
+    db.session.flush()  # Get the ID before deducting balance
+    announce_created([pto_request])
+
+    # If call-out, automatically deduct from sick balance
+    if is_call_out:
+        member = db.session.get(TeamMember, member_id)
+        hours_to_deduct = pto_request.duration_hours
+        current_sick_balance = float(member.sick_balance_hours)
+        member.sick_balance_hours = max(0, current_sick_balance - hours_to_deduct)
+
+    return pto_request.id
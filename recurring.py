@@ -0,0 +1,185 @@
+"""
+Recurring and Multi-Range PTO Requests
+Expands a recurrence (a small RRULE subset) or an explicit list of date ranges into
+occurrences and submits them as one batch: every occurrence is validated in one pass
+(overlaps with the member's active requests via a single range scan, overlaps within
+the batch, and the total hours against the balance), then all rows are written in one
+transaction with a single multi-row INSERT. The caller sends one summary
+notification for the batch.
+
+Recurrences start at the submitted start date (DTSTART) and use RRULE syntax:
+
+    FREQ=WEEKLY;INTERVAL=2;BYDAY=FR;UNTIL=2026-08-28    every other Friday
+    FREQ=WEEKLY;BYDAY=TU,TH;COUNT=10                     ten Tuesdays/Thursdays
+    FREQ=DAILY;UNTIL=20260515                            every day through May 15
+
+BYDAY defaults to DTSTART's weekday, and one of UNTIL or COUNT is required. Occurrences
+on weekends or holidays (see holiday_calendar.py) are skipped and reported, as are
+ranges without a business day and exact duplicates of requests already submitted
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+
+from business_days import BusinessDaysCalculator
+from database import db
+from holiday_calendar import WEEKDAYS
+from models import PTORequest, TeamMember
+from overlaps import RequestConflict, find_conflicts_for_ranges
+from transitions import announce_created
+
+MAX_OCCURRENCES = 104
+MAX_SPAN_DAYS = 366
+
+Occurrence = namedtuple('Occurrence', ['start_date', 'end_date'])
+
+BatchResult = namedtuple('BatchResult', ['request_ids', 'skipped', 'duplicates', 'total_hours'])
+
+
+class RecurrenceError(ValueError):
+    """A recurrence or range list that cannot be submitted (bad syntax, too long, over balance)"""
+
+
+def _parse_date(value, field):
+    value = (value or '').strip()
+    try:
+        if len(value) == 8 and value.isdigit():
+            return date(int(value[:4]), int(value[4:6]), int(value[6:]))
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        raise RecurrenceError(f"{field} must be a date (YYYY-MM-DD), got {value!r}")
+
+
+def parse_rrule(text):
+    """'FREQ=WEEKLY;INTERVAL=2;BYDAY=FR;UNTIL=...' -> dict(freq, interval, byday, until, count)"""
+    parts = {}
+    for part in (text or '').upper().replace('RRULE:', '').split(';'):
+        if part.strip():
+            key, _, value = part.partition('=')
+            parts[key.strip()] = value.strip()
+
+    freq = parts.get('FREQ')
+    if freq not in ('DAILY', 'WEEKLY'):
+        raise RecurrenceError("FREQ must be DAILY or WEEKLY")
+    try:
+        interval = int(parts.get('INTERVAL', '1'))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise RecurrenceError("INTERVAL and COUNT must be whole numbers")
+    if interval < 1 or (count is not None and not 1 <= count <= MAX_OCCURRENCES):
+        raise RecurrenceError(f"INTERVAL must be at least 1 and COUNT between 1 and {MAX_OCCURRENCES}")
+    until = _parse_date(parts['UNTIL'], 'UNTIL') if 'UNTIL' in parts else None
+    if until is None and count is None:
+        raise RecurrenceError("Give UNTIL or COUNT so the recurrence ends")
+
+    byday = []
+    for day in filter(None, parts.get('BYDAY', '').split(',')):
+        if day not in WEEKDAYS:
+            raise RecurrenceError(f"Unknown BYDAY {day!r} (use {', '.join(WEEKDAYS)})")
+        byday.append(WEEKDAYS.index(day))
+    return {'freq': freq, 'interval': interval, 'byday': sorted(set(byday)), 'until': until, 'count': count}
+
+
+def expand_rrule(rule, dtstart):
+    """(occurrences, skipped dates) of a parsed rule; single-day occurrences from dtstart on"""
+    byday = rule['byday'] or [dtstart.weekday()]
+    last = min(rule['until'] or date.max, dtstart + timedelta(days=MAX_SPAN_DAYS - 1))
+    if rule['freq'] == 'WEEKLY':
+        week = dtstart - timedelta(days=dtstart.weekday())
+        step = timedelta(weeks=rule['interval'])
+        candidates = (week + i * step + timedelta(days=wd) for i in range(MAX_SPAN_DAYS) for wd in byday)
+    else:
+        candidates = (dtstart + timedelta(days=i * rule['interval']) for i in range(MAX_SPAN_DAYS))
+        candidates = (day for day in candidates if not rule['byday'] or day.weekday() in rule['byday'])
+
+    occurrences, skipped, generated = [], [], 0
+    for day in candidates:
+        if day < dtstart:
+            continue
+        if day > last or (rule['count'] is not None and generated >= rule['count']):
+            break
+        generated += 1
+        if BusinessDaysCalculator.is_business_day(day):
+            occurrences.append(Occurrence(day.isoformat(), day.isoformat()))
+        else:
+            skipped.append(day.isoformat())
+    return occurrences, skipped
+
+
+def parse_ranges(ranges):
+    """(occurrences, skipped) from [{'start_date', 'end_date'}, ...]; ranges must not overlap"""
+    occurrences, skipped = [], []
+    for i, item in enumerate(ranges or []):
+        start = _parse_date(item.get('start_date'), f"ranges[{i}].start_date")
+        end = _parse_date(item.get('end_date') or item.get('start_date'), f"ranges[{i}].end_date")
+        if end < start:
+            raise RecurrenceError(f"ranges[{i}] ends before it starts")
+        if BusinessDaysCalculator.calculate_business_days(start, end):
+            occurrences.append(Occurrence(start.isoformat(), end.isoformat()))
+        else:
+            skipped.append(start.isoformat())
+    occurrences.sort()
+    for previous, current in zip(occurrences, occurrences[1:]):
+        if current.start_date <= previous.end_date:
+            raise RecurrenceError(f"Ranges {previous.start_date} to {previous.end_date} and "
+                                  f"{current.start_date} to {current.end_date} overlap")
+    return occurrences, skipped
+
+
+def expand_submission(recurrence=None, start_date=None, ranges=None):
+    """(occurrences, skipped) for either a recurrence starting at start_date or explicit ranges"""
+    if recurrence:
+        occurrences, skipped = expand_rrule(parse_rrule(recurrence), _parse_date(start_date, 'start_date'))
+    else:
+        occurrences, skipped = parse_ranges(ranges)
+    if not occurrences:
+        raise RecurrenceError("No business days to request in the given dates")
+    if len(occurrences) > MAX_OCCURRENCES:
+        raise RecurrenceError(f"At most {MAX_OCCURRENCES} occurrences can be submitted at once")
+    return occurrences, skipped
+
+
+def stage_recurring_requests(member_id, occurrences, pto_type, manager_team, reason=None, is_partial_day=False,
+                             start_time=None, end_time=None, skipped=()):
+    """
+    Validate and stage one pending request per occurrence (all or none)
+    Does not commit (see group_commit.run_write); returns a BatchResult
+    Raises RequestConflict for overlaps with active requests and RecurrenceError if the
+    total exceeds the member's balance
+    """
+    is_partial_day = bool(is_partial_day and start_time and end_time)
+    member = db.session.get(TeamMember, member_id)
+    fields = dict(pto_type=pto_type, is_partial_day=is_partial_day, start_time=start_time, end_time=end_time)
+
+    conflicts = find_conflicts_for_ranges(member_id, occurrences, **fields)
+    overlapping = [c for found in conflicts for c in found if c.kind != 'duplicate']
+    if overlapping:
+        raise RequestConflict(overlapping)
+    duplicates = [occurrence.start_date for occurrence, found in zip(occurrences, conflicts) if found]
+
+    rows = [
+        dict(member_id=member_id, start_date=occurrence.start_date, end_date=occurrence.end_date,
+             pto_type=pto_type, reason=reason, manager_team=manager_team, is_call_out=False,
+             is_partial_day=is_partial_day, start_time=start_time if is_partial_day else None,
+             end_time=end_time if is_partial_day else None, status='pending')
+        for occurrence, found in zip(occurrences, conflicts) if not found
+    ]
+    if not rows:
+        return BatchResult([], list(skipped), duplicates, 0)
+
+    # Priced on transient objects (by the member's work schedule) before anything is written
+    total_hours = round(sum(PTORequest(**row).duration_hours for row in rows), 2)
+    balance = member.get_remaining_sick_hours() if pto_type == 'Sick Leave' else member.get_remaining_pto_hours()
+    if total_hours > balance:
+        raise RecurrenceError(f"These {len(rows)} requests need {total_hours:g} hours but only "
+                              f"{balance:g} hours are available")
+
+    # ORM bulk INSERT: one multi-row statement (a flush of new objects would insert them one
+    # by one on SQLite to get ids back in order); the commit hooks hear of the rows from
+    # the announcement instead of the flush
+    pto_requests = sorted(db.session.scalars(insert(PTORequest).returning(PTORequest), rows),
+                          key=lambda r: r.start_date)
+    announce_created(pto_requests)
+    return BatchResult([r.id for r in pto_requests], list(skipped), duplicates, total_hours)
@@ -0,0 +1,191 @@
+"""
+Read-Replica Routing
+Read-only views (dashboards, calendar, employee pages, work queues) send their
+SELECTs to the 'replica' bind when REPLICA_DATABASE_URL is set. Writes, flushes
+and read-your-writes paths always use the primary:
+
+- any write in the current request pins the rest of the request to the primary
+- a request that wrote pins the browser session to the primary for
+  REPLICA_STICKY_SECONDS, so the redirect after a POST sees its own change
+- ?read_from=primary or an X-Read-From: primary header forces the primary
+
+For local testing with two SQLite files, the replica is refreshed from the primary
+every REPLICA_REFRESH_SECONDS with sqlite3's online backup API
+"""
+
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import click
+import sqlalchemy as sa
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+
+logger = logging.getLogger(__name__)
+
+REPLICA_BIND = 'replica'
+_PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends plain SELECTs to the replica inside read-only views"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replica_reads_active(self) and isinstance(clause, sa.Select):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _note_flush(db_session, flush_context):
+    note_primary_write()
+
+
+def _replica_reads_active(db_session):
+    if not has_request_context() or g.get('db_route') != REPLICA_BIND:
+        return False
+    # Anything written (or about to be flushed) in this request must be read back from the primary
+    return not (db_session._flushing or db_session.new or db_session.deleted or g.get('db_wrote'))
+
+
+def note_primary_write():
+    """Pin the current request, and briefly the browser session, to the primary"""
+    if has_request_context():
+        g.db_wrote = True
+
+
+def use_primary():
+    """Per-request override: route every remaining query in this request to the primary"""
+    if has_request_context():
+        g.db_route = None
+
+
+def _primary_requested():
+    if request.args.get('read_from') == 'primary' or request.headers.get('X-Read-From') == 'primary':
+        return True
+    return session.get(_PRIMARY_UNTIL_KEY, 0) > time.time()
+
+
+def replica_reads(view):
+    """Route the SELECTs of a read-only view to the replica unless the primary is required"""
+    @functools.wraps(view)
+    def wrapped(*args, **kwargs):
+        if not _primary_requested():
+            g.db_route = REPLICA_BIND
+        return view(*args, **kwargs)
+    return wrapped
+
+
+def _sqlite_path(url):
+    url = sa.engine.make_url(url)
+    if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+        return None
+    return url.database
+
+
+def refresh_sqlite_replica(primary_path, replica_path):
+    """Copy the primary SQLite file onto the replica with the online backup API"""
+    started = time.perf_counter()
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path, timeout=30)
+    try:
+        # One step copies every page under a single read transaction on the primary,
+        # so replica readers always see a consistent snapshot
+        source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+    return time.perf_counter() - started
+
+
+class ReplicaRefresher:
+    """Background thread that periodically snapshots the primary SQLite file to the replica"""
+
+    def __init__(self, primary_path, replica_path, interval):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.last_refreshed = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def refresh(self):
+        if not os.path.exists(self.primary_path):
+            return None
+        elapsed = refresh_sqlite_replica(self.primary_path, self.replica_path)
+        self.last_refreshed = time.time()
+        logger.debug(f"Replica refreshed in {elapsed * 1000:.1f} ms")
+        return elapsed
+
+    def ensure_started(self):
+        # Started lazily (and again after a fork) because threads don't survive fork
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='replica-refresher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Replica refresh failed")
+            time.sleep(self.interval)
+
+
+def init_read_replica(app, settings):
+    """
+    Enable replica routing for the app when SQLALCHEMY_BINDS has a 'replica' entry
+    (configured from REPLICA_DATABASE_URL before the engine profile is initialized)
+    """
+    replica_url = app.config.get('SQLALCHEMY_BINDS', {}).get(REPLICA_BIND)
+    if not replica_url:
+        return None
+
+    # Use the engines' URLs: Flask-SQLAlchemy resolves relative SQLite paths against instance/
+    with app.app_context():
+        engines = app.extensions['sqlalchemy'].engines
+        primary_path = _sqlite_path(engines[None].url)
+        replica_path = _sqlite_path(engines[REPLICA_BIND].url)
+
+    refresher = None
+    if primary_path and replica_path:
+        refresher = ReplicaRefresher(primary_path, replica_path, settings.replica_refresh_seconds)
+        # Take the first snapshot now so the replica has the schema before any request
+        refresher.refresh()
+        app.extensions['replica_refresher'] = refresher
+
+        if settings.replica_refresh_seconds > 0:
+            @app.before_request
+            def _start_replica_refresher():
+                refresher.ensure_started()
+
+    sticky_seconds = settings.replica_sticky_seconds
+
+    @app.after_request
+    def _pin_session_after_write(response):
+        if g.get('db_wrote') and sticky_seconds > 0:
+            session[_PRIMARY_UNTIL_KEY] = time.time() + sticky_seconds
+        return response
+
+    @app.cli.command('refresh-replica')
+    def refresh_replica_command():
+        """Copy the primary SQLite database onto the replica file."""
+        if refresher is None:
+            raise click.ClickException("refresh-replica only supports a SQLite primary and replica")
+        elapsed = refresher.refresh()
+        click.echo(f"Replica refreshed in {elapsed * 1000:.1f} ms")
+
+    logger.info("Read-replica routing enabled", extra={'replica_refresh_seconds': settings.replica_refresh_seconds,
+                                                        'replica_sticky_seconds': sticky_seconds})
+    return refresher
@@ -0,0 +1,248 @@
+"""
+Request Event Log and Status Counters
+Every status_changed announcement (see transitions.py) appends one pto_request_events
+row per request, with one INSERT, and adjusts request_status_counts (live requests per
+manager team and status) by the net change, in the same transaction as the change
+itself. Dashboards read their counts from those few rows instead of counting
+pto_requests, and approval latency can be replayed from the log at any time.
+
+Archival moves rows out of pto_requests, so archive.py moves their counts to an
+'archived:<status>' key (note_requests_archived): dashboard totals keep including
+archived requests while the live counts stay exact. `flask rebuild-status-counts`
+recomputes the counts from live and archived requests. Requests that predate the log
+get events reconstructed from their timestamps, and are counted, in batches when the
+tables are created (backfill_events)
+"""
+
+import logging
+from collections import Counter, namedtuple
+from statistics import median
+
+import click
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import db
+from models import PTORequest, PTORequestEvent, PTORequestHistory, RequestStatusCount, get_eastern_time
+from transitions import status_changed
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ('pending', 'in_progress', 'approved', 'denied', 'completed')
+ARCHIVED_PREFIX = 'archived:'
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others fall back to UPDATE then INSERT
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+ApprovalLatency = namedtuple('ApprovalLatency', ['request_id', 'team', 'submitted_at', 'approved_at', 'hours'])
+
+
+def adjust_status_counts(deltas):
+    """Add {(team, status): delta} to the counters; one atomic statement per key"""
+    table = RequestStatusCount.__table__
+    make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+    for (team, status), delta in deltas.items():
+        if not delta:
+            continue
+        if make_insert is not None:
+            stmt = make_insert(table).values(team=team, status=status, count=delta)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=['team', 'status'], set_={'count': table.c.count + stmt.excluded.count}))
+            continue
+        result = db.session.execute(
+            update(table).where(table.c.team == team, table.c.status == status).values(count=table.c.count + delta)
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(table).values(team=team, status=status, count=delta))
+
+
+@status_changed.connect
+def _record_events(db_session, changes):
+    occurred_at = get_eastern_time()
+    deltas = Counter()
+    rows = []
+    for change in changes:
+        team = change.pto_request.manager_team
+        rows.append({'request_id': change.pto_request.id, 'team': team, 'old_status': change.old_status,
+                     'new_status': change.new_status, 'actor_id': change.actor_id, 'occurred_at': occurred_at})
+        if change.old_status is not None:
+            deltas[(team, change.old_status)] -= 1
+        deltas[(team, change.new_status)] += 1
+    db_session.execute(insert(PTORequestEvent.__table__), rows)
+    adjust_status_counts(deltas)
+
+
+def _counter_status(status, is_archived):
+    return f'{ARCHIVED_PREFIX}{status}' if is_archived else status
+
+
+def note_requests_archived(request_ids):
+    """Move requests that are about to be archived from their live counters to the archived ones"""
+    grouped = db.session.execute(
+        select(PTORequest.manager_team, PTORequest.status, func.count())
+        .where(PTORequest.id.in_(request_ids))
+        .group_by(PTORequest.manager_team, PTORequest.status)
+    )
+    deltas = Counter()
+    for team, status, count in grouped:
+        deltas[(team, status)] -= count
+        deltas[(team, _counter_status(status, True))] += count
+    adjust_status_counts(deltas)
+
+
+def status_counts(team):
+    """
+    {status: requests} for a manager team, live and archived together (every status present),
+    plus 'total' and 'archived' (how many of them have been archived)
+    """
+    counts = dict.fromkeys(STATUSES, 0)
+    archived = 0
+    for status, count in db.session.execute(
+        select(RequestStatusCount.status, RequestStatusCount.count).where(RequestStatusCount.team == team)
+    ):
+        if status.startswith(ARCHIVED_PREFIX):
+            status = status[len(ARCHIVED_PREFIX):]
+            archived += count
+        counts[status] = counts.get(status, 0) + count
+    counts['total'] = sum(counts.values())
+    counts['archived'] = archived
+    return counts
+
+
+def transitions_since(team, new_status, since):
+    """How many requests of a team moved to new_status at or after since (an index range count)"""
+    return db.session.scalar(
+        select(func.count()).select_from(PTORequestEvent)
+        .where(PTORequestEvent.team == team, PTORequestEvent.new_status == new_status,
+               PTORequestEvent.occurred_at >= since)
+    )
+
+
+def rebuild_status_counts(dry_run=False):
+    """
+    Recompute request_status_counts from live and archived requests and replace the table
+    in one transaction
+    Returns {'rows', 'changed'} where changed counts (team, status) pairs that differed
+    """
+    computed = {
+        (team, _counter_status(status, is_archived)): count
+        for team, status, is_archived, count in db.session.execute(
+            select(PTORequestHistory.manager_team, PTORequestHistory.status, PTORequestHistory.is_archived,
+                   func.count())
+            .group_by(PTORequestHistory.manager_team, PTORequestHistory.status, PTORequestHistory.is_archived)
+        )
+    }
+    existing = {(r.team, r.status): r.count for r in RequestStatusCount.query.filter(RequestStatusCount.count != 0)}
+    stats = {'rows': len(computed), 'changed': sum(1 for key in computed.keys() | existing.keys()
+                                                   if computed.get(key) != existing.get(key))}
+    if dry_run:
+        db.session.rollback()
+        return stats
+
+    db.session.execute(delete(RequestStatusCount.__table__))
+    if computed:
+        db.session.execute(insert(RequestStatusCount.__table__), [
+            {'team': team, 'status': status, 'count': count} for (team, status), count in computed.items()
+        ])
+    db.session.commit()
+    logger.info("Rebuilt request status counts", extra=stats)
+    return stats
+
+
+def _reconstructed_events(pto_request):
+    """Best-effort history of a request that predates the log, from its timestamps"""
+    submitted_at = pto_request.submitted_at or pto_request.created_at or pto_request.updated_at
+    if pto_request.is_call_out and pto_request.status in ('approved', 'completed'):
+        events = [(None, 'approved', submitted_at)]  # auto-approved on submission
+    else:
+        events = [(None, 'pending', submitted_at)]
+        if pto_request.approved_date and pto_request.status in ('in_progress', 'approved', 'completed', 'denied'):
+            events.append(('pending', 'in_progress', pto_request.approved_date))
+    if pto_request.status == 'completed' and events[-1][1] != 'approved':
+        events.append((events[-1][1], 'approved', pto_request.updated_at))
+    if events[-1][1] != pto_request.status:
+        at = pto_request.completed_date if pto_request.status == 'completed' else pto_request.updated_at
+        events.append((events[-1][1], pto_request.status, at or events[-1][2]))
+    return [{'request_id': pto_request.id, 'team': pto_request.manager_team, 'old_status': old, 'new_status': new,
+             'actor_id': None, 'occurred_at': at or submitted_at} for old, new, at in events]
+
+
+def backfill_events(request_ids=None, batch_size=1000):
+    """
+    Reconstruct events for live and archived requests (or only these ids) that have none
+    yet, and add them to the counters; returns event rows written. Does not commit
+    (the migration calls it once per batch of ids)
+    """
+    logged = select(PTORequestEvent.request_id).distinct()
+    query = select(PTORequestHistory).where(PTORequestHistory.id.not_in(logged))
+    if request_ids is not None:
+        query = query.where(PTORequestHistory.id.in_(request_ids))
+    query = query.order_by(PTORequestHistory.id).execution_options(yield_per=batch_size)
+    rows, deltas = [], Counter()
+    for pto_request in db.session.scalars(query):
+        rows.extend(event for event in _reconstructed_events(pto_request) if event['occurred_at'] is not None)
+        deltas[(pto_request.manager_team, _counter_status(pto_request.status, pto_request.is_archived))] += 1
+    if rows:
+        db.session.execute(insert(PTORequestEvent.__table__), rows)
+    adjust_status_counts(deltas)
+    return len(rows)
+
+
+def replay_approval_latency(team=None, since=None, until=None):
+    """
+    ApprovalLatency for every request whose first approval (pending -> in_progress or
+    approved) falls in [since, until), replayed from the event log in request order
+    """
+    query = select(PTORequestEvent).order_by(PTORequestEvent.request_id, PTORequestEvent.occurred_at,
+                                             PTORequestEvent.id)
+    if team:
+        query = query.where(PTORequestEvent.team == team)
+
+    submitted, latencies = {}, []
+    for event in db.session.scalars(query.execution_options(yield_per=1000)):
+        if event.old_status is None and event.new_status == 'pending':
+            submitted[event.request_id] = event.occurred_at
+        elif event.old_status == 'pending' and event.new_status in ('in_progress', 'approved'):
+            submitted_at = submitted.pop(event.request_id, None)
+            if submitted_at is None or (since and event.occurred_at < since) or (until and event.occurred_at >= until):
+                continue
+            hours = round((event.occurred_at - submitted_at).total_seconds() / 3600, 2)
+            latencies.append(ApprovalLatency(event.request_id, event.team, submitted_at, event.occurred_at, hours))
+    return latencies
+
+
+def summarize_latency(latencies):
+    """{'requests', 'median_hours', 'p90_hours', 'max_hours'} of replayed latencies"""
+    hours = sorted(latency.hours for latency in latencies)
+    if not hours:
+        return {'requests': 0, 'median_hours': None, 'p90_hours': None, 'max_hours': None}
+    return {'requests': len(hours), 'median_hours': round(median(hours), 2),
+            'p90_hours': hours[min(len(hours) - 1, int(len(hours) * 0.9))], 'max_hours': hours[-1]}
+
+
+def register_request_event_commands(app):
+    """Register the `flask rebuild-status-counts` and `flask approval-latency` CLI commands"""
+
+    @app.cli.command('rebuild-status-counts')
+    @click.option('--dry-run', is_flag=True, help='Only report how many counters are out of date.')
+    def rebuild_status_counts_command(dry_run):
+        """Recompute the dashboard status counters from live and archived requests"""
+        stats = rebuild_status_counts(dry_run=dry_run)
+        if dry_run:
+            click.echo(f"{stats['changed']} of {stats['rows']} status counters are out of date (dry run)")
+        else:
+            click.echo(f"Rebuilt {stats['rows']} status counters ({stats['changed']} changed)")
+
+    @app.cli.command('approval-latency')
+    @click.option('--team', default=None, help='Only requests of this manager team.')
+    @click.option('--since', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Only approvals on or after this date (YYYY-MM-DD).')
+    def approval_latency_command(team, since):
+        """Replay time from submission to first approval from the event log"""
+        summary = summarize_latency(replay_approval_latency(team=team, since=since))
+        if not summary['requests']:
+            click.echo("No approvals in the event log for these filters")
+            return
+        click.echo(f"{summary['requests']} approvals: median {summary['median_hours']}h, "
+                   f"p90 {summary['p90_hours']}h, max {summary['max_hours']}h")
@@ -0,0 +1,260 @@
+"""
+PTO Usage Rollups
+Pre-aggregated PTO usage per (team, position, month, pto_type) in pto_usage_rollups.
+Every status transition that moves a request into or out of the counted statuses
+applies a +/- delta to its rows in the same transaction as the status change, so
+report endpoints read only the rows they return instead of scanning pto_requests.
+`flask rebuild-rollups` recomputes everything from live and archived requests for repairs
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+
+import click
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from business_days import BusinessDaysCalculator
+from database import db
+from holiday_calendar import get_holiday_calendar
+from models import Position, PTORequestHistory, PTOUsageRollup, TeamMember
+from transitions import status_changed
+from work_schedules import scheduled_hours_by_month
+
+logger = logging.getLogger(__name__)
+
+# Requests in these statuses count as used (or committed) PTO
+COUNTED_STATUSES = frozenset({'in_progress', 'approved', 'completed'})
+
+KEY_COLUMNS = ('team', 'position', 'month', 'pto_type')
+VALUE_COLUMNS = ('request_count', 'call_outs', 'days', 'hours')
+UNASSIGNED_POSITION = 'Unassigned'
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE; others fall back to UPDATE then INSERT
+_UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+
+@lru_cache(maxsize=4096)
+def _business_days_by_month(start_date, end_date):
+    """((month, business days), ...) for a full-day request, in month order"""
+    start = datetime.strptime(start_date, '%Y-%m-%d').date()
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    by_month = defaultdict(int)
+    for day in BusinessDaysCalculator.get_business_days_list(start, end):
+        by_month[day.strftime('%Y-%m')] += 1
+    return tuple(sorted(by_month.items()))
+
+
+# Holiday calendar edits change which days count
+get_holiday_calendar().subscribe(lambda year_ranges: _business_days_by_month.cache_clear())
+
+def usage_deltas(pto_request, team, position, sign=1):
+    """
+    {(team, position, month, pto_type): {column: delta}} for one request
+    Days and hours are split across the months they fall in; the request itself
+    (and its call-out flag) counts once, in the month it starts
+    """
+    start_month = pto_request.start_date[:7]
+    if pto_request.is_partial_day and pto_request.start_time and pto_request.end_time:
+        months = ((start_month, pto_request.duration_days, pto_request.duration_hours),)
+    else:
+        scheduled = scheduled_hours_by_month(pto_request.member_id, pto_request.start_date,
+                                             pto_request.end_date) or {}
+        months = tuple((month, days, scheduled.get(month, days * 7.5))
+                       for month, days in _business_days_by_month(pto_request.start_date, pto_request.end_date))
+
+    deltas = {}
+    for month, days, hours in months or ((start_month, 0, 0),):
+        deltas[(team, position, month, pto_request.pto_type)] = {
+            'request_count': 0, 'call_outs': 0, 'days': sign * days, 'hours': round(sign * hours, 2),
+        }
+    first = deltas.setdefault((team, position, start_month, pto_request.pto_type),
+                              {'request_count': 0, 'call_outs': 0, 'days': 0, 'hours': 0})
+    first['request_count'] = sign
+    first['call_outs'] = sign if pto_request.is_call_out else 0
+    return deltas
+
+
+def _team_and_position(pto_request):
+    position = pto_request.member.position if pto_request.member else None
+    if position is None:
+        return pto_request.manager_team, UNASSIGNED_POSITION
+    return position.team, position.name
+
+
+def _apply_delta(key, values):
+    table = PTOUsageRollup.__table__
+    row = dict(zip(KEY_COLUMNS, key))
+    make_insert = _UPSERT_INSERTS.get(db.engine.dialect.name)
+
+    if make_insert is not None:
+        stmt = make_insert(table).values(**row, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={name: table.c[name] + stmt.excluded[name] for name in VALUE_COLUMNS},
+        )
+        db.session.execute(stmt)
+        return
+
+    result = db.session.execute(
+        update(table)
+        .where(*(table.c[name] == value for name, value in row.items()))
+        .values({name: table.c[name] + delta for name, delta in values.items()})
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(**row, **values))
+
+
+def record_transition(pto_request, old_status, new_status):
+    """
+    Apply the rollup delta for a status change (old_status None for a new request)
+    Called for every status_changed announcement (see transitions.py), before the caller
+    commits; transitions between two counted (or two uncounted) statuses are no-ops
+    """
+    was_counted = old_status in COUNTED_STATUSES
+    is_counted = new_status in COUNTED_STATUSES
+    if was_counted == is_counted:
+        return
+
+    team, position = _team_and_position(pto_request)
+    try:
+        deltas = usage_deltas(pto_request, team, position, sign=1 if is_counted else -1)
+    except (TypeError, ValueError):
+        logger.warning(f"Skipping rollup update for request #{pto_request.id} with invalid dates",
+                       extra={'start_date': pto_request.start_date, 'end_date': pto_request.end_date})
+        return
+
+    for key, values in deltas.items():
+        _apply_delta(key, values)
+
+
+@status_changed.connect
+def _record_status_changes(db_session, changes):
+    for change in changes:
+        record_transition(change.pto_request, change.old_status, change.new_status)
+
+
+def _computed_rollups(request_ids=None, batch_size=1000):
+    """
+    Aggregate every counted live and archived request (or only these ids)
+    Returns ({key: values}, requests counted)
+    """
+    totals = defaultdict(lambda: dict.fromkeys(VALUE_COLUMNS, 0))
+    query = (
+        select(PTORequestHistory, Position.team, Position.name)
+        .join(TeamMember, TeamMember.id == PTORequestHistory.member_id)
+        .outerjoin(Position, Position.id == TeamMember.position_id)
+        .where(PTORequestHistory.status.in_(COUNTED_STATUSES))
+        .execution_options(yield_per=batch_size)
+    )
+    if request_ids is not None:
+        query = query.where(PTORequestHistory.id.in_(request_ids))
+    counted = 0
+    for pto_request, team, position in db.session.execute(query):
+        try:
+            deltas = usage_deltas(pto_request, team or pto_request.manager_team, position or UNASSIGNED_POSITION)
+        except (TypeError, ValueError):
+            logger.warning(f"Skipping request #{pto_request.id} with invalid dates in rollup rebuild")
+            continue
+        counted += 1
+        for key, values in deltas.items():
+            for name, delta in values.items():
+                totals[key][name] += delta
+    return totals, counted
+
+
+def _normalized(values):
+    return tuple(round(float(values[name]), 2) for name in VALUE_COLUMNS)
+
+
+def rebuild_rollups(dry_run=False):
+    """
+    Recompute pto_usage_rollups from scratch and replace the table in one transaction
+    Returns {'requests', 'rows', 'changed'} where changed counts rows that differed
+    """
+    computed, counted = _computed_rollups()
+    computed = {key: values for key, values in computed.items() if any(values.values())}
+
+    existing = {
+        tuple(getattr(r, name) for name in KEY_COLUMNS): _normalized({n: getattr(r, n) for n in VALUE_COLUMNS})
+        for r in PTOUsageRollup.query.all()
+    }
+    changed = sum(1 for key in computed.keys() | existing.keys()
+                  if existing.get(key) != (_normalized(computed[key]) if key in computed else None))
+    stats = {'requests': counted, 'rows': len(computed), 'changed': changed}
+
+    if dry_run:
+        db.session.rollback()
+        return stats
+
+    db.session.execute(delete(PTOUsageRollup.__table__))
+    if computed:
+        db.session.execute(insert(PTOUsageRollup.__table__), [
+            {**dict(zip(KEY_COLUMNS, key)), **{name: round(values[name], 2) for name in VALUE_COLUMNS}}
+            for key, values in computed.items()
+        ])
+    db.session.commit()
+    logger.info(f"Rebuilt PTO usage rollups from {counted} requests", extra=stats)
+    return stats
+
+
+def add_rollups(request_ids):
+    """
+    Add the usage of these live and archived requests to the rollups; returns requests
+    counted. Does not commit (the migration seeds the table one batch of ids at a time)
+    """
+    computed, counted = _computed_rollups(request_ids)
+    for key, values in computed.items():
+        if any(values.values()):
+            _apply_delta(key, {name: round(value, 2) for name, value in values.items()})
+    return counted
+
+
+def query_usage(start_month=None, end_month=None, team=None, position=None, pto_type=None, group_by=KEY_COLUMNS):
+    """
+    Rollup rows matching the filters, summed over the key columns not in group_by
+    Months are 'YYYY-MM' and inclusive; rows that netted out to zero are left out
+    """
+    group_columns = [PTOUsageRollup.__table__.c[name] for name in group_by]
+    query = (
+        select(*group_columns, *(func.sum(PTOUsageRollup.__table__.c[name]).label(name) for name in VALUE_COLUMNS))
+        .where(or_(PTOUsageRollup.request_count != 0, PTOUsageRollup.hours != 0))
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    )
+    if start_month:
+        query = query.where(PTOUsageRollup.month >= start_month)
+    if end_month:
+        query = query.where(PTOUsageRollup.month <= end_month)
+    if team:
+        query = query.where(PTOUsageRollup.team == team)
+    if position:
+        query = query.where(PTOUsageRollup.position == position)
+    if pto_type:
+        query = query.where(PTOUsageRollup.pto_type == pto_type)
+
+    return [
+        {**{name: getattr(row, name) for name in group_by},
+         'request_count': int(row.request_count), 'call_outs': int(row.call_outs),
+         'days': round(float(row.days), 2), 'hours': round(float(row.hours), 2)}
+        for row in db.session.execute(query)
+    ]
+
+
+def register_rollup_commands(app):
+    """Register the `flask rebuild-rollups` CLI command"""
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--dry-run', is_flag=True, help='Only report how many rollup rows are out of date.')
+    def rebuild_rollups_command(dry_run):
+        """Recompute the PTO usage rollups from live and archived requests."""
+        stats = rebuild_rollups(dry_run=dry_run)
+        if dry_run:
+            click.echo(f"{stats['changed']} of {stats['rows']} rollup rows are out of date "
+                       f"({stats['requests']} counted requests)")
+        else:
+            click.echo(f"Rebuilt {stats['rows']} rollup rows from {stats['requests']} counted requests "
+                       f"({stats['changed']} changed)")
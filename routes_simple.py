@@ -1,31 +1,35 @@
-from flask import render_template, request, redirect, url_for, flash, jsonify, session
+from flask import render_template, request, redirect, url_for, flash, jsonify, session, Response, stream_with_context
 from database import db
-from models import PTORequest, TeamMember, Manager, User, PendingEmployee, Position
-from pto_system import PTOTrackerSystem
-from auth import roles_required, authenticate_user, login_user, logout_user, get_current_user
-from datetime import datetime
-import pytz
-from email_service import EmailService
-
-# Define Eastern timezone
-EASTERN = pytz.timezone('US/Eastern')
-
-def get_eastern_time():
-    """Get current time in Eastern timezone as naive datetime"""
-    eastern_now = datetime.now(EASTERN)
-    # Return naive datetime (no timezone info) but in Eastern time
-    return eastern_now.replace(tzinfo=None)
+from models import PTORequest, PTORequestHistory, TeamMember, PendingEmployee, Position, get_eastern_time
+from pto_system import stage_pto_request
+from group_commit import run_write
+from auth import roles_required, authenticate_user, login_user, logout_user, get_current_identity
+from replica import replica_reads
+from export import parse_export_filters, iter_export_csv, export_filename
+from timekeeping import claim_timekeeping_batch, render_batch, EXPORT_FORMATS
+from rollups import query_usage, KEY_COLUMNS
+from coverage_matrix import get_coverage_matrix
+from interval_index import get_interval_index
+from overlaps import RequestConflict, check_new_request
+from recurring import RecurrenceError, expand_submission, stage_recurring_requests
+from bulk_actions import BulkActionError, parse_bulk_actions, stage_bulk_actions
+from transitions import transition_matching, transition_request
+from request_events import replay_approval_latency, status_counts, summarize_latency, transitions_since
+from config import get_settings
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
 
 def register_routes(app):
-    # Initialize the PTO system
-    pto_system = PTOTrackerSystem()
-    # Initialize the email service
-    email_service = EmailService()
+    # Shared services (PTO system, email) are created lazily by the app's service registry
+    services = app.extensions['services']
 
     @app.route('/')
     def index():
         """Main page for submitting PTO requests"""
-        staff_directory = pto_system.get_staff_directory()
+        staff_directory = services.get('pto_system').get_staff_directory()
         return render_template('index.html', staff_directory=staff_directory)
 
     @app.route('/login', methods=['GET', 'POST'])
@@ -62,6 +66,7 @@ def register_routes(app):
 
     @app.route('/dashboard/admin')
     @roles_required('admin', 'superadmin')
+    @replica_reads
     def admin_dashboard():
         """Admin dashboard"""
         # Get pending requests for admin team (using manager_team field)
@@ -76,25 +81,18 @@ def register_routes(app):
         # Get pending employee registrations for admin team
         pending_employees = PendingEmployee.query.filter_by(status='pending', team='admin').all()
 
-        # Get approved requests this month for admin team
-        from datetime import datetime, timedelta
-        current_month_start = get_eastern_time().replace(day=1)
-        approved_this_month = PTORequest.query.filter_by(status='approved', manager_team='admin').filter(
-            PTORequest.updated_at >= current_month_start
-        ).count()
-
-        # Get total and denied counts
-        total_requests = PTORequest.query.filter_by(manager_team='admin').count()
-        denied_requests = PTORequest.query.filter_by(status='denied', manager_team='admin').count()
+        # Counts come from the status counters and the event log (see request_events.py)
+        counts = status_counts('admin')
+        current_month_start = get_eastern_time().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
         stats = {
-            'pending': len(pending_requests),
+            'pending': counts['pending'],
             'pending_employees': len(pending_employees),
-            'approved_this_month': approved_this_month,
-            'total': total_requests,
-            'denied': denied_requests,
-            'in_progress': len(in_progress_requests),
-            'approved': len(approved_requests)
+            'approved_this_month': transitions_since('admin', 'approved', current_month_start),
+            'total': counts['total'],
+            'denied': counts['denied'],
+            'in_progress': counts['in_progress'],
+            'approved': counts['approved']
         }
 
         return render_template('dashboard_admin.html',
@@ -107,6 +105,7 @@ def register_routes(app):
 
     @app.route('/dashboard/clinical')
     @roles_required('clinical', 'superadmin')
+    @replica_reads
     def clinical_dashboard():
         """Clinical dashboard"""
         # Get pending requests for clinical team (using manager_team field)
@@ -121,25 +120,18 @@ def register_routes(app):
         # Get pending employee registrations for clinical team
         pending_employees = PendingEmployee.query.filter_by(status='pending', team='clinical').all()
 
-        # Get approved requests this month for clinical team
-        from datetime import datetime, timedelta
-        current_month_start = get_eastern_time().replace(day=1)
-        approved_this_month = PTORequest.query.filter_by(status='approved', manager_team='clinical').filter(
-            PTORequest.updated_at >= current_month_start
-        ).count()
-
-        # Get total and denied counts
-        total_requests = PTORequest.query.filter_by(manager_team='clinical').count()
-        denied_requests = PTORequest.query.filter_by(status='denied', manager_team='clinical').count()
+        # Counts come from the status counters and the event log (see request_events.py)
+        counts = status_counts('clinical')
+        current_month_start = get_eastern_time().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
 
         stats = {
-            'pending': len(pending_requests),
+            'pending': counts['pending'],
             'pending_employees': len(pending_employees),
-            'approved_this_month': approved_this_month,
-            'total': total_requests,
-            'denied': denied_requests,
-            'in_progress': len(in_progress_requests),
-            'approved': len(approved_requests)
+            'approved_this_month': transitions_since('clinical', 'approved', current_month_start),
+            'total': counts['total'],
+            'denied': counts['denied'],
+            'in_progress': counts['in_progress'],
+            'approved': counts['approved']
         }
 
         return render_template('dashboard_clinical.html',
@@ -152,16 +144,23 @@ def register_routes(app):
 
     @app.route('/dashboard/superadmin')
     @roles_required('superadmin')
+    @replica_reads
     def superadmin_dashboard():
         """Super admin dashboard"""
-        requests = pto_system.get_all_requests()
+        requests = services.get('pto_system').get_all_requests()
         team_members = TeamMember.query.all()
         return render_template('dashboard_superadmin.html', requests=requests, team_members=team_members)
 
+    @app.route('/api/service-timings')
+    @roles_required('superadmin')
+    def api_service_timings():
+        """API endpoint showing how long each shared service took to initialize"""
+        return jsonify(services.timings())
+
     @app.route('/api/staff-directory')
     def api_staff_directory():
         """API endpoint to get current staff directory"""
-        staff_directory = pto_system.get_staff_directory()
+        staff_directory = services.get('pto_system').get_staff_directory()
 
         # Ensure all team/position combinations exist even if empty
         positions_by_team = {}
@@ -222,6 +221,14 @@ def register_routes(app):
         except Exception as e:
             return jsonify({'success': False, 'message': str(e)}), 500
 
+    def conflict_response(conflict):
+        """409 with the conflicts for API clients, a flash message for the form"""
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(conflict.to_dict()), 409
+        flash(f'This request overlaps an existing one: {conflict}. '
+              f'Please cancel or change that request first.', 'warning')
+        return redirect(url_for('index'))
+
     @app.route('/submit_request', methods=['POST'])
     def submit_request():
         """Handle PTO request submission or new employee registration"""
@@ -304,9 +311,28 @@ def register_routes(app):
                     flash('Please provide a reason for calling out sick.', 'error')
                     return redirect(url_for('index'))
 
+            is_partial_day = request.form.get('is_partial_day') == 'on'
+            start_time = request.form.get('start_time') or None
+            end_time = request.form.get('end_time') or None
+
+            # Overlaps with the employee's active requests: exact duplicates point at the
+            # existing request, anything else is rejected unless this is a call-out
+            # (re-checked inside the write)
+            try:
+                existing_id = check_new_request(member.id, start_date, end_date, pto_type=pto_type,
+                                                is_partial_day=is_partial_day, start_time=start_time,
+                                                end_time=end_time, is_call_out=call_out_flag)
+            except RequestConflict as e:
+                return conflict_response(e)
+            if existing_id is not None:
+                flash(f'This request was already submitted for {name} (Request ID: #{existing_id}).', 'info')
+                return redirect(url_for('index'))
+
             # Create PTO request with proper member relationship
             # Call-outs are auto-approved, regular PTO is pending
-            pto_request = PTORequest(
+            # Written through the group-commit writer so submission bursts share transactions
+            request_id = run_write(
+                stage_pto_request,
                 member_id=member.id,
                 start_date=start_date,
                 end_date=end_date,
@@ -314,26 +340,18 @@ def register_routes(app):
                 reason=reason,
                 manager_team=team,
                 is_call_out=call_out_flag,
-                status='approved' if call_out_flag else 'pending'
+                is_partial_day=is_partial_day,
+                start_time=start_time,
+                end_time=end_time
             )
-
-            db.session.add(pto_request)
-            db.session.commit()
-
-            # If call-out, automatically deduct from sick balance
-            if call_out_flag:
-                hours_to_deduct = pto_request.duration_hours
-                current_sick_balance = float(member.sick_balance_hours)
-                new_sick_balance = max(0, current_sick_balance - hours_to_deduct)
-                member.sick_balance_hours = new_sick_balance
-                db.session.commit()
+            pto_request = PTORequest.query.get(request_id)
 
             # Send email notification for PTO submission
             try:
-                email_service.send_submission_email(pto_request)
+                services.get('email').send_submission_email(pto_request)
             except Exception as e:
                 # Log error but don't fail the request
-                print(f"Failed to send submission email: {str(e)}")
+                logger.error(f"Failed to send submission email: {str(e)}")
 
             # Different success message for call-out vs regular PTO
             if call_out_flag:
@@ -342,11 +360,84 @@ def register_routes(app):
                 flash(f'PTO request submitted successfully for {name}! Request ID: #{pto_request.id}', 'success')
             return redirect(url_for('index'))
 
+        except RequestConflict as e:
+            return conflict_response(e)
         except Exception as e:
             flash(f'Error submitting request: {str(e)}', 'error')
             return redirect(url_for('index'))
 
+    @app.route('/submit_recurring', methods=['POST'])
+    def submit_recurring():
+        """
+        Submit a recurring request (RRULE subset in `recurrence`, starting at `start_date`) or
+        several date ranges (`ranges` in JSON, or repeated range_start/range_end form fields)
+        as one batch: one validation pass, one transaction and one summary email
+        """
+        wants_json = request.is_json or request.accept_mimetypes.best == 'application/json'
+        data = request.get_json(silent=True) or request.form
+
+        def error_response(message, status=400):
+            if wants_json:
+                return jsonify({'error': message}), status
+            flash(message, 'error')
+            return redirect(url_for('index'))
+
+        team, name, pto_type = data.get('team'), data.get('name'), data.get('pto_type')
+        member = TeamMember.query.join(Position).filter(
+            TeamMember.name == name,
+            Position.name == data.get('position'),
+            Position.team == team
+        ).first()
+        if not member:
+            return error_response(f'Employee {name} not found in {team} team', 404)
+        if not pto_type:
+            return error_response('Please choose a PTO type.')
+
+        ranges = data.get('ranges') if request.is_json else [
+            {'start_date': start, 'end_date': end}
+            for start, end in zip(request.form.getlist('range_start'), request.form.getlist('range_end'))
+        ]
+        is_partial_day = data.get('is_partial_day') in (True, 'on', 'true', '1')
+        try:
+            occurrences, skipped = expand_submission(recurrence=data.get('recurrence'),
+                                                     start_date=data.get('start_date'), ranges=ranges)
+            result = run_write(
+                stage_recurring_requests,
+                member_id=member.id,
+                occurrences=occurrences,
+                pto_type=pto_type,
+                manager_team=team,
+                reason=data.get('reason'),
+                is_partial_day=is_partial_day,
+                start_time=data.get('start_time') or None,
+                end_time=data.get('end_time') or None,
+                skipped=skipped
+            )
+        except RequestConflict as e:
+            return (jsonify(e.to_dict()), 409) if wants_json else conflict_response(e)
+        except RecurrenceError as e:
+            return error_response(str(e))
+
+        pto_requests = PTORequest.query.filter(PTORequest.id.in_(result.request_ids)).order_by(
+            PTORequest.start_date).all()
+        if pto_requests:
+            try:
+                services.get('email').send_batch_submission_email(pto_requests, result.skipped, result.duplicates)
+            except Exception as e:
+                # Log error but don't fail the request
+                logger.error(f"Failed to send batch submission email: {str(e)}")
+
+        if wants_json:
+            return jsonify(result._asdict()), 201 if pto_requests else 200
+        if pto_requests:
+            flash(f'{len(pto_requests)} PTO requests submitted for {name} ({result.total_hours:g} hours): '
+                  f'{", ".join(f"#{i}" for i in result.request_ids)}', 'success')
+        else:
+            flash(f'These dates were already submitted for {name}.', 'info')
+        return redirect(url_for('index'))
+
     @app.route('/calendar')
+    @replica_reads
     def calendar():
         """Calendar view of PTO requests"""
         # Get all PTO requests (approved and pending) for calendar display
@@ -413,7 +504,7 @@ def register_routes(app):
     def test_business_days():
         """API endpoint to test business days calculations"""
         try:
-            from business_days import BusinessDaysCalculator, get_pto_breakdown
+            from business_days import get_pto_breakdown
 
             # Test cases demonstrating business days calculation
             test_cases = [
@@ -484,6 +575,7 @@ def register_routes(app):
 
     @app.route('/employees')
     @roles_required('admin', 'clinical', 'superadmin', 'moa_supervisor', 'echo_supervisor')
+    @replica_reads
     def employees():
         """Employee management page"""
         team_members = TeamMember.query.all()
@@ -515,8 +607,7 @@ def register_routes(app):
     @roles_required('admin', 'clinical', 'superadmin')
     def add_employee():
         """Add new employee"""
-        print(f"DEBUG: add_employee called with method: {request.method}")
-        print(f"DEBUG: Form data: {dict(request.form)}")
+        logger.debug("add_employee called", extra={'method': request.method, 'form': dict(request.form)})
 
         if request.method == 'POST':
             try:
@@ -524,7 +615,6 @@ def register_routes(app):
                 team = request.form.get('team')
                 position = request.form.get('position')
 
-                print(f"DEBUG: Selected team: {team}, position: {position}")
 
                 employee_data = {
                     'name': request.form.get('name'),
@@ -535,17 +625,17 @@ def register_routes(app):
                     'pto_refresh_date': request.form.get('pto_refresh_date')
                 }
 
-                print(f"DEBUG: Employee data: {employee_data}")
-                pto_system.add_employee(employee_data)
+                logger.debug("Adding employee", extra={'employee_data': employee_data})
+                services.get('pto_system').add_employee(employee_data)
                 flash(f'Employee {employee_data["name"]} added successfully!', 'success')
                 return redirect(url_for('employees'))
 
             except ValueError as e:
-                print(f"DEBUG: ValueError: {str(e)}")
+                logger.debug(f"add_employee validation error: {str(e)}")
                 flash(str(e), 'error')
                 return render_template('add_employee.html')
             except Exception as e:
-                print(f"DEBUG: Exception: {str(e)}")
+                logger.exception("Error adding employee")
                 flash(f'Error adding employee: {str(e)}', 'error')
                 return render_template('add_employee.html')
 
@@ -553,14 +643,16 @@ def register_routes(app):
 
     @app.route('/employee/<int:employee_id>')
     @roles_required('admin', 'clinical', 'superadmin', 'moa_supervisor', 'echo_supervisor')
+    @replica_reads
     def employee_detail(employee_id):
         """View employee details"""
         from datetime import datetime, timedelta
 
         employee = TeamMember.query.get_or_404(employee_id)
 
-        # Get all PTO requests for this employee
-        pto_requests = PTORequest.query.filter_by(member_id=employee_id).order_by(PTORequest.created_at.desc()).all()
+        # Get all PTO requests for this employee, including archived ones
+        pto_requests = PTORequestHistory.query.filter_by(member_id=employee_id).order_by(
+            PTORequestHistory.created_at.desc()).all()
 
         # Calculate statistics
         total_requests = len(pto_requests)
@@ -642,8 +734,8 @@ def register_routes(app):
         employee = TeamMember.query.get_or_404(employee_id)
 
         try:
-            # Check if employee has PTO requests
-            has_pto_history = PTORequest.query.filter_by(member_id=employee.id).first() is not None
+            # Check if employee has PTO requests (live or archived)
+            has_pto_history = PTORequestHistory.query.filter_by(member_id=employee.id).first() is not None
 
             if has_pto_history:
                 # Mark as inactive instead of deleting
@@ -668,18 +760,21 @@ def register_routes(app):
         """Approve a PTO request and move to in_progress"""
         try:
             pto_request = PTORequest.query.get_or_404(request_id)
-            pto_request.status = 'in_progress'  # Move to in_progress, not directly to approved
-            pto_request.approved_date = get_eastern_time()
-            pto_request.updated_at = get_eastern_time()
+            # Move to in_progress, not directly to approved (only from pending)
+            if not transition_request(pto_request, 'in_progress', actor_id=get_current_identity().id,
+                                      approved_date=get_eastern_time()):
+                flash(f'PTO request for {pto_request.member.name} is already {pto_request.status} '
+                      f'and was not approved.', 'warning')
+                return redirect(url_for('dashboard'))
 
             db.session.commit()
 
             # Send email notification for approval
             try:
-                email_service.send_approval_email(pto_request)
+                services.get('email').send_approval_email(pto_request)
             except Exception as e:
                 # Log error but don't fail the request
-                print(f"Failed to send approval email: {str(e)}")
+                logger.error(f"Failed to send approval email: {str(e)}")
 
             flash(f'PTO request for {pto_request.member.name} has been approved and moved to In Progress!', 'success')
 
@@ -696,18 +791,20 @@ def register_routes(app):
             pto_request = PTORequest.query.get_or_404(request_id)
             denial_reason = request.form.get('denial_reason', 'No reason provided')
 
-            pto_request.status = 'denied'
-            pto_request.updated_at = get_eastern_time()
-            pto_request.denial_reason = denial_reason
+            if not transition_request(pto_request, 'denied', actor_id=get_current_identity().id,
+                                      denial_reason=denial_reason):
+                flash(f'PTO request for {pto_request.member.name} is already {pto_request.status} '
+                      f'and was not denied.', 'warning')
+                return redirect(url_for('dashboard'))
 
             db.session.commit()
 
             # Send email notification for denial
             try:
-                email_service.send_denial_email(pto_request, denial_reason)
+                services.get('email').send_denial_email(pto_request, denial_reason)
             except Exception as e:
                 # Log error but don't fail the request
-                print(f"Failed to send denial email: {str(e)}")
+                logger.error(f"Failed to send denial email: {str(e)}")
 
             flash(f'PTO request for {pto_request.member.name} has been denied.', 'warning')
 
@@ -716,12 +813,50 @@ def register_routes(app):
 
         return redirect(url_for('dashboard'))
 
+    @app.route('/api/requests/bulk', methods=['POST'])
+    @roles_required('admin', 'clinical', 'superadmin', 'moa_supervisor', 'echo_supervisor')
+    def bulk_request_action():
+        """
+        Approve and/or deny many requests: {"approve": [ids], "deny": [ids], "denial_reason": ...}
+        or {"action": "approve", "ids": [...]}; reports the outcome of every id
+        """
+        data = request.get_json(silent=True) or {}
+        try:
+            actions = parse_bulk_actions(data)
+        except BulkActionError as e:
+            return jsonify({'error': str(e)}), 400
+
+        current_user = get_current_identity()
+        outcomes, changed = run_write(stage_bulk_actions, role=current_user.role, actions=actions,
+                                      denial_reason=data.get('denial_reason'), actor_id=current_user.id)
+
+        # All notifications go out over one SMTP connection
+        email = services.get('email')
+        changed_requests = PTORequest.query.options(
+            joinedload(PTORequest.member)
+        ).filter(PTORequest.id.in_(changed)).all() if changed else []
+        with email.smtp_session():
+            for pto_request in changed_requests:
+                try:
+                    if pto_request.status == 'denied':
+                        email.send_denial_email(pto_request, pto_request.denial_reason)
+                    else:
+                        email.send_approval_email(pto_request)
+                except Exception as e:
+                    # Log error but don't fail the request
+                    logger.error(f"Failed to send bulk action email for request #{pto_request.id}: {str(e)}")
+
+        summary = {}
+        for outcome in outcomes:
+            summary[outcome.result] = summary.get(outcome.result, 0) + 1
+        return jsonify({'results': [outcome._asdict() for outcome in outcomes], 'summary': summary})
+
     @app.route('/approve_employee/<int:employee_id>')
     @roles_required('admin', 'clinical', 'superadmin')
     def approve_employee(employee_id):
         """Approve a pending employee registration"""
         pending_employee = PendingEmployee.query.get_or_404(employee_id)
-        current_user = get_current_user()
+        current_user = get_current_identity()
 
         # Check permissions
         can_approve = False
@@ -767,7 +902,7 @@ def register_routes(app):
     def deny_employee(employee_id):
         """Deny a pending employee registration"""
         pending_employee = PendingEmployee.query.get_or_404(employee_id)
-        current_user = get_current_user()
+        current_user = get_current_identity()
 
         # Check permissions
         can_deny = False
@@ -799,9 +934,10 @@ def register_routes(app):
 
     @app.route('/workqueue/in_progress')
     @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
     def workqueue_in_progress():
         """View in-progress PTO requests with checklist"""
-        current_user = get_current_user()
+        current_user = get_current_identity()
 
         # Get in-progress requests based on role
         if current_user.role == 'superadmin':
@@ -817,9 +953,10 @@ def register_routes(app):
 
     @app.route('/workqueue/approved')
     @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
     def workqueue_approved():
         """View approved PTO requests"""
-        current_user = get_current_user()
+        current_user = get_current_identity()
 
         # Get approved requests based on role
         if current_user.role == 'superadmin':
@@ -836,9 +973,10 @@ def register_routes(app):
 
     @app.route('/workqueue/completed')
     @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
     def workqueue_completed():
         """View completed PTO requests"""
-        current_user = get_current_user()
+        current_user = get_current_identity()
 
         # Get completed requests based on role
         if current_user.role == 'superadmin':
@@ -852,6 +990,221 @@ def register_routes(app):
 
         return render_template('workqueue_completed.html', requests=completed_requests, now=get_eastern_time)
 
+    @app.route('/export/pto.csv')
+    @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
+    def export_pto_csv():
+        """Stream PTO requests as CSV (filters: start_date, end_date, team, position, status, type)"""
+        current_user = get_current_identity()
+        try:
+            filters = parse_export_filters(
+                start_date=request.args.get('start_date'),
+                end_date=request.args.get('end_date'),
+                team=request.args.get('team'),
+                position=request.args.get('position'),
+                status=request.args.get('status'),
+                pto_type=request.args.get('type'),
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # Team managers can only export their own team
+        if current_user.role != 'superadmin':
+            if filters.team and not current_user.can_manage_team(filters.team):
+                return jsonify({'error': 'You can only export requests for your own team'}), 403
+            filters = filters._replace(team=current_user.team)
+
+        return Response(
+            stream_with_context(iter_export_csv(filters)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={export_filename(filters)}'},
+        )
+
+    @app.route('/api/reports/pto-usage')
+    @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
+    def api_report_pto_usage():
+        """
+        PTO usage from the rollup tables (filters: start_month, end_month as YYYY-MM, team,
+        position, type; group_by: comma-separated subset of team, position, month, pto_type)
+        """
+        current_user = get_current_identity()
+        start_month = request.args.get('start_month')
+        end_month = request.args.get('end_month')
+        for name, value in (('start_month', start_month), ('end_month', end_month)):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m')
+                except ValueError:
+                    return jsonify({'error': f'{name} must be a month in YYYY-MM format'}), 400
+
+        group_by = tuple(c.strip() for c in request.args.get('group_by', ','.join(KEY_COLUMNS)).split(',') if c.strip())
+        unknown = [c for c in group_by if c not in KEY_COLUMNS]
+        if unknown or not group_by:
+            return jsonify({'error': f"group_by must be a subset of {', '.join(KEY_COLUMNS)}"}), 400
+
+        # Team managers only see their own team
+        team = request.args.get('team') or None
+        if current_user.role != 'superadmin':
+            if team and not current_user.can_manage_team(team):
+                return jsonify({'error': 'You can only report on your own team'}), 403
+            team = current_user.team
+
+        rows = query_usage(start_month=start_month, end_month=end_month, team=team,
+                           position=request.args.get('position') or None,
+                           pto_type=request.args.get('type') or None, group_by=group_by)
+        return jsonify({'group_by': list(group_by), 'rows': rows})
+
+    @app.route('/api/reports/approval-latency')
+    @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
+    def api_report_approval_latency():
+        """
+        Hours from submission to first approval, replayed from the request event log
+        (filters: since, until as YYYY-MM-DD, team; details=1 lists every request)
+        """
+        current_user = get_current_identity()
+        bounds = {}
+        for name in ('since', 'until'):
+            value = request.args.get(name)
+            if value:
+                try:
+                    bounds[name] = datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    return jsonify({'error': f'{name} must be a date in YYYY-MM-DD format'}), 400
+
+        # Team managers only see their own team
+        team = request.args.get('team') or None
+        if current_user.role != 'superadmin':
+            if team and not current_user.can_manage_team(team):
+                return jsonify({'error': 'You can only report on your own team'}), 403
+            team = current_user.team
+
+        latencies = replay_approval_latency(team=team, **bounds)
+        result = {'team': team, 'summary': summarize_latency(latencies)}
+        if request.args.get('details') == '1':
+            result['requests'] = [latency._asdict() for latency in latencies]
+        return jsonify(result)
+
+    @app.route('/api/coverage')
+    @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
+    def api_coverage():
+        """
+        Staffing heatmap: people out per position per day (start, end as YYYY-MM-DD,
+        default today through the next 90 days; team)
+        """
+        current_user = get_current_identity()
+        try:
+            start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') \
+                else get_eastern_time().date()
+            end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') \
+                else start + timedelta(days=90)
+        except ValueError:
+            return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+
+        # Team managers only see their own team
+        team = request.args.get('team') or None
+        if current_user.role != 'superadmin':
+            if team and not current_user.can_manage_team(team):
+                return jsonify({'error': 'You can only view coverage for your own team'}), 403
+            team = current_user.team
+
+        try:
+            matrix = get_coverage_matrix(start, end, team=team, ttl=get_settings().coverage_cache_seconds)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({**matrix._asdict(), 'start': matrix.start.isoformat(), 'end': matrix.end.isoformat()})
+
+    @app.route('/api/out-on')
+    @roles_required('admin', 'clinical', 'superadmin')
+    @replica_reads
+    def api_out_on():
+        """Who is out on a date (default today): active requests found through the interval index"""
+        current_user = get_current_identity()
+        try:
+            day = datetime.strptime(request.args['date'], '%Y-%m-%d').date() if request.args.get('date') \
+                else get_eastern_time().date()
+        except ValueError:
+            return jsonify({'error': 'date must be in YYYY-MM-DD format'}), 400
+
+        request_ids = [iv.request_id for iv in get_interval_index().out_on(day.toordinal())]
+        out = []
+        if request_ids:
+            rows = db.session.execute(
+                db.select(PTORequest.id, TeamMember.name, Position.name.label('position'), Position.team,
+                          PTORequest.pto_type, PTORequest.status, PTORequest.start_date, PTORequest.end_date,
+                          PTORequest.is_partial_day, PTORequest.start_time, PTORequest.end_time,
+                          PTORequest.is_call_out)
+                .join(TeamMember, TeamMember.id == PTORequest.member_id)
+                .join(Position, Position.id == TeamMember.position_id)
+                .where(PTORequest.id.in_(request_ids))
+                .order_by(Position.team, Position.name, TeamMember.name)
+            )
+            for row in rows:
+                # Team managers only see their own team
+                if not current_user.can_manage_team(row.team):
+                    continue
+                out.append({
+                    'request_id': row.id,
+                    'employee': row.name,
+                    'position': row.position,
+                    'team': row.team,
+                    'pto_type': row.pto_type,
+                    'status': row.status,
+                    'start_date': row.start_date,
+                    'end_date': row.end_date,
+                    'is_partial_day': bool(row.is_partial_day),
+                    'start_time': row.start_time,
+                    'end_time': row.end_time,
+                    'is_call_out': bool(row.is_call_out),
+                })
+        return jsonify({'date': day.isoformat(), 'count': len(out), 'out': out})
+
+    @app.route('/timekeeping/export', methods=['POST'])
+    @roles_required('admin', 'clinical', 'superadmin')
+    def timekeeping_export():
+        """Export every request not yet entered into timekeeping and mark them entered"""
+        current_user = get_current_identity()
+        export_format = request.form.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            flash(f'Unknown timekeeping export format: {export_format}', 'error')
+            return redirect(url_for('workqueue_in_progress'))
+
+        team = None if current_user.role == 'superadmin' else current_user.team
+        try:
+            batch_id, request_ids = claim_timekeeping_batch(team=team, actor_id=current_user.id)
+            content, filename, mimetype = render_batch(batch_id, export_format, team=team)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.exception("Timekeeping export failed")
+            flash('Error exporting timekeeping entries; nothing was marked as entered.', 'error')
+            return redirect(url_for('workqueue_in_progress'))
+
+        if not request_ids:
+            flash('All in-progress and approved requests are already entered in timekeeping.', 'info')
+            return redirect(url_for('workqueue_in_progress'))
+
+        logger.info(f"Timekeeping batch {batch_id} exported by {current_user.email}",
+                    extra={'requests': len(request_ids), 'format': export_format})
+        return Response(content, mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={filename}',
+                                 'X-Timekeeping-Batch': batch_id})
+
+    @app.route('/timekeeping/export/<batch_id>')
+    @roles_required('admin', 'clinical', 'superadmin')
+    def timekeeping_export_batch(batch_id):
+        """Download an earlier timekeeping batch again (read-only)"""
+        current_user = get_current_identity()
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unknown format: {export_format}'}), 400
+
+        team = None if current_user.role == 'superadmin' else current_user.team
+        content, filename, mimetype = render_batch(batch_id, export_format, team=team)
+        return Response(content, mimetype=mimetype, headers={'Content-Disposition': f'attachment; filename={filename}'})
+
     @app.route('/update_checklist/<int:request_id>', methods=['POST'])
     @roles_required('admin', 'clinical', 'superadmin')
     def update_checklist(request_id):
@@ -862,14 +1215,15 @@ def register_routes(app):
         pto_request.timekeeping_entered = request.form.get('timekeeping_entered') == 'on'
         pto_request.coverage_arranged = request.form.get('coverage_arranged') == 'on'
 
-        # If both are complete, move to approved status
+        pto_request.updated_at = get_eastern_time()
+
+        # If both are complete, move to approved status (only from in_progress)
         if pto_request.timekeeping_entered and pto_request.coverage_arranged:
-            pto_request.status = 'approved'
-            flash(f'PTO request for {pto_request.member.name} is now fully approved!', 'success')
+            if transition_request(pto_request, 'approved', actor_id=get_current_identity().id):
+                flash(f'PTO request for {pto_request.member.name} is now fully approved!', 'success')
 
             # No email sent when checklist is completed (per updated requirements)
 
-        pto_request.updated_at = get_eastern_time()
         db.session.commit()
 
         return redirect(url_for('workqueue_in_progress'))
@@ -877,23 +1231,12 @@ def register_routes(app):
     @app.route('/check_and_complete_requests')
     def check_and_complete_requests():
         """Check for PTO requests that should be marked as completed based on end date"""
-        from datetime import datetime, date
+        from datetime import date
 
-        today = date.today()
-
-        # Find approved requests where end date has passed
-        approved_requests = PTORequest.query.filter_by(status='approved').all()
-
-        completed_count = 0
-        for request in approved_requests:
-            try:
-                end_date = datetime.strptime(request.end_date, '%Y-%m-%d').date()
-                if end_date < today:
-                    request.status = 'completed'
-                    request.completed_date = get_eastern_time()
-                    completed_count += 1
-            except:
-                pass
+        # Approved requests whose end date (YYYY-MM-DD) has passed, in one guarded UPDATE
+        completed = transition_matching('approved', 'completed', PTORequest.end_date < date.today().isoformat(),
+                                        completed_date=get_eastern_time())
+        completed_count = len(completed)
 
         if completed_count > 0:
             db.session.commit()
@@ -4,21 +4,17 @@ Handles incoming SMS messages from Twilio
 """
 
 from flask import request
-from twilio_service import TwilioSMSService
-from email_service import EmailService
+from config import get_settings
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 def register_twilio_routes(app):
     """Register Twilio SMS webhook routes with the Flask app"""
 
-    # Initialize services
-    sms_service = TwilioSMSService()
-    email_service = EmailService()
+    # Shared services are created lazily by the app's service registry
+    services = app.extensions['services']
 
     # ========================================
     # SMS ROUTES
@@ -30,16 +26,15 @@ def register_twilio_routes(app):
         Handle incoming SMS messages for call-outs
         Twilio calls this webhook when someone texts the call-out line
         """
-        logger.info("Incoming SMS received")
+        sms_service = services.get('sms')
 
         # Get SMS information from Twilio request
         from_number = request.form.get('From', '')
         message_body = request.form.get('Body', '')
         message_sid = request.form.get('MessageSid', '')
 
-        logger.info(f"SMS from: {from_number}")
-        logger.info(f"Message: {message_body}")
-        logger.info(f"SID: {message_sid}")
+        logger.info("Incoming SMS received", extra={'sms_from': from_number, 'sms_sid': message_sid})
+        logger.debug("Incoming SMS body", extra={'sms_sid': message_sid, 'sms_body': message_body})
 
         try:
             # Authenticate sender by phone number
@@ -62,7 +57,7 @@ def register_twilio_routes(app):
 
             # Send email notification to manager
             try:
-                email_service.send_submission_email(pto_request)
+                services.get('email').send_submission_email(pto_request)
             except Exception as e:
                 logger.error(f"Failed to send email notification: {str(e)}")
 
@@ -74,23 +69,15 @@ def register_twilio_routes(app):
             )
 
             # Optionally send SMS to manager (if configured)
-            import os
-            from dotenv import load_dotenv
-            load_dotenv(override=True)  # Reload .env to get latest values
-
+            # Settings are cached and only re-read when .env changes
             manager_team = member.position.team if member.position else None
-            manager_sms = None
-
-            if manager_team == 'admin':
-                manager_sms = os.getenv('MANAGER_ADMIN_SMS')
-            elif manager_team == 'clinical':
-                manager_sms = os.getenv('MANAGER_CLINICAL_SMS')
+            manager_sms = get_settings().manager_sms_for_team(manager_team)
 
-            logger.info(f"Manager team: {manager_team}, Manager SMS: {manager_sms}")
+            logger.debug("Manager SMS lookup", extra={'manager_team': manager_team, 'manager_sms': manager_sms})
 
-            if manager_sms and manager_sms.strip():
+            if manager_sms:
                 sms_service.send_manager_notification_sms(
-                    manager_sms.strip(),
+                    manager_sms,
                     member.name,
                     pto_request.id
                 )
@@ -114,6 +101,7 @@ def register_twilio_routes(app):
     @app.route('/twilio/test/sms')
     def test_sms_twiml():
         """Test endpoint to see what SMS response looks like"""
+        sms_service = services.get('sms')
         twiml = sms_service.generate_sms_response(
             authenticated=True,
             member=type('obj', (object,), {'name': 'Test Employee'}),
@@ -0,0 +1,99 @@
+"""
+App-Scoped Service Registry
+Creates each shared service (email, SMS, PTO system) once, lazily, on first use,
+and records how long each one took to initialize
+"""
+
+import logging
+import threading
+import time
+
+from flask import current_app
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Lazily constructed services shared by every route module of one app"""
+
+    def __init__(self, app=None):
+        self._factories = {}
+        self._instances = {}
+        self._settings = {}
+        self._timings = {}
+        self._lock = threading.RLock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['services'] = self
+
+    def register(self, name, factory):
+        """Register a zero-argument factory; nothing is built until get(name)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name):
+        """Return the shared instance, building it on first use or after a settings reload"""
+        settings = get_settings()
+        instance = self._instances.get(name)
+        if instance is not None and self._settings.get(name) is settings:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is not None and self._settings.get(name) is settings:
+                return instance
+
+            if name not in self._factories:
+                raise KeyError(f"Unknown service: {name}")
+
+            started = time.perf_counter()
+            instance = self._factories[name]()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            self._instances[name] = instance
+            self._settings[name] = settings
+            self._timings[name] = {
+                'init_ms': round(elapsed_ms, 3),
+                'initialized_at': time.time(),
+                'builds': self._timings.get(name, {}).get('builds', 0) + 1,
+            }
+            logger.info(f"Service '{name}' initialized in {elapsed_ms:.1f} ms")
+            return instance
+
+    def timings(self):
+        """Per-service initialization timings; services never used are reported as not initialized"""
+        with self._lock:
+            return {
+                name: self._timings.get(name, {'init_ms': None, 'initialized_at': None, 'builds': 0})
+                for name in self._factories
+            }
+
+
+def get_service(name):
+    """Shortcut for current_app.extensions['services'].get(name)"""
+    return current_app.extensions['services'].get(name)
+
+
+def register_default_services(registry):
+    """Register the services used by the route modules (imports deferred until first use)"""
+
+    def email_factory():
+        from email_service import EmailService
+        return EmailService()
+
+    def sms_factory():
+        from twilio_service import TwilioSMSService
+        return TwilioSMSService()
+
+    def pto_system_factory():
+        from pto_system import PTOTrackerSystem
+        return PTOTrackerSystem()
+
+    registry.register('email', email_factory)
+    registry.register('sms', sms_factory)
+    registry.register('pto_system', pto_system_factory)
+    return registry
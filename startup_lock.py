@@ -0,0 +1,158 @@
+"""
+Startup Initialization Lock
+Makes sure only one worker (gunicorn process, serverless instance) runs schema
+initialization at a time; the others skip it and start serving immediately
+
+- PostgreSQL: session-level advisory lock (pg_try_advisory_lock)
+- SQLite: exclusive file lock next to the database file
+- Other databases: a row in the startup_locks table
+"""
+
+import logging
+import os
+import socket
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# A lock-table row older than this is assumed to belong to a crashed worker
+STALE_LOCK_AFTER = timedelta(minutes=10)
+
+
+def _holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+@contextmanager
+def startup_lock(engine, name='schema-init', blocking=False, timeout=60.0):
+    """
+    Context manager yielding True when this process holds the lock, False otherwise
+    With blocking=True, waits up to timeout seconds for the lock before giving up
+    """
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        lock = _advisory_lock
+    elif dialect == 'sqlite':
+        lock = _file_lock
+    else:
+        lock = _table_lock
+
+    with lock(engine, name, blocking, timeout) as acquired:
+        if acquired:
+            logger.info(f"Acquired startup lock '{name}' ({dialect})")
+        else:
+            logger.info(f"Startup lock '{name}' held by another worker; skipping initialization")
+        yield acquired
+
+
+def _wait_for(try_acquire, blocking, timeout, interval=0.1):
+    deadline = time.monotonic() + timeout
+    while True:
+        if try_acquire():
+            return True
+        if not blocking or time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+@contextmanager
+def _advisory_lock(engine, name, blocking, timeout):
+    key = zlib.crc32(name.encode('utf-8'))
+    with engine.connect() as conn:
+        def try_acquire():
+            acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': key}).scalar()
+            conn.commit()
+            return bool(acquired)
+
+        acquired = _wait_for(try_acquire, blocking, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': key})
+                conn.commit()
+
+
+@contextmanager
+def _file_lock(engine, name, blocking, timeout):
+    database = engine.url.database
+    if not database or database == ':memory:':
+        # Private in-memory database: no other process can see it
+        yield True
+        return
+
+    lock_path = f"{os.path.abspath(database)}.{name}.lock"
+    handle = open(lock_path, 'a+')
+    try:
+        if os.name == 'nt':
+            import msvcrt
+
+            def try_acquire():
+                try:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                    return True
+                except OSError:
+                    return False
+
+            def release():
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            def try_acquire():
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return True
+                except OSError:
+                    return False
+
+            def release():
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+        acquired = _wait_for(try_acquire, blocking, timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                release()
+    finally:
+        handle.close()
+
+
+@contextmanager
+def _table_lock(engine, name, blocking, timeout):
+    from models import StartupLock
+
+    table = StartupLock.__table__
+    holder = _holder_id()
+    table.create(engine, checkfirst=True)
+
+    def try_acquire():
+        with engine.begin() as conn:
+            # Clear a lock left behind by a worker that died mid-initialization
+            conn.execute(table.delete().where(
+                table.c.name == name,
+                table.c.acquired_at < datetime.utcnow() - STALE_LOCK_AFTER
+            ))
+        try:
+            with engine.begin() as conn:
+                conn.execute(table.insert().values(name=name, holder=holder, acquired_at=datetime.utcnow()))
+            return True
+        except IntegrityError:
+            return False
+
+    acquired = _wait_for(try_acquire, blocking, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.name == name, table.c.holder == holder))
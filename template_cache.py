@@ -0,0 +1,67 @@
+"""
+Precompiled Jinja Template Bytecode
+Build step that compiles every template in templates/ into a filesystem
+bytecode cache, so workers skip template compilation on their first hit
+
+Usage: flask --app app compile-templates   (or: python template_cache.py)
+"""
+
+import logging
+import os
+
+import click
+from jinja2 import FileSystemBytecodeCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.jinja_cache')
+
+
+class PrecompiledBytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache that tolerates a read-only deploy directory (e.g. serverless)"""
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError as e:
+            logger.debug(f"Could not write template bytecode for {bucket.key}: {str(e)}")
+
+
+def init_template_cache(app, cache_dir=None):
+    """Point the app's Jinja environment at the bytecode cache directory"""
+    cache_dir = cache_dir or app.config.get('TEMPLATE_CACHE_DIR') or DEFAULT_CACHE_DIR
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        # Read-only filesystem: use whatever the build step produced, if anything
+        pass
+    if os.path.isdir(cache_dir):
+        app.jinja_env.bytecode_cache = PrecompiledBytecodeCache(cache_dir)
+    return cache_dir
+
+
+def precompile_templates(app):
+    """Compile every template into the bytecode cache; returns the template names"""
+    cache_dir = init_template_cache(app)
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        # get_template compiles the source and stores its bytecode in the cache
+        app.jinja_env.get_template(name)
+    logger.info(f"Precompiled {len(names)} templates into {cache_dir}")
+    return names
+
+
+def register_template_commands(app):
+    """Register the `flask compile-templates` build command"""
+
+    @app.cli.command('compile-templates')
+    def compile_templates_command():
+        """Precompile all templates into the Jinja bytecode cache."""
+        names = precompile_templates(app)
+        click.echo(f"Precompiled {len(names)} templates into {app.jinja_env.bytecode_cache.directory}")
+
+
+if __name__ == '__main__':
+    from app import app
+    names = precompile_templates(app)
+    print(f"Precompiled {len(names)} templates into {app.jinja_env.bytecode_cache.directory}")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test hot/cold archival of closed PTO requests and the union history view"""
+
+import os
+import tempfile
+from datetime import timedelta
+
+from flask import Flask
+
+from archive import archive_closed_requests
+from database import db
+from migrations import run_migrations
+from models import (ArchivedCallOutRecord, ArchivedPTORequest, CallOutRecord, Position, PTORequest,
+                    PTORequestHistory, TeamMember, get_eastern_time)
+
+
+def add_request(member, status, days_ago, is_call_out=False):
+    end = (get_eastern_time() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+    request = PTORequest(member=member, start_date=end, end_date=end, pto_type='Vacation',
+                         manager_team='clinical', status=status, is_call_out=is_call_out)
+    request.updated_at = get_eastern_time() - timedelta(days=days_ago)
+    db.session.add(request)
+    return request
+
+
+def test_archive_moves_old_closed_requests():
+    """Old completed/denied requests (with call-out records) move; everything else stays hot"""
+
+    print("=" * 70)
+    print("TESTING REQUEST ARCHIVAL")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'archive.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+
+            position = Position(name='CVI RNs', team='clinical')
+            member = TeamMember(name='Archive Tester', email='archive.tester@mswcvi.com', position=position)
+            db.session.add_all([position, member])
+
+            old_completed = [add_request(member, 'completed', 400) for _ in range(3)]
+            old_call_out = add_request(member, 'denied', 400, is_call_out=True)
+            recent_completed = add_request(member, 'completed', 10)
+            old_pending = add_request(member, 'pending', 400)
+            newest = add_request(member, 'completed', 400)
+            db.session.flush()
+            db.session.add(CallOutRecord(member_id=member.id, pto_request_id=old_call_out.id, source='sms',
+                                         phone_number_used='+15551234567'))
+            # A later call-out record keeps the old one from being the newest row
+            db.session.add(CallOutRecord(member_id=member.id, pto_request_id=recent_completed.id, source='sms',
+                                         phone_number_used='+15551234567'))
+            db.session.commit()
+
+            archived_ids = {r.id for r in old_completed} | {old_call_out.id}
+            call_out_request_id = old_call_out.id
+            kept_ids = {recent_completed.id, old_pending.id, newest.id}
+            member_id = member.id
+            total = PTORequest.query.count()
+
+            assert archive_closed_requests(365, dry_run=True)['requests'] == len(archived_ids)
+            stats = archive_closed_requests(365, batch_size=2, pause=0)
+            assert stats['requests'] == len(archived_ids) and stats['call_outs'] == 1
+            assert stats['batches'] == 2
+            print(f"   ✓ Moved {stats['requests']} requests and {stats['call_outs']} call-out record "
+                  f"in {stats['batches']} batches")
+
+            hot_ids = {r.id for r in PTORequest.query.all()}
+            assert hot_ids == kept_ids
+            assert {r.id for r in ArchivedPTORequest.query.all()} == archived_ids
+            assert CallOutRecord.query.count() == 1
+            assert ArchivedCallOutRecord.query.one().pto_request_id == call_out_request_id
+            print("   ✓ Recent, open and newest requests stayed in the hot table")
+
+            history = PTORequestHistory.query.filter_by(member_id=member_id).all()
+            assert len(history) == total
+            assert {r.id for r in history if r.is_archived} == archived_ids
+            # Duration helpers work on history rows too (single-day requests: 0 or 1 business days)
+            assert all(r.duration_days in (0, 1) for r in history)
+            print("   ✓ History view returns live and archived requests together")
+
+            assert archive_closed_requests(365, pause=0)['requests'] == 0
+            print("   ✓ Re-running moves nothing")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_archive_moves_old_closed_requests()
+    print("\nAll archival checks passed")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test bulk approve/deny: one permission query, one guarded UPDATE per target status"""
+
+import os
+import smtplib
+import tempfile
+from dataclasses import replace
+from unittest import mock
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from bulk_actions import BulkActionError, parse_bulk_actions, stage_bulk_actions
+from config import Settings
+from database import db
+from email_service import EmailService
+from models import Position, PTORequest, TeamMember
+
+
+def test_parse_bulk_actions():
+    """Both payload shapes parse; an id under two actions or an unknown action is rejected"""
+
+    print("=" * 70)
+    print("TESTING BULK APPROVE/DENY")
+    print("=" * 70)
+
+    assert parse_bulk_actions({'approve': [3, '4', 3], 'deny': [5]}) == {'approve': [3, 4], 'deny': [5]}
+    assert parse_bulk_actions({'action': 'deny', 'ids': [7]}) == {'deny': [7]}
+    for bad in ({}, {'approve': [1], 'deny': [1]}, {'action': 'delete', 'ids': [1]}, {'approve': 'x'}):
+        with pytest.raises(BulkActionError):
+            parse_bulk_actions(bad)
+    print("   ✓ Payloads parse; overlapping, unknown and malformed actions are rejected")
+
+
+def test_bulk_actions_scoped_and_guarded():
+    """Only permitted, still-pending requests change; everything else is reported per id"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'bulk.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            moa = Position(name='MOA Front Desk', team='admin')
+            rn = Position(name='CVI RNs', team='clinical')
+            desk = TeamMember(name='Desk', email='desk@mswcvi.com', position=moa)
+            nurse = TeamMember(name='Nurse', email='nurse@mswcvi.com', position=rn)
+            db.session.add_all([moa, rn, desk, nurse])
+            db.session.flush()
+            requests = [PTORequest(member_id=member.id, start_date=day, end_date=day, pto_type='Vacation',
+                                   manager_team=member.team, status=status)
+                        for member, day, status in [(desk, '2026-06-01', 'pending'),
+                                                    (desk, '2026-06-02', 'pending'),
+                                                    (desk, '2026-06-03', 'approved'),
+                                                    (desk, '2026-06-04', 'in_progress'),
+                                                    (nurse, '2026-06-05', 'pending')]]
+            db.session.add_all(requests)
+            db.session.commit()
+            ids = [r.id for r in requests]
+
+            statements = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+                         if 'pto_requests' in statement else None)
+
+            outcomes, changed = stage_bulk_actions('moa_supervisor', {
+                'approve': [ids[0], ids[2], ids[4], 999],
+                'deny': [ids[1], ids[3]],
+            }, denial_reason='Short staffed')
+            db.session.commit()
+
+            results = {o.request_id: o.result for o in outcomes}
+            assert results == {ids[0]: 'ok', ids[2]: 'conflict', ids[4]: 'forbidden', 999: 'not_found',
+                               ids[1]: 'ok', ids[3]: 'ok'}
+            assert changed == [ids[0], ids[1], ids[3]]
+            assert statements.count('SELECT') == 1 and statements.count('UPDATE') == 2, statements
+            print(f"   ✓ 6 ids handled with {statements.count('SELECT')} SELECT and "
+                  f"{statements.count('UPDATE')} UPDATEs (one per target status)")
+
+            statuses = dict(db.session.query(PTORequest.id, PTORequest.status))
+            assert [statuses[i] for i in ids] == ['in_progress', 'denied', 'approved', 'denied', 'pending']
+            assert db.session.get(PTORequest, ids[1]).denial_reason == 'Short staffed'
+            assert db.session.get(PTORequest, ids[0]).approved_date is not None
+            print("   ✓ Other teams' and already-processed requests are left alone")
+
+            outcomes, changed = stage_bulk_actions('superadmin', {'approve': [ids[0], ids[4]]})
+            db.session.commit()
+            assert [o.result for o in outcomes] == ['conflict', 'ok'] and changed == [ids[4]]
+            print("   ✓ Repeating an approval reports a conflict instead of re-approving")
+            db.engine.dispose()
+
+
+class FlakySMTP:
+    """Fake SMTP server connection that drops after `limit` messages"""
+    connections = []
+
+    def __init__(self, host, port, limit=3):
+        self.sent, self.limit, self.closed = [], limit, False
+        FlakySMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def send_message(self, msg):
+        if self.closed or len(self.sent) >= self.limit:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(msg['To'])
+
+    def close(self):
+        self.closed = True
+
+    def quit(self):
+        self.closed = True
+
+
+def test_smtp_session_reconnects_after_disconnect():
+    """A dropped session connection is reopened once and the message resent; no email is lost"""
+
+    FlakySMTP.connections = []
+    service = EmailService(replace(Settings(), email_enabled=True))
+    recipients = [f'manager{i}@mswcvi.com' for i in range(8)]
+    with mock.patch('smtplib.SMTP', FlakySMTP):
+        with service.smtp_session():
+            results = [service.send_email(to, 'PTO approved', body_text='Approved') for to in recipients]
+    assert all(results)
+    assert [to for conn in FlakySMTP.connections for to in conn.sent] == recipients
+    assert len(FlakySMTP.connections) == 3 and all(conn.closed for conn in FlakySMTP.connections)
+    print(f"   ✓ {len(recipients)} emails sent over {len(FlakySMTP.connections)} connections after disconnects")
+
+
+if __name__ == "__main__":
+    test_parse_bulk_actions()
+    test_bulk_actions_scoped_and_guarded()
+    test_smtp_session_reconnects_after_disconnect()
+    print("\nAll bulk action checks passed")
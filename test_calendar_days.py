@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""Test the calendar_days table against the Python business-day calculator"""
+
+import json
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+from flask import Flask
+from sqlalchemy import select
+
+from business_days import calculate_pto_days
+from calendar_days import business_days_between, sync_calendar
+from database import db
+from holiday_calendar import DEFAULT_DEFINITION, get_holiday_calendar
+from models import CalendarDay, Position, PTORequest, TeamMember
+
+
+def test_sql_business_days_match_python():
+    """Ordinal differences in SQL give the same counts as BusinessDaysCalculator"""
+
+    print("=" * 70)
+    print("TESTING CALENDAR TABLE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'calendar.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            stats = sync_calendar(2025, 2027)
+            assert stats['days'] == 365 * 3 and stats['changed'] == stats['days']
+            assert sync_calendar(2025, 2027)['changed'] == 0
+            thanksgiving = db.session.get(CalendarDay, '2026-11-26')
+            assert thanksgiving.is_holiday and thanksgiving.holiday_name == 'Thanksgiving'
+            print(f"   ✓ Generated {stats['days']} days; re-sync changes nothing")
+
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Calendar Nurse', email='calendar.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            rng = random.Random(7)
+            for _ in range(300):
+                start = date(2025, 1, 1) + timedelta(days=rng.randint(0, 1000))
+                end = start + timedelta(days=rng.randint(0, 40))
+                db.session.add(PTORequest(member=nurse, start_date=start.isoformat(), end_date=end.isoformat(),
+                                          pto_type='Vacation', manager_team='clinical'))
+            db.session.commit()
+
+            query, days = business_days_between(
+                select(PTORequest.start_date, PTORequest.end_date), PTORequest.start_date, PTORequest.end_date)
+            rows = db.session.execute(query.add_columns(days.label('days'))).all()
+            assert all(row.days == calculate_pto_days(row.start_date, row.end_date) for row in rows)
+            print(f"   ✓ SQL counts match Python for {len(rows)} requests (weekends, holidays, year ends)")
+
+            # Aggregates run entirely in SQL: business days per member
+            query, days = business_days_between(select(PTORequest.member_id), PTORequest.start_date,
+                                                PTORequest.end_date)
+            total = db.session.execute(query.add_columns(db.func.sum(days)).group_by(PTORequest.member_id)).one()[1]
+            assert total == sum(row.days for row in rows)
+            print(f"   ✓ SUM over the join gives {total} business days for the member")
+
+            # Holiday calendar edits rewrite the stored years from the first changed one onward
+            calendar = get_holiday_calendar()
+            new_year_ordinal = db.session.get(CalendarDay, '2027-01-04').business_day_ordinal
+            definition = json.loads(json.dumps(DEFAULT_DEFINITION))
+            definition['dates'] = [{'date': '2026-03-09', 'name': 'Clinic closure'}]
+            try:
+                calendar.replace_definition(definition)
+                db.session.expire_all()
+                assert db.session.get(CalendarDay, '2026-03-09').holiday_name == 'Clinic closure'
+                assert db.session.get(CalendarDay, '2027-01-04').business_day_ordinal == new_year_ordinal - 1
+                assert sync_calendar(2025, 2027, dry_run=True)['changed'] == 0
+                print("   ✓ Adding a closure date resyncs its year and shifts later ordinals")
+
+                # Weekends come from the definition, not a hardcoded Saturday/Sunday
+                definition['weekend'] = ['FR', 'SA']
+                calendar.replace_definition(definition)
+                db.session.expire_all()
+                friday, sunday = db.session.get(CalendarDay, '2026-03-06'), db.session.get(CalendarDay, '2026-03-08')
+                assert friday.is_weekend and not sunday.is_weekend
+                assert sunday.business_day_ordinal == friday.business_day_ordinal + 1
+                print("   ✓ A Friday/Saturday weekend is stored as configured")
+            finally:
+                calendar.replace_definition(DEFAULT_DEFINITION)
+            db.session.expire_all()
+            assert db.session.get(CalendarDay, '2027-01-04').business_day_ordinal == new_year_ordinal
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_sql_business_days_match_python()
+    print("\nAll calendar table checks passed")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Test the positions x days staffing coverage matrix and its write-invalidated cache"""
+
+import os
+import tempfile
+from datetime import date
+
+from flask import Flask
+
+import coverage_matrix
+from coverage_matrix import build_coverage_matrix, get_coverage_matrix
+from database import db
+from models import Position, PTORequest, TeamMember
+
+
+def test_coverage_matrix_counts_and_cache():
+    """Difference-array counts per position/day; cache drops when a request in the window commits"""
+
+    print("=" * 70)
+    print("TESTING STAFFING COVERAGE MATRIX")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'coverage.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            rns = Position(name='CVI RNs', team='clinical')
+            echo = Position(name='Echo Tech', team='clinical')
+            desk = Position(name='CT Desk', team='admin')
+            nurses = [TeamMember(name=f'Nurse {i}', email=f'nurse{i}@mswcvi.com', position=rns) for i in range(3)]
+            tech = TeamMember(name='Tech', email='tech@mswcvi.com', position=echo)
+            former = TeamMember(name='[INACTIVE] Former Nurse', email='inactive_9@former@mswcvi.com', position=rns)
+            clerk = TeamMember(name='Clerk', email='clerk@mswcvi.com', position=desk)
+            db.session.add_all([rns, echo, desk, tech, former, clerk, *nurses])
+
+            def add(member, start, end, status):
+                db.session.add(PTORequest(member=member, start_date=start, end_date=end, pto_type='Vacation',
+                                          manager_team=member.team, status=status))
+
+            # Window Mon 2026-03-02 .. Sun 2026-03-08
+            add(nurses[0], '2026-02-25', '2026-03-03', 'approved')    # starts before the window
+            add(nurses[1], '2026-03-03', '2026-03-04', 'pending')
+            add(nurses[2], '2026-03-06', '2026-03-12', 'in_progress') # runs past the window (and a weekend)
+            add(tech, '2026-03-02', '2026-03-02', 'denied')            # not counted
+            add(clerk, '2026-03-04', '2026-03-04', 'approved')        # other team
+            db.session.commit()
+
+            start, end = date(2026, 3, 2), date(2026, 3, 8)
+            matrix = build_coverage_matrix(start, end, team='clinical')
+            assert [p['name'] for p in matrix.positions] == ['CVI RNs', 'Echo Tech']
+            assert matrix.headcount == [3, 1]
+            assert matrix.business_days == [True] * 5 + [False] * 2
+            assert matrix.out == [[1, 2, 1, 0, 1, 0, 0], [0] * 7]
+            assert matrix.pending == [[0, 1, 1, 0, 0, 0, 0], [0] * 7]
+            print("   ✓ Counts clipped to the window, weekends zeroed, denied, inactive and other teams left out")
+
+            np = coverage_matrix._numpy()
+            if np is not None:
+                coverage_matrix._numpy = lambda: None
+                try:
+                    assert build_coverage_matrix(start, end, team='clinical') == matrix
+                finally:
+                    coverage_matrix._numpy = lambda: np
+                print("   ✓ NumPy and pure-Python accumulation agree")
+            else:
+                print("   - NumPy not installed; pure-Python accumulation used")
+
+            cached = get_coverage_matrix(start, end, team='clinical')
+            assert get_coverage_matrix(start, end, team='clinical') is cached
+            other_window = get_coverage_matrix(date(2026, 4, 1), date(2026, 4, 30), team='clinical')
+
+            add(tech, '2026-03-05', '2026-03-05', 'pending')
+            db.session.flush()
+            assert get_coverage_matrix(start, end, team='clinical') is cached  # not committed yet
+            db.session.commit()
+
+            refreshed = get_coverage_matrix(start, end, team='clinical')
+            assert refreshed is not cached and refreshed.out[1][3] == 1
+            assert get_coverage_matrix(date(2026, 4, 1), date(2026, 4, 30), team='clinical') is other_window
+            print("   ✓ A committed write drops only the cached windows it overlaps")
+
+            # Moving a request out of a window drops that window too (its old dates)
+            cached = get_coverage_matrix(start, end, team='clinical')
+            moved = PTORequest.query.filter_by(member_id=nurses[1].id).one()
+            moved.start_date, moved.end_date = '2026-05-04', '2026-05-05'
+            db.session.commit()
+            refreshed = get_coverage_matrix(start, end, team='clinical')
+            assert refreshed is not cached and refreshed.pending[0] == [0, 0, 0, 0, 0, 0, 0]
+            print("   ✓ Rescheduling a request drops the windows of its old and new dates")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_coverage_matrix_counts_and_cache()
+    print("\nAll coverage matrix checks passed")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test that a group-commit write is never reported as failed while it can still commit"""
+
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from database import db
+from group_commit import GroupCommitWriter, WriteTimeout, run_write
+from models import Position
+
+
+def add_position(name, delay=0.0):
+    time.sleep(delay)
+    position = Position(name=name, team='clinical')
+    db.session.add(position)
+    db.session.flush()
+    return position.id
+
+
+def test_timed_out_writes_are_cancelled_or_awaited():
+    """A slow running job is waited for past the timeout; a job still queued is cancelled"""
+
+    print("=" * 70)
+    print("TESTING GROUP COMMIT TIMEOUTS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'writer.db')}"
+        db.init_app(app)
+        app.extensions['group_commit_writer'] = GroupCommitWriter(app, result_timeout=0.2)
+
+        with app.app_context():
+            db.create_all()
+
+        slow = {}
+
+        def submit_slow():
+            with app.test_request_context():
+                slow['id'] = run_write(add_position, 'Slow Desk', delay=0.6)
+
+        thread = threading.Thread(target=submit_slow)
+        thread.start()
+        time.sleep(0.1)  # the slow job is now running in the writer
+
+        with app.test_request_context():
+            with pytest.raises(WriteTimeout):
+                run_write(add_position, 'Queued Desk')
+        thread.join()
+        assert slow['id'] is not None
+        print("   ✓ The slow job outlived the timeout and its caller got its result")
+
+        time.sleep(0.1)
+        with app.app_context():
+            assert [p.name for p in Position.query.all()] == ['Slow Desk']
+            print("   ✓ The queued job that timed out was cancelled and never written")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_timed_out_writes_are_cancelled_or_awaited()
+    print("\nAll group commit checks passed")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Test the compiled holiday calendar: observed dates, custom rules and per-year invalidation"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from holiday_calendar import DEFAULT_DEFINITION, HolidayCalendar, HolidayCalendarError
+
+
+def test_observed_dates_and_bitmap_queries():
+    """Weekend holidays move to the nearest weekday; counts match a day-by-day walk"""
+
+    print("=" * 70)
+    print("TESTING HOLIDAY CALENDAR")
+    print("=" * 70)
+
+    calendar = HolidayCalendar()
+    names = calendar.holiday_names(2026)
+    assert names[date(2026, 7, 3)] == 'Independence Day (observed)'  # July 4, 2026 is a Saturday
+    assert date(2026, 7, 4) not in names
+    assert calendar.holiday_names(2021)[date(2021, 12, 31)] == "New Year's Day (observed)"
+    assert date(2022, 1, 1) not in calendar.holiday_names(2022)
+    assert calendar.holiday_names(2026)[date(2026, 5, 25)] == 'Memorial Day'
+    print("   ✓ Saturday holidays observed on Friday (across the year boundary too), Sunday ones on Monday")
+
+    start, end = date(2025, 11, 20), date(2027, 2, 10)
+    walked = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    business = [d for d in walked if calendar.is_business_day(d)]
+    assert all(d.weekday() < 5 and d not in calendar.holiday_names(d.year) for d in business)
+    assert calendar.count(start, end) == len(business)
+    assert calendar.days(start, end, lambda year: year.business_bits) == business
+    assert calendar.count(end, start) == 0
+    print(f"   ✓ {len(business)} business days across three years, counted by popcount")
+
+
+def test_custom_rules_and_affected_year_invalidation():
+    """Editing the definition file recompiles only the years the edit touches"""
+
+    definition = json.loads(json.dumps(DEFAULT_DEFINITION))
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'holidays.json')
+        with open(path, 'w') as handle:
+            json.dump(definition, handle)
+
+        calendar = HolidayCalendar(check_interval=0)
+        calendar.load_file(path)
+        changes = []
+        calendar.subscribe(changes.append)
+        compiled = {year: calendar.year(year) for year in range(2024, 2030)}
+        assert calendar.is_business_day(date(2026, 11, 27))
+
+        definition['rules'].append({'name': 'Day after Thanksgiving', 'month': 11, 'weekday': 'TH', 'nth': 4,
+                                    'offset_days': 1, 'start_year': 2026, 'end_year': 2027})
+        definition['dates'].append({'date': '2029-12-24', 'name': 'Christmas Eve (closure)'})
+        with open(path, 'w') as handle:
+            json.dump(definition, handle)
+        os.utime(path, (time.time() + 5, time.time() + 5))
+
+        assert not calendar.is_business_day(date(2026, 11, 27))
+        assert calendar.holiday_names(2027)[date(2027, 11, 26)] == 'Day after Thanksgiving'
+        assert not calendar.is_business_day(date(2029, 12, 24))
+        assert changes == [[(2025, 2028), (2029, 2029)]]
+        assert calendar.year(2024) is compiled[2024]
+        assert calendar.year(2026) is not compiled[2026]
+        print("   ✓ Only 2025-2029 recompiled after adding a bounded rule and a one-off closure")
+
+        with open(path, 'w') as handle:
+            handle.write('{"rules": [{"name": "Broken", "month": 13, "day": 1}]}')
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        assert not calendar.is_business_day(date(2026, 11, 27))
+        print("   ✓ A malformed edit keeps the last good calendar")
+
+    with pytest.raises(HolidayCalendarError):
+        HolidayCalendar({'rules': [{'name': 'Odd', 'month': 5, 'weekday': 'XX', 'nth': 1}]})
+
+
+if __name__ == "__main__":
+    test_observed_dates_and_bitmap_queries()
+    test_custom_rules_and_affected_year_invalidation()
+    print("\nAll holiday calendar checks passed")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Test the in-memory interval index against brute force and its commit hooks"""
+
+import os
+import random
+import tempfile
+from dataclasses import replace
+
+from flask import Flask
+
+from config import Settings
+from database import db
+from interval_index import Interval, IntervalIndex, get_interval_index, init_interval_index, to_ordinal
+from models import Position, PTORequest, TeamMember
+
+
+def brute_force(intervals, day):
+    return {iv.request_id for iv in intervals.values() if iv.start <= day <= iv.end}
+
+
+def test_interval_index_matches_brute_force():
+    """Point queries stay exact through upserts, removals and compactions"""
+
+    print("=" * 70)
+    print("TESTING INTERVAL INDEX")
+    print("=" * 70)
+
+    rng = random.Random(42)
+    base = to_ordinal('2026-01-01')
+
+    def random_interval(request_id):
+        start = base + rng.randint(0, 365)
+        return Interval(start, start + rng.choice([0, 0, 1, 2, 4, 9, 30]), request_id, rng.randint(1, 40))
+
+    live = {i: random_interval(i) for i in range(1, 2001)}
+    index = IntervalIndex()
+    index.load(live.values())
+
+    for step in range(3000):
+        if step % 3 == 0:
+            request_id = rng.randint(1, 2500)
+            live[request_id] = random_interval(request_id)
+            index.upsert(live[request_id])
+        elif step % 3 == 1 and live:
+            request_id = rng.choice(list(live))
+            del live[request_id]
+            index.remove(request_id)
+        else:
+            day = base + rng.randint(-5, 370)
+            assert {iv.request_id for iv in index.out_on(day)} == brute_force(live, day)
+    assert len(index) == len(live)
+    print(f"   ✓ 1000 point queries matched brute force over {len(live)} intervals with interleaved updates")
+
+
+def test_interval_index_follows_commits():
+    """Committed creates and status changes reach the app's index; rolled-back ones don't"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'intervals.db')}"
+        db.init_app(app)
+        init_interval_index(app, replace(Settings(), interval_index_refresh_seconds=0))
+
+        with app.app_context():
+            db.create_all()
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Index Nurse', email='index.nurse@mswcvi.com', position=position)
+            approved = PTORequest(member=nurse, start_date='2026-03-02', end_date='2026-03-06', pto_type='Vacation',
+                                  manager_team='clinical', status='approved')
+            db.session.add_all([position, nurse, approved])
+            db.session.commit()
+
+            index = get_interval_index()
+            day = to_ordinal('2026-03-04')
+            assert [iv.request_id for iv in index.out_on(day)] == [approved.id]
+
+            pending = PTORequest(member=nurse, start_date='2026-03-04', end_date='2026-03-04', pto_type='Personal',
+                                 manager_team='clinical', status='pending')
+            db.session.add(pending)
+            db.session.commit()
+            assert {iv.request_id for iv in index.out_on(day)} == {approved.id, pending.id}
+            print("   ✓ New request indexed on commit")
+
+            pending.status = 'denied'
+            approved.status = 'completed'
+            db.session.commit()
+            assert index.out_on(day) == []
+            print("   ✓ Denied and completed requests leave the index")
+
+            db.session.add(PTORequest(member=nurse, start_date='2026-03-04', end_date='2026-03-04', pto_type='Personal',
+                                      manager_team='clinical', status='pending'))
+            db.session.flush()
+            db.session.rollback()
+            assert index.out_on(day) == []
+            print("   ✓ Rolled-back writes are not applied")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_interval_index_matches_brute_force()
+    test_interval_index_follows_commits()
+    print("\nAll interval index checks passed")
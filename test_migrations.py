@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Test the versioned migration runner against a legacy SQLite schema"""
+
+import os
+import sqlite3
+import tempfile
+
+import pytest
+from flask import Flask
+
+from calendar_days import calendar_span, sync_calendar
+from config import get_settings
+from database import db
+from migrations import (HISTORY_VIEW_COLUMNS_V6, LATEST_VERSION, BackfillIncomplete, applied_versions,
+                        run_migrations)
+from models import PTORequest
+from request_events import rebuild_status_counts, status_counts
+from rollups import rebuild_rollups
+
+LEGACY_ROWS = 250
+
+# Schema from before sick_balance_hours and pin existed, with the old voice-call columns and an
+# is_call_out column that was added without a default (NULL on every existing row)
+LEGACY_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, email VARCHAR(120) NOT NULL UNIQUE,
+                    phone VARCHAR(20), pto_balance_hours NUMERIC(5,2), pto_refresh_date DATE, created_at DATETIME);
+CREATE TABLE positions (id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL UNIQUE, team VARCHAR(20) NOT NULL);
+CREATE TABLE team_members (id INTEGER PRIMARY KEY REFERENCES users(id), position_id INTEGER NOT NULL);
+CREATE TABLE pto_requests (id INTEGER PRIMARY KEY, member_id INTEGER NOT NULL, start_date VARCHAR(10) NOT NULL,
+                           end_date VARCHAR(10) NOT NULL, pto_type VARCHAR(50) NOT NULL, status VARCHAR(20),
+                           manager_team VARCHAR(20) NOT NULL, denial_reason TEXT, is_partial_day BOOLEAN,
+                           start_time VARCHAR(8), end_time VARCHAR(8), reason TEXT, is_call_out BOOLEAN,
+                           timekeeping_entered BOOLEAN, coverage_arranged BOOLEAN, approved_date DATETIME,
+                           completed_date DATETIME, created_at DATETIME, updated_at DATETIME, submitted_at DATETIME);
+CREATE TABLE call_out_records (id INTEGER PRIMARY KEY, member_id INTEGER NOT NULL, pto_request_id INTEGER,
+                               call_sid VARCHAR(100), recording_url TEXT, recording_duration INTEGER,
+                               source VARCHAR(10) NOT NULL, phone_number_used VARCHAR(20) NOT NULL);
+"""
+
+
+def create_legacy_database(path):
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.execute("INSERT INTO positions VALUES (1, 'APP', 'clinical')")
+        conn.execute("INSERT INTO users (id, name, email, pto_balance_hours) VALUES (1, 'Legacy', 'legacy@mswcvi.com', 60)")
+        conn.execute("INSERT INTO team_members VALUES (1, 1)")
+        conn.executemany(
+            "INSERT INTO pto_requests (member_id, start_date, end_date, pto_type, status, manager_team) "
+            "VALUES (1, '2024-01-02', '2024-01-02', 'Vacation', 'completed', 'clinical')",
+            [()] * LEGACY_ROWS)
+
+
+def column_names(path, table):
+    with sqlite3.connect(path) as conn:
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def test_migrations_upgrade_legacy_database_in_resumable_batches():
+    """Backfills stop and resume at their cursor; re-running is a no-op"""
+
+    print("=" * 70)
+    print("TESTING VERSIONED MIGRATIONS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'legacy.db')
+        create_legacy_database(db_path)
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+        db.init_app(app)
+
+        with app.app_context():
+            # Simulate an interrupted run: one 100-row batch of the first backfill
+            with pytest.raises(BackfillIncomplete):
+                run_migrations(batch_size=100, pause=0, max_batches=1)
+            with sqlite3.connect(db_path) as conn:
+                remaining = conn.execute("SELECT COUNT(*) FROM pto_requests WHERE is_call_out IS NULL").fetchone()[0]
+                cursor = conn.execute("SELECT backfill_cursor FROM schema_migrations WHERE version = 1").fetchone()[0]
+            assert remaining == LEGACY_ROWS - 100 and cursor == 100
+            assert applied_versions() == set()
+            print(f"   ✓ Interrupted after one batch; step unapplied, cursor saved at id {cursor}")
+
+            applied = run_migrations(batch_size=100, pause=0)
+            assert applied == list(range(1, LATEST_VERSION + 1))
+            assert applied_versions() == set(applied)
+            print(f"   ✓ Resumed and applied migrations {applied}")
+
+            assert run_migrations() == []
+            print("   ✓ Re-running is a no-op")
+            db.engine.dispose()
+
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM pto_requests WHERE is_call_out IS NULL").fetchone()[0] == 0
+            assert conn.execute("SELECT sick_balance_hours FROM users").fetchone()[0] == 60
+        assert 'pin' in column_names(db_path, 'users')
+        assert 'recording_url' not in column_names(db_path, 'call_out_records')
+        assert column_names(db_path, 'pto_requests_all') == [*HISTORY_VIEW_COLUMNS_V6, 'is_archived']
+        assert set(HISTORY_VIEW_COLUMNS_V6) == {c.name for c in PTORequest.__table__.columns}
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT request_count FROM pto_usage_rollups WHERE month = '2024-01'").fetchone()[0] \
+                == LEGACY_ROWS
+        print("   ✓ Columns added, backfilled and dropped; usage rollups seeded")
+
+
+def test_every_batched_step_resumes():
+    """Stopping after every batch of every step still ends with complete derived tables"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'legacy.db')
+        create_legacy_database(db_path)
+
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+        db.init_app(app)
+
+        with app.app_context():
+            interruptions = 0
+            while True:
+                try:
+                    run_migrations(batch_size=100, pause=0, max_batches=1)
+                    break
+                except BackfillIncomplete:
+                    interruptions += 1
+            assert applied_versions() == set(range(1, LATEST_VERSION + 1))
+            assert rebuild_rollups(dry_run=True) == {'requests': LEGACY_ROWS, 'rows': 1, 'changed': 0}
+            assert rebuild_status_counts(dry_run=True)['changed'] == 0
+            assert status_counts('clinical')['completed'] == LEGACY_ROWS
+            assert sync_calendar(*calendar_span(get_settings()), dry_run=True)['changed'] == 0
+            print(f"   ✓ Applied every step across {interruptions} interruptions; rollups, status "
+                  f"counters and calendar complete")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_migrations_upgrade_legacy_database_in_resumable_batches()
+    test_every_batched_step_resumes()
+    print("\nAll migration checks passed")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test per-member overlapping-request detection at submit time"""
+
+import os
+import tempfile
+import time
+
+import pytest
+from flask import Flask
+from sqlalchemy import text
+
+from database import db
+from models import Position, PTORequest, TeamMember
+from overlaps import RequestConflict, find_conflicts
+from pto_system import stage_pto_request
+from routes_simple import register_routes
+from services import ServiceRegistry
+
+
+def test_overlapping_requests_are_rejected_or_merged():
+    """Overlaps raise a structured conflict; exact duplicates merge; split partial days pass"""
+
+    print("=" * 70)
+    print("TESTING OVERLAPPING REQUEST DETECTION")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'overlaps.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Overlap Nurse', email='overlap.nurse@mswcvi.com', position=position)
+            other = TeamMember(name='Other Nurse', email='other.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse, other])
+            db.session.commit()
+
+            def submit(member, start, end, pto_type='Vacation', **kwargs):
+                request_id = stage_pto_request(member.id, start, end, pto_type, 'clinical', **kwargs)
+                db.session.commit()
+                return request_id
+
+            week = submit(nurse, '2026-05-04', '2026-05-08')
+            assert submit(nurse, '2026-05-04', '2026-05-08') == week
+            assert PTORequest.query.filter_by(member_id=nurse.id).count() == 1
+            print("   ✓ Exact duplicate merged into the existing request")
+
+            with pytest.raises(RequestConflict) as excinfo:
+                submit(nurse, '2026-05-07', '2026-05-12', pto_type='Personal')
+            conflict = excinfo.value.to_dict()['conflicts'][0]
+            assert conflict['request_id'] == week and conflict['kind'] == 'overlap'
+            assert (conflict['overlap_start'], conflict['overlap_end']) == ('2026-05-07', '2026-05-08')
+            db.session.rollback()
+            print(f"   ✓ Overlap rejected: {excinfo.value}")
+
+            assert submit(other, '2026-05-04', '2026-05-08') != week
+            print("   ✓ Another member's request on the same dates is fine")
+
+            morning = submit(nurse, '2026-05-13', '2026-05-13', is_partial_day=True, start_time='08:00',
+                             end_time='12:00')
+            afternoon = submit(nurse, '2026-05-13', '2026-05-13', is_partial_day=True, start_time='12:00',
+                               end_time='16:00')
+            assert morning != afternoon
+            with pytest.raises(RequestConflict):
+                submit(nurse, '2026-05-13', '2026-05-13', is_partial_day=True, start_time='11:00', end_time='13:00')
+            db.session.rollback()
+            call_out_over_partials = submit(nurse, '2026-05-13', '2026-05-13', pto_type='Sick Leave', is_call_out=True)
+            assert call_out_over_partials not in (morning, afternoon)
+            print("   ✓ Partial days only conflict when their hours overlap; they don't block calling out sick")
+
+            call_out = submit(nurse, '2026-05-14', '2026-05-14', pto_type='Sick Leave', is_call_out=True)
+            balance = float(db.session.get(TeamMember, nurse.id).sick_balance_hours)
+            assert submit(nurse, '2026-05-14', '2026-05-14', pto_type='Sick Leave', is_call_out=True) == call_out
+            assert float(db.session.get(TeamMember, nurse.id).sick_balance_hours) == balance
+            print("   ✓ Repeated call-out merged without a second sick-time deduction")
+
+            db.session.get(PTORequest, week).status = 'denied'
+            db.session.commit()
+            assert submit(nurse, '2026-05-07', '2026-05-12', pto_type='Personal')
+            print("   ✓ Denied requests no longer block the dates")
+
+            plan = ' '.join(str(row[-1]) for row in db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM pto_requests WHERE member_id = 1 "
+                "AND start_date <= '2026-05-08' AND end_date >= '2026-05-04'")))
+            assert 'ix_pto_requests_member_dates' in plan, plan
+            started = time.perf_counter()
+            for _ in range(200):
+                find_conflicts(nurse.id, '2026-05-04', '2026-05-08')
+            per_check = (time.perf_counter() - started) / 200 * 1000
+            print(f"   ✓ Lookup uses ix_pto_requests_member_dates ({per_check:.3f} ms per check)")
+            db.engine.dispose()
+
+
+def test_web_call_out_over_pending_request():
+    """A sick call-out from the web form is accepted over a pending request, as by SMS"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'web.db')}"
+        app.secret_key = 'test'
+        db.init_app(app)
+        ServiceRegistry(app)
+        register_routes(app)
+
+        with app.app_context():
+            db.create_all()
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Web Nurse', email='web.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            db.session.commit()
+            nurse_id = nurse.id
+            vacation = stage_pto_request(nurse_id, '2026-05-04', '2026-05-08', 'Vacation', 'clinical')
+            db.session.commit()
+
+        client = app.test_client()
+        form = {'team': 'clinical', 'position': 'CVI RNs', 'name': 'Web Nurse', 'start_date': '2026-05-06',
+                'end_date': '2026-05-06', 'pto_type': 'Sick Leave', 'reason': 'Flu', 'call_out': '1'}
+        response = client.post('/submit_request', data=form, headers={'Accept': 'application/json'})
+        assert response.status_code == 302
+        response = client.post('/submit_request', data={**form, 'pto_type': 'Personal', 'call_out': '0'},
+                               headers={'Accept': 'application/json'})
+        assert response.status_code == 409
+
+        with app.app_context():
+            requests = PTORequest.query.filter_by(member_id=nurse_id).order_by(PTORequest.id).all()
+            assert [(r.id == vacation, r.is_call_out, r.status) for r in requests] == [
+                (True, False, 'pending'), (False, True, 'approved')]
+            print("   ✓ Web call-out accepted over a pending vacation; a regular request there is still rejected")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_overlapping_requests_are_rejected_or_merged()
+    test_web_call_out_over_pending_request()
+    print("\nAll overlap detection checks passed")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test read-replica routing with two SQLite files and a backup-API snapshot"""
+
+import os
+import tempfile
+from dataclasses import replace
+
+from flask import Flask, jsonify
+
+from config import Settings
+from database import db
+from db_profiles import init_engine_profile
+from models import Position
+from replica import init_read_replica, replica_reads
+
+
+def create_replica_app(workdir):
+    primary_url = f"sqlite:///{os.path.join(workdir, 'primary.db')}"
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.config['SQLALCHEMY_DATABASE_URI'] = primary_url
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f"sqlite:///{os.path.join(workdir, 'replica.db')}"}
+    settings = replace(Settings(), database_url=primary_url, replica_refresh_seconds=0, replica_sticky_seconds=10)
+    init_engine_profile(app, db, settings)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Position(name='APP', team='clinical'))
+        db.session.commit()
+
+    @app.route('/positions')
+    @replica_reads
+    def positions():
+        return jsonify(count=Position.query.count())
+
+    @app.route('/add_position/<name>')
+    @replica_reads
+    def add_position(name):
+        db.session.add(Position(name=name, team='admin'))
+        db.session.commit()
+        # Read-your-writes: this count must come from the primary
+        return jsonify(count=Position.query.count())
+
+    # Snapshot the primary (1 position) onto the replica
+    init_read_replica(app, settings)
+    return app
+
+
+def test_read_replica_routing():
+    """Reads go to the replica snapshot; writes and read-your-writes go to the primary"""
+
+    print("=" * 70)
+    print("TESTING READ-REPLICA ROUTING")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_replica_app(workdir)
+
+        # A write that bypasses the web layer lands only on the primary
+        with app.app_context():
+            db.session.add(Position(name='CVI RNs', team='clinical'))
+            db.session.commit()
+
+        client = app.test_client()
+        assert client.get('/positions').json['count'] == 1
+        print("   ✓ Read-only view served from the replica snapshot")
+
+        assert client.get('/positions?read_from=primary').json['count'] == 2
+        assert client.get('/positions', headers={'X-Read-From': 'primary'}).json['count'] == 2
+        print("   ✓ Per-request override reads from the primary")
+
+        assert client.get('/add_position/CT Desk').json['count'] == 3
+        print("   ✓ Reads after a write in the same request use the primary")
+
+        assert client.get('/positions').json['count'] == 3
+        other_client = app.test_client()
+        assert other_client.get('/positions').json['count'] == 1
+        print("   ✓ Writer's session is pinned to the primary; other sessions still read the replica")
+
+        app.extensions['replica_refresher'].refresh()
+        assert other_client.get('/positions').json['count'] == 3
+        print("   ✓ Replica catches up after a refresh")
+
+        result = app.test_cli_runner().invoke(args=['refresh-replica'])
+        assert result.exit_code == 0 and 'Replica refreshed' in result.output, result.output
+
+        with app.app_context():
+            db.engine.dispose()
+            db.engines['replica'].dispose()
+        # The bind's (empty) metadata lives on the shared db object; drop it so apps
+        # created by later tests in this process don't expect a 'replica' bind
+        db.metadatas.pop('replica', None)
+
+
+if __name__ == "__main__":
+    test_read_replica_routing()
+    print("\nAll read-replica checks passed")
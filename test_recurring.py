@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Test recurring and multi-range submission: expansion, one-pass validation and one INSERT"""
+
+import os
+import tempfile
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from database import db
+from models import Position, PTORequest, TeamMember
+from overlaps import RequestConflict
+from pto_system import stage_pto_request
+from recurring import RecurrenceError, expand_submission, stage_recurring_requests
+
+
+def test_recurrence_expansion():
+    """Every other Friday skips the observed July 4th holiday; bad rules are rejected"""
+
+    print("=" * 70)
+    print("TESTING RECURRING SUBMISSIONS")
+    print("=" * 70)
+
+    occurrences, skipped = expand_submission('FREQ=WEEKLY;INTERVAL=2;BYDAY=FR;UNTIL=2026-07-31', '2026-06-05')
+    assert [o.start_date for o in occurrences] == ['2026-06-05', '2026-06-19', '2026-07-17', '2026-07-31']
+    assert skipped == ['2026-07-03']  # Independence Day observed on Friday
+    occurrences, _ = expand_submission('FREQ=WEEKLY;BYDAY=TU,TH;COUNT=5', '2026-05-05')
+    assert [o.start_date for o in occurrences] == ['2026-05-05', '2026-05-07', '2026-05-12', '2026-05-14',
+                                                   '2026-05-19']
+    print("   ✓ Every other Friday and Tue/Thu COUNT=5 expand as expected, skipping holidays")
+
+    occurrences, skipped = expand_submission(ranges=[{'start_date': '2026-08-10', 'end_date': '2026-08-14'},
+                                                     {'start_date': '2026-08-01', 'end_date': '2026-08-02'},
+                                                     {'start_date': '2026-06-01'}])
+    assert [(o.start_date, o.end_date) for o in occurrences] == [('2026-06-01', '2026-06-01'),
+                                                                 ('2026-08-10', '2026-08-14')]
+    assert skipped == ['2026-08-01']
+    print("   ✓ Explicit ranges are sorted; a weekend-only range is skipped")
+
+    for bad in ('FREQ=MONTHLY;COUNT=3', 'FREQ=WEEKLY;BYDAY=FR', 'FREQ=WEEKLY;BYDAY=XX;COUNT=2'):
+        with pytest.raises(RecurrenceError):
+            expand_submission(bad, '2026-06-05')
+    with pytest.raises(RecurrenceError):
+        expand_submission(ranges=[{'start_date': '2026-06-01', 'end_date': '2026-06-05'},
+                                  {'start_date': '2026-06-04', 'end_date': '2026-06-08'}])
+    print("   ✓ Unsupported, unbounded and self-overlapping submissions are rejected")
+
+
+def test_batch_validated_and_inserted_together():
+    """One INSERT for the batch; balance and overlaps are checked for all occurrences first"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'recurring.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Friday Nurse', email='friday.nurse@mswcvi.com', position=position,
+                               pto_balance_hours=60)
+            db.session.add_all([position, nurse])
+            db.session.commit()
+
+            inserts = []
+            event.listen(db.engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args: inserts.append(statement)
+                         if statement.startswith('INSERT INTO pto_requests') else None)
+
+            occurrences, skipped = expand_submission('FREQ=WEEKLY;BYDAY=FR;COUNT=10', '2026-06-05')
+            with pytest.raises(RecurrenceError) as excinfo:
+                stage_recurring_requests(nurse.id, occurrences, 'Vacation', 'clinical')
+            db.session.rollback()
+            assert '60 hours are available' in str(excinfo.value)
+            assert PTORequest.query.count() == 0 and not inserts
+            print(f"   ✓ Rejected before writing: {excinfo.value}")
+
+            stage_pto_request(nurse.id, '2026-06-19', '2026-06-19', 'Vacation', 'clinical')
+            db.session.commit()
+            inserts.clear()
+            occurrences, skipped = expand_submission('FREQ=WEEKLY;BYDAY=FR;UNTIL=2026-07-17', '2026-06-05')
+            result = stage_recurring_requests(nurse.id, occurrences, 'Vacation', 'clinical', reason='Fridays',
+                                              skipped=skipped)
+            db.session.commit()
+            assert result.duplicates == ['2026-06-19'] and result.skipped == ['2026-07-03']
+            assert len(result.request_ids) == 5 and result.total_hours == 37.5
+            assert len(inserts) == 1, inserts
+            print(f"   ✓ {len(result.request_ids)} requests written with {len(inserts)} INSERT; "
+                  f"duplicate and holiday reported")
+
+            with pytest.raises(RequestConflict):
+                stage_recurring_requests(nurse.id, expand_submission(
+                    'FREQ=DAILY;UNTIL=2026-06-12', '2026-06-11')[0], 'Personal', 'clinical')
+            db.session.rollback()
+            assert PTORequest.query.count() == 6
+            print("   ✓ An overlap with an existing request rejects the whole batch")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_recurrence_expansion()
+    test_batch_validated_and_inserted_together()
+    print("\nAll recurring submission checks passed")
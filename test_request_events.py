@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Test the request event log, the status counters and approval latency replay"""
+
+import os
+import tempfile
+from datetime import datetime
+
+from flask import Flask
+from sqlalchemy import event, select
+
+from archive import archive_closed_requests
+from bulk_actions import stage_bulk_actions
+from database import db
+from migrations import run_migrations
+from models import Position, PTORequest, PTORequestEvent, RequestStatusCount, TeamMember
+from pto_system import stage_pto_request
+from request_events import (backfill_events, rebuild_status_counts, replay_approval_latency, status_counts,
+                            summarize_latency)
+from timekeeping import claim_timekeeping_batch
+from transitions import transition_matching, transition_request
+
+
+def test_events_and_counters_follow_transitions():
+    """Every submission and transition is logged once; counters always match a rebuild"""
+
+    print("=" * 70)
+    print("TESTING REQUEST EVENTS AND STATUS COUNTERS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'events.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Event Nurse', email='event.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            db.session.commit()
+
+            ids = [stage_pto_request(nurse.id, day, day, 'Vacation', 'clinical')
+                   for day in ('2025-03-02', '2025-03-09', '2025-03-16', '2026-06-01')]
+            db.session.commit()
+            first = db.session.get(PTORequest, ids[0])
+            assert transition_request(first, 'in_progress', actor_id=42)
+            assert transition_request(first, 'approved', actor_id=42)
+            stage_bulk_actions('clinical', {'approve': [ids[1]], 'deny': [ids[2]]}, actor_id=7)
+            transition_matching('approved', 'completed', PTORequest.end_date < '2026-01-01')
+            db.session.commit()
+
+            assert status_counts('clinical') == {'pending': 1, 'in_progress': 1, 'approved': 0, 'denied': 1,
+                                                 'completed': 1, 'total': 4, 'archived': 0}
+            assert rebuild_status_counts(dry_run=True)['changed'] == 0
+            history = [(e.old_status, e.new_status, e.actor_id) for e in
+                       PTORequestEvent.query.filter_by(request_id=ids[0]).order_by(PTORequestEvent.id)]
+            assert history == [(None, 'pending', None), ('pending', 'in_progress', 42),
+                               ('in_progress', 'approved', 42), ('approved', 'completed', None)]
+            print(f"   ✓ {PTORequestEvent.query.count()} events logged; counters match a rebuild: "
+                  f"{status_counts('clinical')}")
+
+            # Archival moves closed requests to the archived counters and keeps their events
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql("UPDATE pto_requests SET updated_at = '2025-04-01 00:00:00'")
+            archive_closed_requests(retention_days=30, pause=0)
+            assert status_counts('clinical') == {'pending': 1, 'in_progress': 1, 'approved': 0, 'denied': 1,
+                                                 'completed': 1, 'total': 4, 'archived': 2}
+            live = dict(db.session.execute(select(RequestStatusCount.status, RequestStatusCount.count)
+                                           .where(RequestStatusCount.team == 'clinical')).all())
+            assert live['denied'] == 0 and live['archived:denied'] == 1
+            assert rebuild_status_counts(dry_run=True)['changed'] == 0
+            assert PTORequestEvent.query.filter_by(request_id=ids[0]).count() == 4
+            print("   ✓ Archived requests stay in the totals under archived counters; their history stays in the log")
+
+            statements = []
+            listener = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            status_counts('clinical')
+            event.remove(db.engine, 'before_cursor_execute', listener)
+            assert len(statements) == 1 and 'pto_requests' not in statements[0]
+            print("   ✓ Dashboard counts are one read of the counters table")
+            db.engine.dispose()
+
+
+def test_timekeeping_export_keeps_counters_in_sync():
+    """A checked-off request promoted by a timekeeping export is logged and counted"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'export.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Export Nurse', email='export.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            db.session.commit()
+
+            request_id = stage_pto_request(nurse.id, '2026-06-01', '2026-06-02', 'Vacation', 'clinical')
+            db.session.commit()
+            pto_request = db.session.get(PTORequest, request_id)
+            assert transition_request(pto_request, 'in_progress', actor_id=3)
+            pto_request.coverage_arranged = True
+            db.session.commit()
+
+            batch_id, ids = claim_timekeeping_batch(team='clinical', actor_id=3)
+            db.session.commit()
+            assert ids == [request_id] and db.session.get(PTORequest, request_id).status == 'approved'
+            assert status_counts('clinical') == {'pending': 0, 'in_progress': 0, 'approved': 1, 'denied': 0,
+                                                 'completed': 0, 'total': 1, 'archived': 0}
+            assert rebuild_status_counts(dry_run=True)['changed'] == 0
+            history = [(e.old_status, e.new_status) for e in
+                       PTORequestEvent.query.filter_by(request_id=request_id).order_by(PTORequestEvent.id)]
+            assert history == [(None, 'pending'), ('pending', 'in_progress'), ('in_progress', 'approved')]
+            print(f"   ✓ Timekeeping batch {batch_id} promotion logged; counters match a rebuild")
+            db.engine.dispose()
+
+
+def test_latency_replayed_from_backfilled_history():
+    """Requests that predate the log get events from their timestamps; latency replays from them"""
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'latency.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+            position = Position(name='Front Desk', team='admin')
+            clerk = TeamMember(name='Clerk', email='clerk@mswcvi.com', position=position)
+            db.session.add_all([position, clerk])
+            db.session.flush()
+            for submitted, approved, status in [((2026, 3, 2, 9), (2026, 3, 2, 15, 30), 'approved'),
+                                                ((2026, 3, 3, 8), (2026, 3, 5, 8), 'in_progress'),
+                                                ((2026, 3, 4, 8), None, 'pending')]:
+                db.session.add(PTORequest(member=clerk, start_date='2026-04-01', end_date='2026-04-01',
+                                          pto_type='Vacation', manager_team='admin', status=status,
+                                          submitted_at=datetime(*submitted),
+                                          approved_date=datetime(*approved) if approved else None))
+            db.session.commit()
+
+            assert backfill_events() == 6 and backfill_events() == 0
+            db.session.commit()
+            latencies = replay_approval_latency(team='admin')
+            assert [latency.hours for latency in latencies] == [6.5, 48.0]
+            assert summarize_latency(latencies) == {'requests': 2, 'median_hours': 27.25, 'p90_hours': 48.0,
+                                                    'max_hours': 48.0}
+            assert len(replay_approval_latency(team='admin', since=datetime(2026, 3, 3))) == 1
+            print(f"   ✓ Backfilled history replays approval latency: {summarize_latency(latencies)}")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_events_and_counters_follow_transitions()
+    test_timekeeping_export_keeps_counters_in_sync()
+    test_latency_replayed_from_backfilled_history()
+    print("\nAll request event checks passed")
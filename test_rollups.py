@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test incremental PTO usage rollups against a full rebuild"""
+
+import os
+import tempfile
+
+from flask import Flask
+
+from database import db
+from migrations import run_migrations
+from models import Position, PTORequest, PTOUsageRollup, TeamMember
+from pto_system import stage_pto_request
+from rollups import query_usage, rebuild_rollups, record_transition
+
+
+def set_status(pto_request, status):
+    record_transition(pto_request, pto_request.status, status)
+    pto_request.status = status
+
+
+def test_rollups_follow_status_transitions():
+    """Approve/deny/checklist/call-out deltas match a rebuild from scratch"""
+
+    print("=" * 70)
+    print("TESTING PTO USAGE ROLLUPS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'rollups.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Rollup Nurse', email='rollup.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            db.session.commit()
+
+            # Fri Jan 30 - Tue Feb 3 2026: 1 business day in January, 2 in February
+            spanning = PTORequest(member=nurse, start_date='2026-01-30', end_date='2026-02-03', pto_type='Vacation',
+                                  manager_team='clinical', status='pending')
+            denied = PTORequest(member=nurse, start_date='2026-02-10', end_date='2026-02-10', pto_type='Vacation',
+                                manager_team='clinical', status='pending')
+            db.session.add_all([spanning, denied])
+            db.session.flush()
+            set_status(spanning, 'in_progress')   # approve_request
+            set_status(denied, 'in_progress')
+            set_status(denied, 'denied')          # deny_request after approval takes it back out
+            set_status(spanning, 'approved')      # update_checklist: counted -> counted, no change
+            stage_pto_request(nurse.id, '2026-02-11', '2026-02-11', 'Sick Leave', 'clinical', is_call_out=True)
+            db.session.commit()
+
+            rows = {(r['month'], r['pto_type']): r for r in query_usage(team='clinical')}
+            assert rows[('2026-01', 'Vacation')] == {
+                'team': 'clinical', 'position': 'CVI RNs', 'month': '2026-01', 'pto_type': 'Vacation',
+                'request_count': 1, 'call_outs': 0, 'days': 1.0, 'hours': 7.5}
+            assert rows[('2026-02', 'Vacation')]['request_count'] == 0
+            assert rows[('2026-02', 'Vacation')]['hours'] == 15.0
+            assert rows[('2026-02', 'Sick Leave')]['call_outs'] == 1
+            print("   ✓ Days split across months; denial reversed its delta; call-out counted")
+
+            by_month = query_usage(start_month='2026-02', group_by=('month',))
+            assert by_month == [{'month': '2026-02', 'request_count': 1, 'call_outs': 1, 'days': 3.0, 'hours': 22.5}]
+            print("   ✓ Reports sum over the columns left out of group_by")
+
+            assert rebuild_rollups(dry_run=True)['changed'] == 0
+            print("   ✓ Incremental rollups match a full rebuild")
+
+            # Drift (e.g. a manual SQL edit) is found and repaired by the rebuild
+            PTOUsageRollup.query.filter_by(month='2026-01').update({'hours': 99})
+            db.session.commit()
+            assert rebuild_rollups(dry_run=True)['changed'] == 1
+            stats = rebuild_rollups()
+            assert stats['requests'] == 2 and stats['changed'] == 1
+            assert rebuild_rollups(dry_run=True)['changed'] == 0
+            print(f"   ✓ Rebuild repaired drift ({stats['rows']} rows from {stats['requests']} requests)")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_rollups_follow_status_transitions()
+    print("\nAll rollup checks passed")
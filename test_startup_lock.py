@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test that concurrent workers initialize one SQLite database exactly once"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKERS = 8
+
+# Each worker waits for a shared start time so they all hit startup together,
+# then imports app.py exactly like a gunicorn worker would
+WORKER_SNIPPET = (
+    "import json, sys, time\n"
+    "time.sleep(max(0, float(sys.argv[1]) - time.time()))\n"
+    "import app\n"
+    "print('STATE ' + json.dumps(app.startup_state._asdict()))\n"
+)
+
+
+def start_workers(db_path, count):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", GROUP_COMMIT_ENABLED='False')
+    start_at = str(time.time() + 2.0)
+    return [
+        subprocess.Popen([sys.executable, '-c', WORKER_SNIPPET, start_at],
+                         cwd=APP_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(count)
+    ]
+
+
+def test_concurrent_startup_initializes_once():
+    """Spawn N workers against one fresh database file"""
+
+    print("=" * 70)
+    print(f"TESTING CONCURRENT STARTUP WITH {WORKERS} WORKERS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'pto_tracker.db')
+        processes = start_workers(db_path, WORKERS)
+
+        states = []
+        for process in processes:
+            stdout, stderr = process.communicate(timeout=120)
+            assert process.returncode == 0, f"Worker failed:\n{stderr}"
+            assert 'database is locked' not in stderr, stderr
+            assert 'IntegrityError' not in stderr, stderr
+            state_line = [line for line in stdout.splitlines() if line.startswith('STATE ')][-1]
+            states.append(json.loads(state_line[len('STATE '):]))
+
+        initialized = [s for s in states if s['initialized']]
+        print(f"   ✓ {len(states)} workers started, {len(initialized)} ran initialization")
+        assert len(initialized) == 1, states
+
+        # Every later start takes the fast path
+        follow_up = start_workers(db_path, 2)
+        for process in follow_up:
+            stdout, stderr = process.communicate(timeout=120)
+            assert process.returncode == 0, stderr
+            state = json.loads([line for line in stdout.splitlines() if line.startswith('STATE ')][-1][len('STATE '):])
+            assert not state['initialized'] and state['schema_version'] > 0, state
+        print("   ✓ Subsequent workers skipped initialization (schema version row present)")
+
+        import sqlite3
+        with sqlite3.connect(db_path) as conn:
+            meta_rows = conn.execute("SELECT COUNT(*) FROM app_meta").fetchone()[0]
+        assert meta_rows == 1
+        print("   ✓ Exactly one app_meta row written")
+
+
+if __name__ == "__main__":
+    test_concurrent_startup_initializes_once()
+    print("\nAll startup lock checks passed")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Test the batch timekeeping export and its single-UPDATE claim"""
+
+import os
+import tempfile
+
+from flask import Flask
+
+from database import db
+from models import Position, PTORequest, TeamMember
+from timekeeping import FIXED_WIDTH_LAYOUT, claim_timekeeping_batch, render_batch
+
+
+def test_timekeeping_batch_is_rerunnable():
+    """Each request is exported once; later runs only pick up new requests"""
+
+    print("=" * 70)
+    print("TESTING TIMEKEEPING BATCH EXPORT")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'timekeeping.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            clinical = Position(name='CVI RNs', team='clinical')
+            admin = Position(name='CT Desk', team='admin')
+            nurse = TeamMember(name='Nurse', email='nurse@mswcvi.com', position=clinical)
+            desk = TeamMember(name='Desk', email='desk@mswcvi.com', position=admin)
+            db.session.add_all([clinical, admin, nurse, desk])
+
+            # Thu-Tue: 4 business days; the partial day is a single 3.5 hour entry
+            week = PTORequest(member=nurse, start_date='2025-12-18', end_date='2025-12-23', pto_type='Vacation',
+                              manager_team='clinical', status='in_progress', coverage_arranged=True)
+            partial = PTORequest(member=nurse, start_date='2025-12-29', end_date='2025-12-29', pto_type='Personal',
+                                 manager_team='clinical', status='approved', is_partial_day=True,
+                                 start_time='09:00', end_time='12:30')
+            pending = PTORequest(member=nurse, start_date='2025-12-30', end_date='2025-12-30', pto_type='Vacation',
+                                 manager_team='clinical', status='pending')
+            other_team = PTORequest(member=desk, start_date='2025-12-30', end_date='2025-12-30', pto_type='Vacation',
+                                    manager_team='admin', status='approved')
+            db.session.add_all([week, partial, pending, other_team])
+            db.session.commit()
+
+            batch_id, ids = claim_timekeeping_batch(team='clinical')
+            content, filename, _ = render_batch(batch_id, 'csv', team='clinical')
+            db.session.commit()
+            assert sorted(ids) == sorted([week.id, partial.id])
+            lines = content.strip().splitlines()
+            assert len(lines) == 1 + 4 + 1, content
+            assert lines[-1].endswith(',PERS,3.50')
+            assert filename == f'timekeeping-{batch_id}.csv'
+            print(f"   ✓ Batch {batch_id} claimed {len(ids)} clinical requests ({len(lines) - 1} entries)")
+
+            db.session.expire_all()
+            assert week.status == 'approved' and week.timekeeping_entered
+            assert not other_team.timekeeping_entered and not pending.timekeeping_entered
+            print("   ✓ Fully checked-off request moved to approved; other team and pending untouched")
+
+            second_batch, second_ids = claim_timekeeping_batch(team='clinical')
+            db.session.commit()
+            assert second_ids == []
+            print("   ✓ Re-running claims nothing")
+
+            fixed, _, _ = render_batch(batch_id, 'fixed')
+            record_width = sum(width for _, width in FIXED_WIDTH_LAYOUT)
+            assert all(len(line) == record_width for line in fixed.splitlines())
+            assert fixed.splitlines()[0].startswith(f"{week.member_id:010d}20251218VAC   ")
+            print("   ✓ Earlier batch re-downloads as fixed-width records")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_timekeeping_batch_is_rerunnable()
+    print("\nAll timekeeping export checks passed")
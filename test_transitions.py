@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test compare-and-swap status transitions and the status_changed event"""
+
+import os
+import tempfile
+
+import pytest
+from flask import Flask
+
+from database import db
+from migrations import run_migrations
+from models import Position, PTORequest, TeamMember
+from rollups import query_usage
+from transitions import (InvalidTransition, status_changed, transition_matching, transition_request,
+                         transition_requests)
+
+
+def test_guarded_transitions():
+    """Disallowed and stale moves are refused; subscribers see every change with its old status"""
+
+    print("=" * 70)
+    print("TESTING STATUS TRANSITIONS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'transitions.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            run_migrations(pause=0)
+            position = Position(name='CVI RNs', team='clinical')
+            nurse = TeamMember(name='Transition Nurse', email='transition.nurse@mswcvi.com', position=position)
+            db.session.add_all([position, nurse])
+            db.session.flush()
+            first, second, past = [PTORequest(member=nurse, start_date=start, end_date=end, pto_type='Vacation',
+                                              manager_team='clinical', status='pending')
+                                   for start, end in [('2026-06-01', '2026-06-02'), ('2026-06-08', '2026-06-08'),
+                                                      ('2026-01-05', '2026-01-05')]]
+            db.session.add_all([first, second, past])
+            db.session.commit()
+
+            seen = []
+            def on_change(db_session, changes):
+                seen.extend((c.pto_request.id, c.old_status, c.new_status) for c in changes)
+            status_changed.connect(on_change)
+            try:
+                assert transition_request(first, 'in_progress') and first.status == 'in_progress'
+                assert not transition_request(first, 'in_progress')
+                assert not transition_request(first, 'completed')
+                db.session.commit()
+                print("   ✓ pending -> in_progress once; repeating it or skipping ahead is refused")
+
+                # Another manager denies the request after this session loaded it
+                stale = db.session.get(PTORequest, second.id)
+                with db.engine.begin() as conn:
+                    conn.exec_driver_sql("UPDATE pto_requests SET status = 'denied' WHERE id = ?", (second.id,))
+                assert not transition_request(stale, 'in_progress')
+                assert stale.status == 'denied'
+                print("   ✓ A row changed since it was read is not overwritten (and shows its stored status)")
+
+                updated = transition_requests({first.id: 'in_progress', past.id: 'pending'}, 'approved')
+                assert sorted(r.id for r in updated) == sorted([first.id, past.id])
+                completed = transition_matching('approved', 'completed', PTORequest.end_date < '2026-03-01')
+                assert [r.id for r in completed] == [past.id]
+                db.session.commit()
+                with pytest.raises(InvalidTransition):
+                    transition_matching('denied', 'approved')
+                print("   ✓ Batches move with one statement; the completion sweep only touches past requests")
+            finally:
+                status_changed.disconnect(on_change)
+
+            assert seen == [(first.id, 'pending', 'in_progress'), (first.id, 'in_progress', 'approved'),
+                            (past.id, 'pending', 'approved'), (past.id, 'approved', 'completed')]
+            hours = {row['month']: row['hours'] for row in query_usage(team='clinical')}
+            assert hours == {'2026-01': 7.5, '2026-06': 15.0}
+            print(f"   ✓ {len(seen)} transition events sent; rollups followed them: {hours}")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_guarded_transitions()
+    print("\nAll status transition checks passed")
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Test pricing full-day requests by per-employee work schedules"""
+
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+from flask import Flask
+
+from database import db
+from models import Position, PTORequest, TeamMember
+from work_schedules import daily_hours, scheduled_hours, set_work_schedule
+
+
+def test_requests_priced_by_work_schedule():
+    """4x10 and 3-day weeks, schedule changes mid-request and holidays; matches a per-day walk"""
+
+    print("=" * 70)
+    print("TESTING WORK SCHEDULES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'schedules.db')}"
+        db.init_app(app)
+
+        with app.app_context():
+            db.create_all()
+            position = Position(name='Echo Techs', team='clinical')
+            tech = TeamMember(name='Echo Tech', email='echo.tech@mswcvi.com', position=position)
+            part_timer = TeamMember(name='Part Timer', email='part.timer@mswcvi.com', position=position)
+            regular = TeamMember(name='Regular', email='regular@mswcvi.com', position=position)
+            db.session.add_all([position, tech, part_timer, regular])
+            db.session.commit()
+
+            def priced(member, start, end):
+                return PTORequest(member_id=member.id, start_date=start, end_date=end, pto_type='Vacation',
+                                  manager_team='clinical').duration_hours
+
+            assert priced(tech, '2026-05-04', '2026-05-08') == 37.5
+            set_work_schedule(tech, (10, 10, 10, 10, 0, 0, 0), '2026-01-01')
+            set_work_schedule(part_timer, (0, 8, 0, 8, 0, 8, 0), '2026-01-01')
+            db.session.commit()
+            assert priced(tech, '2026-05-04', '2026-05-08') == 40
+            assert priced(part_timer, '2026-05-04', '2026-05-10') == 24
+            assert priced(regular, '2026-05-04', '2026-05-08') == 37.5
+            print("   ✓ 4x10 week = 40h, Tue/Thu/Sat part-timer = 24h, no schedule = 7.5h per business day")
+
+            assert priced(tech, '2026-05-25', '2026-05-29') == 30  # Memorial Day Monday
+            # Dec 29-31 predate the schedule (standard days), Jan 1 is a holiday, Fri Jan 2 is a day off
+            assert priced(tech, '2025-12-29', '2026-01-02') == 3 * 7.5
+            print("   ✓ Holidays are not charged; days before the first schedule use the standard day")
+
+            set_work_schedule(tech, (8, 8, 8, 8, 8, 0, 0), '2026-07-01')
+            db.session.commit()
+            assert priced(tech, '2026-06-29', '2026-07-02') == 10 + 10 + 8 + 8
+            print("   ✓ A new schedule closes the old one; a request spanning both is priced by each")
+
+            rng = random.Random(7)
+            for _ in range(200):
+                start = date(2025, 6, 1) + timedelta(days=rng.randint(0, 700))
+                end = start + timedelta(days=rng.randint(0, 120))
+                walked = sum(hours for _, hours in daily_hours(tech.id, start.isoformat(), end.isoformat()))
+                assert scheduled_hours(tech.id, start.isoformat(), end.isoformat()) == round(walked, 2)
+            print("   ✓ 200 random ranges match a day-by-day walk of the schedule")
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    test_requests_priced_by_work_schedule()
+    print("\nAll work schedule checks passed")
@@ -0,0 +1,175 @@
+"""
+Timekeeping Batch Export
+Builds a timekeeping import file (CSV or fixed-width) for every in_progress and
+approved request whose time has not been entered yet, and marks them all
+timekeeping_entered with a single UPDATE in the same transaction.
+
+The UPDATE itself claims the rows (WHERE timekeeping_entered is false) and stamps
+them with a batch id, so re-running never exports a request twice, two managers
+exporting at once get disjoint batches, and a lost download can be fetched again
+by batch id without touching any rows
+"""
+
+import csv
+import io
+import logging
+import secrets
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, false, or_, select, true, update
+
+from business_days import BusinessDaysCalculator
+from database import db
+from models import Position, PTORequest, TeamMember, get_eastern_time
+from transitions import transition_matching
+from work_schedules import daily_hours
+
+logger = logging.getLogger(__name__)
+
+TIMEKEEPING_STATUSES = ('in_progress', 'approved')
+EXPORT_FORMATS = ('csv', 'fixed')
+
+# Pay codes expected by the timekeeping import; anything else is sent as OTHER
+PAY_CODES = {
+    'Vacation': 'VAC',
+    'Personal': 'PERS',
+    'Sick': 'SICK',
+    'Sick Leave': 'SICK',
+}
+
+CSV_HEADER = ['Batch', 'Request ID', 'Employee ID', 'Employee', 'Email', 'Team', 'Position', 'Work Date',
+              'Pay Code', 'Hours']
+
+# (field, width) of each fixed-width record; hours are right-aligned with 2 decimals
+FIXED_WIDTH_LAYOUT = [('employee_id', 10), ('work_date', 8), ('pay_code', 6), ('hours', 7), ('request_id', 10),
+                      ('batch', 24)]
+
+
+def _new_batch_id():
+    return f"TK{get_eastern_time().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(3)}"
+
+
+def _team_filter(team):
+    return PTORequest.manager_team == team if team else true()
+
+
+def claim_timekeeping_batch(team=None, actor_id=None):
+    """
+    Mark every unentered in_progress/approved request (optionally for one team) as
+    entered with one UPDATE and return (batch_id, request ids); caller commits
+    In-progress requests of the batch whose coverage is already arranged then move to
+    approved through transitions.py, as they would when both checklist boxes are
+    ticked in update_checklist
+    """
+    batch_id = _new_batch_id()
+    table = PTORequest.__table__
+    claimable = and_(
+        table.c.status.in_(TIMEKEEPING_STATUSES),
+        or_(table.c.timekeeping_entered.is_(None), table.c.timekeeping_entered == false()),
+        _team_filter(team),
+    )
+    values = {
+        'timekeeping_entered': True,
+        'timekeeping_batch': batch_id,
+        'updated_at': get_eastern_time(),
+    }
+
+    if db.engine.dialect.update_returning:
+        ids = db.session.scalars(update(table).where(claimable).values(**values).returning(table.c.id)).all()
+    else:
+        # No UPDATE ... RETURNING: lock the candidate rows first, then update exactly those
+        ids = db.session.scalars(select(table.c.id).where(claimable).with_for_update()).all()
+        if ids:
+            db.session.execute(update(table).where(table.c.id.in_(ids), claimable).values(**values))
+
+    if ids:
+        # Guarded in_progress -> approved, announced to the rollups, caches and event log
+        transition_matching('in_progress', 'approved', PTORequest.timekeeping_batch == batch_id,
+                            PTORequest.coverage_arranged == true(), actor_id=actor_id)
+
+    logger.info(f"Timekeeping batch {batch_id} claimed {len(ids)} requests", extra={'team': team})
+    return batch_id, ids
+
+
+def load_batch(batch_id, team=None):
+    """Requests of a batch with employee and position details, in employee/date order"""
+    return db.session.execute(
+        select(PTORequest.id, PTORequest.member_id, TeamMember.name, TeamMember.email, Position.team,
+               Position.name.label('position'), PTORequest.pto_type, PTORequest.is_call_out,
+               PTORequest.start_date, PTORequest.end_date, PTORequest.is_partial_day, PTORequest.start_time,
+               PTORequest.end_time, PTORequest.timekeeping_batch)
+        .join(TeamMember, TeamMember.id == PTORequest.member_id)
+        .join(Position, Position.id == TeamMember.position_id)
+        .where(PTORequest.timekeeping_batch == batch_id, _team_filter(team))
+        .order_by(TeamMember.name, PTORequest.start_date, PTORequest.id)
+    ).all()
+
+
+def _partial_hours(row):
+    start_hour, start_min = map(int, row.start_time.split(':'))
+    end_hour, end_min = map(int, row.end_time.split(':'))
+    return round(((end_hour * 60 + end_min) - (start_hour * 60 + start_min)) / 60, 2)
+
+
+def iter_entries(rows):
+    """One timekeeping entry per business day of each request (partial days: one entry)"""
+    for row in rows:
+        pay_code = 'SICK' if row.is_call_out else PAY_CODES.get(row.pto_type, 'OTHER')
+        start = datetime.strptime(row.start_date, '%Y-%m-%d').date()
+        end = datetime.strptime(row.end_date, '%Y-%m-%d').date()
+
+        if row.is_partial_day and row.start_time and row.end_time:
+            days = [(start, _partial_hours(row))]
+        else:
+            # Per the member's work schedule, else 7.5 hours per business day
+            days = daily_hours(row.member_id, row.start_date, row.end_date)
+            if days is None:
+                days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+                days = [(d, 7.5) for d in days if BusinessDaysCalculator.is_business_day(d)]
+
+        for work_date, hours in days:
+            yield {
+                'batch': row.timekeeping_batch,
+                'request_id': row.id,
+                'employee_id': row.member_id,
+                'employee': row.name,
+                'email': row.email,
+                'team': row.team,
+                'position': row.position,
+                'work_date': work_date,
+                'pay_code': pay_code,
+                'hours': hours,
+            }
+
+
+def render_csv(entries):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for e in entries:
+        writer.writerow([e['batch'], e['request_id'], e['employee_id'], e['employee'], e['email'], e['team'],
+                         e['position'], e['work_date'].isoformat(), e['pay_code'], f"{e['hours']:.2f}"])
+    return buffer.getvalue()
+
+
+def render_fixed_width(entries):
+    lines = []
+    for e in entries:
+        fields = {
+            'employee_id': str(e['employee_id']).zfill(10),
+            'work_date': e['work_date'].strftime('%Y%m%d'),
+            'pay_code': e['pay_code'].ljust(6),
+            'hours': f"{e['hours']:7.2f}",
+            'request_id': str(e['request_id']).zfill(10),
+            'batch': e['batch'].ljust(24),
+        }
+        lines.append(''.join(fields[name][:width] for name, width in FIXED_WIDTH_LAYOUT))
+    return '\r\n'.join(lines) + ('\r\n' if lines else '')
+
+
+def render_batch(batch_id, export_format='csv', team=None):
+    """Return (file contents, filename, mimetype) for a claimed batch"""
+    entries = iter_entries(load_batch(batch_id, team=team))
+    if export_format == 'fixed':
+        return render_fixed_width(entries), f'timekeeping-{batch_id}.txt', 'text/plain'
+    return render_csv(entries), f'timekeeping-{batch_id}.csv', 'text/csv'
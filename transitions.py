@@ -0,0 +1,102 @@
+"""
+Request Status Transitions
+Every status change of an existing PTO request goes through this module. The allowed
+moves are listed in TRANSITIONS, and each change is a compare-and-swap:
+
+    UPDATE pto_requests SET status = :new, ... WHERE id = :id AND status = :expected
+
+If another manager (or the completion sweep) changed the row since it was read, nothing
+is updated and the caller reports a conflict instead of processing it twice. A batch of
+requests moves with one statement.
+
+After each statement, `status_changed` is sent (a blinker signal, as Flask uses) with the
+updated rows, their old statuses and the manager who made the change; new requests are
+announced the same way with no old status (announce_created). Rollups, the coverage
+matrix, the interval index and the event log subscribe to it, so a transition updates
+them without re-querying; like the other commit hooks they only act when the session
+commits
+"""
+
+from collections import namedtuple
+
+import sqlalchemy as sa
+from blinker import Namespace
+
+from database import db
+from models import PTORequest
+
+# status -> statuses it may move to
+TRANSITIONS = {
+    'pending': ('in_progress', 'approved', 'denied'),   # manager approval (or direct legacy approval)
+    'in_progress': ('approved', 'denied'),               # checklist completed
+    'approved': ('completed',),                          # PTO period ended
+}
+
+Transition = namedtuple('Transition', ['pto_request', 'old_status', 'new_status', 'actor_id'])
+
+status_changed = Namespace().signal('pto-request-status-changed')
+
+
+class InvalidTransition(ValueError):
+    """A status change that TRANSITIONS does not allow"""
+
+
+def can_transition(old_status, new_status):
+    return new_status in TRANSITIONS.get(old_status, ())
+
+
+def announce_created(pto_requests, actor_id=None):
+    """Announce newly inserted (flushed) requests; call before the caller commits"""
+    if pto_requests:
+        status_changed.send(db.session(), changes=[
+            Transition(pto_request, None, pto_request.status, actor_id) for pto_request in pto_requests
+        ])
+
+
+def _transition(where, new_status, values, old_status_of, actor_id):
+    """Run one guarded UPDATE ... RETURNING and announce the changes; returns the updated requests"""
+    # Pending attribute changes must not be lost when the updated rows are refreshed
+    db.session.flush()
+    updated = db.session.scalars(
+        sa.update(PTORequest).where(where).values(status=new_status, **values).returning(PTORequest),
+        execution_options={'synchronize_session': False, 'populate_existing': True}
+    ).all()
+    if updated:
+        status_changed.send(db.session(), changes=[
+            Transition(pto_request, old_status_of(pto_request), new_status, actor_id) for pto_request in updated
+        ])
+    return updated
+
+
+def transition_requests(expected, new_status, actor_id=None, **values):
+    """
+    Move requests {id: status as read} to new_status (setting the other column values too)
+    Requests whose status changed since the read, or may not move to new_status, are left
+    alone; returns the updated requests. Does not commit
+    """
+    expected = {request_id: status for request_id, status in expected.items() if can_transition(status, new_status)}
+    if not expected:
+        return []
+    return _transition(sa.tuple_(PTORequest.id, PTORequest.status).in_(list(expected.items())),
+                       new_status, values, lambda pto_request: expected[pto_request.id], actor_id)
+
+
+def transition_request(pto_request, new_status, actor_id=None, **values):
+    """
+    Move one loaded request from its current status to new_status; False if that move is not
+    allowed or the row changed since it was loaded (pto_request then shows the stored row)
+    """
+    if not can_transition(pto_request.status, new_status):
+        return False
+    if transition_requests({pto_request.id: pto_request.status}, new_status, actor_id, **values):
+        return True
+    db.session.refresh(pto_request)
+    return False
+
+
+def transition_matching(from_status, new_status, *criteria, actor_id=None, **values):
+    """Move every request in from_status that matches the criteria (e.g. the completion sweep)"""
+    if not can_transition(from_status, new_status):
+        raise InvalidTransition(f"Requests cannot move from {from_status} to {new_status}")
+    return _transition(sa.and_(PTORequest.status == from_status, *criteria), new_status, values,
+                       lambda pto_request: from_status, actor_id)
@@ -3,35 +3,42 @@ Twilio Service Layer for SMS Call-Out Feature
 Handles SMS text messages for employee call-out reporting
 """
 
-import os
 import logging
 from datetime import datetime, date
-from twilio.rest import Client
-from twilio.twiml.messaging_response import MessagingResponse
 from models import TeamMember, PTORequest, CallOutRecord, get_eastern_time
 from database import db
+from config import get_settings
+from group_commit import run_write
+from transitions import announce_created
+from overlaps import check_new_request
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class TwilioSMSService:
     """Service for handling incoming SMS for call-outs"""
 
-    def __init__(self):
-        """Initialize Twilio SMS service with credentials from environment"""
-        self.account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-        self.auth_token = os.getenv('TWILIO_AUTH_TOKEN')
-        self.sms_number = os.getenv('TWILIO_SMS_NUMBER') or os.getenv('TWILIO_PHONE_NUMBER')
+    def __init__(self, settings=None):
+        """Initialize Twilio SMS service from the shared application settings"""
+        settings = settings or get_settings()
+        self.account_sid = settings.twilio_account_sid
+        self.auth_token = settings.twilio_auth_token
+        self.sms_number = settings.twilio_sms_number
 
-        # Initialize Twilio client if credentials are available
-        if self.account_sid and self.auth_token:
-            self.client = Client(self.account_sid, self.auth_token)
-        else:
-            self.client = None
+        self._client = None
+
+        if not (self.account_sid and self.auth_token):
             logger.warning("Twilio credentials not configured. SMS will not work.")
 
+    @property
+    def client(self):
+        """Twilio REST client, built on the first outbound SMS (None without credentials)"""
+        if self._client is None and self.account_sid and self.auth_token:
+            # Deferred import: the Twilio SDK is heavy and most workers never send an SMS
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
     def authenticate_sender(self, from_number):
         """
         Authenticate SMS sender by phone number match
@@ -79,6 +86,7 @@ class TwilioSMSService:
 
     def generate_sms_response(self, authenticated, member=None, request_id=None):
         """Generate TwiML response for SMS"""
+        from twilio.twiml.messaging_response import MessagingResponse
         response = MessagingResponse()
 
         if authenticated and member and request_id:
@@ -100,63 +108,26 @@ class TwilioSMSService:
         """
         Create PTO request and CallOutRecord for SMS call-out
         Auto-approves and deducts from sick balance immediately
+        Writes go through the group-commit writer so call-out bursts share transactions
         Returns: PTORequest object
         """
         try:
-            # Get today's date in Eastern time
-            today = get_eastern_time().date()
-            today_str = today.strftime('%Y-%m-%d')
-
             # Extract reason from SMS
             reason = self.extract_reason(message_body)
 
-            # Create PTO request for today only (Sick Leave, call-out)
-            # Auto-approve call-outs (no manager approval needed)
-            pto_request = PTORequest(
+            request_id = run_write(
+                stage_call_out_request,
                 member_id=member.id,
-                start_date=today_str,
-                end_date=today_str,
-                pto_type='Sick Leave',
-                manager_team=member.team,
-                status='approved',  # Auto-approve call-outs
-                is_call_out=True,
-                reason=f"Call-out via SMS: {reason}",
-                approved_date=get_eastern_time()
+                reason=reason,
+                message_sid=message_sid,
+                message_body=message_body,
+                from_number=from_number
             )
 
-            db.session.add(pto_request)
-            db.session.flush()  # Get the PTO request ID
-
-            # Deduct from sick balance immediately
-            hours_to_deduct = pto_request.duration_hours
-            current_sick_balance = float(member.sick_balance_hours)
-            new_sick_balance = max(0, current_sick_balance - hours_to_deduct)
-            member.sick_balance_hours = new_sick_balance
-
-            logger.info(f"Auto-approved call-out #{pto_request.id} for {member.name}")
-            logger.info(f"Deducted {hours_to_deduct} hours from sick balance. New balance: {new_sick_balance} hours")
-
-            # Create CallOutRecord
-            call_out_record = CallOutRecord(
-                member_id=member.id,
-                pto_request_id=pto_request.id,
-                call_sid=message_sid,
-                source='sms',
-                phone_number_used=from_number,
-                verified=True,
-                authentication_method='phone_match',
-                message_text=message_body,
-                processed_at=get_eastern_time()
-            )
-
-            db.session.add(call_out_record)
-            db.session.commit()
-
-            logger.info(f"Created and auto-approved SMS call-out request #{pto_request.id} for {member.name}")
-            return pto_request
+            logger.info(f"Created and auto-approved SMS call-out request #{request_id} for {member.name}")
+            return PTORequest.query.get(request_id)
 
         except Exception as e:
-            db.session.rollback()
             logger.error(f"Failed to create SMS call-out request: {str(e)}")
             raise
 
@@ -195,3 +166,64 @@ class TwilioSMSService:
         except Exception as e:
             logger.error(f"Failed to send manager SMS: {str(e)}")
             return False
+
+
+def stage_call_out_request(member_id, reason, message_sid, message_body, from_number):
+    """
+    Stage an auto-approved call-out: PTO request, sick balance deduction and CallOutRecord
+    Does not commit (see group_commit.run_write); returns the new PTO request ID
+    """
+    member = db.session.get(TeamMember, member_id)
+
+    # Get today's date in Eastern time
+    today_str = get_eastern_time().date().strftime('%Y-%m-%d')
+
+    # A repeated text for the same day is merged into the existing call-out (no second
+    # deduction); other overlapping requests don't block calling out sick
+    existing_id = check_new_request(member.id, today_str, today_str, pto_type='Sick Leave', is_call_out=True)
+    if existing_id is not None:
+        logger.info(f"Merged repeated call-out for {member.name} into request #{existing_id}")
+        return existing_id
+
+    # Create PTO request for today only (Sick Leave, call-out)
+    # Auto-approve call-outs (no manager approval needed)
+    pto_request = PTORequest(
+        member_id=member.id,
+        start_date=today_str,
+        end_date=today_str,
+        pto_type='Sick Leave',
+        manager_team=member.team,
+        status='approved',  # Auto-approve call-outs
+        is_call_out=True,
+        reason=f"Call-out via SMS: {reason}",
+        approved_date=get_eastern_time()
+    )
+
+    db.session.add(pto_request)
+    db.session.flush()  # Get the PTO request ID
+    announce_created([pto_request])
+
+    # Deduct from sick balance immediately
+    hours_to_deduct = pto_request.duration_hours
+    current_sick_balance = float(member.sick_balance_hours)
+    new_sick_balance = max(0, current_sick_balance - hours_to_deduct)
+    member.sick_balance_hours = new_sick_balance
+
+    logger.info(f"Auto-approved call-out #{pto_request.id} for {member.name}")
+    logger.info(f"Deducted {hours_to_deduct} hours from sick balance. New balance: {new_sick_balance} hours")
+
+    # Create CallOutRecord
+    call_out_record = CallOutRecord(
+        member_id=member.id,
+        pto_request_id=pto_request.id,
+        call_sid=message_sid,
+        source='sms',
+        phone_number_used=from_number,
+        verified=True,
+        authentication_method='phone_match',
+        message_text=message_body,
+        processed_at=get_eastern_time()
+    )
+    db.session.add(call_out_record)
+
+    return pto_request.id
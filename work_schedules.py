@@ -0,0 +1,273 @@
+"""
+Per-Employee Work Schedules
+WorkSchedule rows (hours per weekday plus effective dates) are compiled per member
+into segments of (first ordinal, last ordinal, weekday-hours vector). A full-day
+request is priced per segment it touches as
+
+    sum over weekdays w of (non-holiday days on weekday w) * hours[w]
+
+where the per-weekday day counts are popcounts over the holiday calendar's per-year
+bitmaps, so pricing a long request costs a few operations per segment and year, not
+per day. Days outside every segment, and members without a schedule, keep the
+standard 7.5 hours per business day.
+
+Each worker loads all schedules on first use (one small table), drops them when a
+committed write touches work_schedules and reloads them every
+WORK_SCHEDULE_REFRESH_SECONDS to pick up other workers' edits
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+import click
+import sqlalchemy as sa
+from flask import current_app, has_app_context
+from sqlalchemy import select
+
+from database import db
+from holiday_calendar import get_holiday_calendar
+from models import TeamMember, WorkSchedule
+
+logger = logging.getLogger(__name__)
+
+STANDARD_DAY_HOURS = 7.5
+DEFAULT_REFRESH_SECONDS = 60.0
+WEEKDAY_COLUMNS = ('monday_hours', 'tuesday_hours', 'wednesday_hours', 'thursday_hours', 'friday_hours',
+                   'saturday_hours', 'sunday_hours')
+
+# first/last are date ordinals (inclusive); hours is a 7-tuple, Monday first
+Segment = namedtuple('Segment', ['first', 'last', 'hours'])
+
+
+def parse_weekday_hours(value):
+    """'10,10,10,10,0,0,0' (Monday first) -> 7-tuple of floats; raises ValueError"""
+    hours = tuple(float(part) for part in value.split(','))
+    if len(hours) != 7 or any(not 0 <= h <= 24 for h in hours):
+        raise ValueError("Give seven comma-separated hours (Monday first), each between 0 and 24")
+    return hours
+
+
+def compile_segments(schedules):
+    """
+    Sorted, non-overlapping segments for one member's schedules (objects or rows with
+    effective_from, effective_to and the weekday hour columns); where two overlap, the
+    one that starts later wins
+    """
+    rows = sorted(schedules, key=lambda s: s.effective_from)
+    segments = []
+    for i, row in enumerate(rows):
+        first = date.fromisoformat(row.effective_from).toordinal()
+        last = date.fromisoformat(row.effective_to).toordinal() if row.effective_to else date.max.toordinal()
+        if i + 1 < len(rows):
+            last = min(last, date.fromisoformat(rows[i + 1].effective_from).toordinal() - 1)
+        if last >= first:
+            segments.append(Segment(first, last, tuple(float(getattr(row, c) or 0) for c in WEEKDAY_COLUMNS)))
+    return tuple(segments)
+
+
+class WorkScheduleCache:
+    """Compiled segments of every member with a schedule"""
+
+    def __init__(self, refresh_seconds=DEFAULT_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.loaded_at = None
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def is_stale(self):
+        return self.loaded_at is None or (
+            self.refresh_seconds > 0 and time.monotonic() - self.loaded_at >= self.refresh_seconds)
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def load(self, rows):
+        by_member = {}
+        for row in rows:
+            by_member.setdefault(row.member_id, []).append(row)
+        segments = {member_id: compile_segments(schedules) for member_id, schedules in by_member.items()}
+        with self._lock:
+            self._segments = segments
+            self.loaded_at = time.monotonic()
+
+    def segments(self, member_id):
+        return self._segments.get(member_id, ())
+
+
+def load_work_schedules():
+    """All schedules, read from the primary; empty until the work_schedules migration has run"""
+    try:
+        with db.engine.connect() as conn:
+            return conn.execute(select(WorkSchedule.member_id, WorkSchedule.effective_from,
+                                       WorkSchedule.effective_to, *(WorkSchedule.__table__.c[c]
+                                                                    for c in WEEKDAY_COLUMNS))).all()
+    except (sa.exc.OperationalError, sa.exc.ProgrammingError):
+        logger.debug("work_schedules table not available; using standard hours")
+        return []
+
+
+def get_work_schedules():
+    """The app's schedule cache, (re)loaded on first use and after the refresh interval"""
+    if not has_app_context():
+        return None
+    cache = current_app.extensions.get('work_schedules')
+    if cache is None:
+        cache = current_app.extensions['work_schedules'] = WorkScheduleCache()
+    if cache.is_stale():
+        cache.load(load_work_schedules())
+    return cache
+
+
+def member_segments(member_id):
+    cache = get_work_schedules()
+    return cache.segments(member_id) if cache is not None else ()
+
+
+def _standard_hours(calendar, first, last):
+    return calendar.count(date.fromordinal(first), date.fromordinal(last)) * STANDARD_DAY_HOURS
+
+
+def scheduled_hours(member_id, start_date, end_date):
+    """
+    Hours of a full-day request from start_date to end_date ('YYYY-MM-DD', inclusive),
+    or None if the member has no schedule (callers then use 7.5 hours per business day)
+    """
+    segments = member_segments(member_id)
+    if not segments:
+        return None
+    calendar = get_holiday_calendar()
+    cursor = date.fromisoformat(start_date).toordinal()
+    last = date.fromisoformat(end_date).toordinal()
+    total = 0.0
+    for segment in segments:
+        if cursor > last or segment.first > last:
+            break
+        if segment.last < cursor:
+            continue
+        if segment.first > cursor:
+            total += _standard_hours(calendar, cursor, segment.first - 1)
+            cursor = segment.first
+        through = min(segment.last, last)
+        counts = calendar.count_by_weekday(date.fromordinal(cursor), date.fromordinal(through))
+        total += sum(days * hours for days, hours in zip(counts, segment.hours))
+        cursor = through + 1
+    if cursor <= last:
+        total += _standard_hours(calendar, cursor, last)
+    return round(total, 2)
+
+
+def scheduled_hours_by_month(member_id, start_date, end_date):
+    """{'YYYY-MM': hours} for a full-day request, or None if the member has no schedule"""
+    if not member_segments(member_id):
+        return None
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    by_month = {}
+    while start <= end:
+        month_end = min(end, date(start.year + start.month // 12, start.month % 12 + 1, 1) - timedelta(days=1))
+        by_month[start.strftime('%Y-%m')] = scheduled_hours(member_id, start.isoformat(), month_end.isoformat())
+        start = month_end + timedelta(days=1)
+    return by_month
+
+
+def daily_hours(member_id, start_date, end_date):
+    """
+    [(date, hours), ...] for each scheduled, non-holiday day of a full-day request, or
+    None if the member has no schedule (used for per-day timekeeping entries)
+    """
+    segments = member_segments(member_id)
+    if not segments:
+        return None
+    calendar = get_holiday_calendar()
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    days = []
+    for day in (start + timedelta(days=i) for i in range((end - start).days + 1)):
+        ordinal = day.toordinal()
+        segment = next((s for s in segments if s.first <= ordinal <= s.last), None)
+        if segment is None:
+            hours = STANDARD_DAY_HOURS if calendar.is_business_day(day) else 0
+        else:
+            hours = 0 if day in calendar.year(day.year).names else segment.hours[day.weekday()]
+        if hours:
+            days.append((day, hours))
+    return days
+
+
+def set_work_schedule(member, hours, effective_from, effective_to=None):
+    """
+    Add a schedule for a member from effective_from; a still-open schedule that starts
+    earlier is closed the day before. The caller commits
+    """
+    open_schedules = WorkSchedule.query.filter(WorkSchedule.member_id == member.id,
+                                               WorkSchedule.effective_from < effective_from,
+                                               sa.or_(WorkSchedule.effective_to.is_(None),
+                                                      WorkSchedule.effective_to >= effective_from))
+    day_before = (date.fromisoformat(effective_from) - timedelta(days=1)).isoformat()
+    for schedule in open_schedules:
+        schedule.effective_to = day_before
+    schedule = WorkSchedule(member_id=member.id, effective_from=effective_from, effective_to=effective_to,
+                            **dict(zip(WEEKDAY_COLUMNS, hours)))
+    db.session.add(schedule)
+    return schedule
+
+
+def init_work_schedules(app, settings):
+    """Attach an (empty, lazily loaded) schedule cache to the app"""
+    app.extensions['work_schedules'] = WorkScheduleCache(refresh_seconds=settings.work_schedule_refresh_seconds)
+    return app.extensions['work_schedules']
+
+
+def register_work_schedule_commands(app):
+    """Register the `flask work-schedule` CLI command"""
+
+    @app.cli.command('work-schedule')
+    @click.argument('email')
+    @click.option('--hours', help='Hours per weekday, Monday first, e.g. 10,10,10,10,0,0,0 (omit to list).')
+    @click.option('--from', 'effective_from', help='First day of the schedule (default: today).')
+    @click.option('--to', 'effective_to', help='Last day of the schedule (default: open-ended).')
+    def work_schedule_command(email, hours, effective_from, effective_to):
+        """Show or set a team member's work schedule."""
+        member = TeamMember.query.filter_by(email=email).first()
+        if member is None:
+            raise click.ClickException(f"No team member with email {email}")
+        if hours:
+            try:
+                weekday_hours = parse_weekday_hours(hours)
+                effective_from = date.fromisoformat(effective_from or date.today().isoformat()).isoformat()
+                effective_to = date.fromisoformat(effective_to).isoformat() if effective_to else None
+            except ValueError as exc:
+                raise click.BadParameter(str(exc))
+            set_work_schedule(member, weekday_hours, effective_from, effective_to)
+            db.session.commit()
+            logger.info(f"Set work schedule for member {member.id} from {effective_from}",
+                        extra={'member_id': member.id, 'weekday_hours': weekday_hours})
+
+        schedules = WorkSchedule.query.filter_by(member_id=member.id).order_by(WorkSchedule.effective_from)
+        for schedule in schedules:
+            weekday_hours = ','.join(f"{float(getattr(schedule, c)):g}" for c in WEEKDAY_COLUMNS)
+            click.echo(f"{schedule.effective_from} to {schedule.effective_to or 'open'}: {weekday_hours}")
+        if not schedules.count():
+            click.echo(f"{member.name} has no schedule ({STANDARD_DAY_HOURS} hours per business day)")
+
+
+# Schedule writes are noted at flush time and drop the cache once they commit
+
+@sa.event.listens_for(sa.orm.Session, 'after_flush')
+def _note_schedule_writes(db_session, flush_context):
+    if any(isinstance(obj, WorkSchedule) for obj in (*db_session.new, *db_session.dirty, *db_session.deleted)):
+        db_session.info['work_schedules_changed'] = True
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_commit')
+def _invalidate_committed(db_session):
+    if db_session.info.pop('work_schedules_changed', False) and has_app_context():
+        cache = current_app.extensions.get('work_schedules')
+        if cache is not None:
+            cache.invalidate()
+
+
+@sa.event.listens_for(sa.orm.Session, 'after_rollback')
+def _discard_rolled_back(db_session):
+    db_session.info.pop('work_schedules_changed', None)